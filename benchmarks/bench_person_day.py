@@ -0,0 +1,92 @@
+"""
+Per-Person-Day Benchmark
+
+Measures the cost of one person-day in the python engine, i.e. the wall time
+of Simulation.run divided by the person-days it visits, with a fixed seed.
+Also times the per-infected-person-day death and recovery checks through the
+validating public Person methods and through the unchecked internal ones the
+engine uses:
+
+    python benchmarks/bench_person_day.py --population 20000 --days 50
+    python benchmarks/bench_person_day.py --output person_day.json
+"""
+
+from typing import Annotated
+import json
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+import numpy as np
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from virus import HS, Engine, Person, make_simulation
+
+def time_run(population: int, infected: int, tprob: float, dprob: float, days: int, seed: int) -> tuple:
+    """
+    Time one seeded python-engine run and count the person-days it visits.
+
+    Args:
+        population: Total population size
+        infected: Initial number of infected individuals
+        tprob: Transmission probability
+        dprob: Death probability
+        days: Number of days to simulate
+        seed: Seed for the run
+
+    Returns:
+        Tuple of (wall time in seconds, person-days visited)
+    """
+    sim = make_simulation(Engine.PYTHON, population, infected, 0, seed = np.random.SeedSequence(seed))
+    start = time.perf_counter()
+    counts = sim.run(tprob, dprob, days, as_array = True)
+    elapsed = time.perf_counter() - start
+    # each day with someone infected visits everyone susceptible or infected at its start
+    starts = np.vstack([[population - infected, infected], counts[:-1, 1:3]])
+    visited = int(starts[starts[:, 1] > 0].sum())
+    return elapsed, visited
+
+def time_infected_checks(number: int) -> tuple:
+    """
+    Time one infected person-day's death and recovery checks.
+
+    Args:
+        number: Calls per timing
+
+    Returns:
+        Tuple of (validated ns per call, unchecked ns per call), best of 5 timings
+    """
+    person = Person(health_status = HS.INFECTED, sick_days = 3)
+    validated = "person.die_or_not(0.05, 0.5, 0.5, person); person.calculate_adjusted_sick_days(person, 0.5)"
+    unchecked = "person.check_if_survive(0.05, 0.5, 0.5, person); person._adjusted_sick_days(person, 0.5)"
+    return tuple(min(timeit.repeat(statement, globals = {'person': person}, number = number, repeat = 5)) / number * 1e9
+                 for statement in (validated, unchecked))
+
+def main(population: Annotated[int, typer.Option(help = "Number of people")] = 20_000,
+         days: Annotated[int, typer.Option(help = "Number of simulated days")] = 50,
+         repeats: Annotated[int, typer.Option(help = "Number of timed runs")] = 5,
+         output: Annotated[str | None, typer.Option(help = "Write results to this JSON file")] = None):
+    """
+    Report the python engine's cost per person-day.
+
+    Args:
+        population: Number of people (default: 20,000)
+        days: Number of simulated days (default: 50)
+        repeats: Number of timed runs (default: 5)
+        output: Optional JSON file for the results (default: None)
+    """
+    runs = [time_run(population, 10, 0.3, 0.05, days, seed) for seed in range(repeats)]
+    ns_per_person_day = [elapsed / visited * 1e9 for elapsed, visited in runs]
+    validated_ns, unchecked_ns = time_infected_checks(200_000)
+    result = {'population': population, 'days': days, 'repeats': repeats,
+              'min_ns': min(ns_per_person_day), 'median_ns': statistics.median(ns_per_person_day),
+              'validated_checks_ns': validated_ns, 'unchecked_checks_ns': unchecked_ns}
+    print(f"python engine: min {result['min_ns']:.0f} ns, median {result['median_ns']:.0f} ns per person-day over {repeats} runs")
+    print(f"infected person-day checks: {validated_ns:.0f} ns validated, {unchecked_ns:.0f} ns unchecked")
+    if output:
+        Path(output).write_text(json.dumps(result, indent = 2))
+
+if __name__ == "__main__":
+    typer.run(main)
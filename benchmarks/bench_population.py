@@ -0,0 +1,96 @@
+"""
+Population Memory Benchmark
+
+Measures the memory used to hold a population as a list of Person objects
+and as a Population (struct-of-arrays), and the peak memory of building and
+running a python-engine Simulation, using tracemalloc:
+
+    python benchmarks/bench_population.py --population 1000000
+    python benchmarks/bench_population.py --output population.json
+"""
+
+from typing import Annotated, Callable
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import typer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from virus import Person, Population, Simulation, HS
+
+def traced_bytes(build: Callable[[], object]) -> int:
+    """
+    Measure the memory still allocated by an object once it is built.
+
+    Args:
+        build: Function creating the object to measure
+
+    Returns:
+        Bytes allocated while building the object and kept alive by it
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return after - before
+
+def traced_peak(work: Callable[[], object]) -> int:
+    """
+    Measure the peak memory allocated while some work runs.
+
+    Args:
+        work: Function doing the work to measure
+
+    Returns:
+        Highest number of bytes allocated at once during the work, above what was allocated before it
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        work()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak - before
+
+def main(population: Annotated[int, typer.Option(help = "Number of people")] = 1_000_000,
+         days: Annotated[int, typer.Option(help = "Days to run the Simulation for the run peak")] = 5,
+         output: Annotated[str | None, typer.Option(help = "Write results to this JSON file")] = None):
+    """
+    Report bytes per person for List[Person] and Population, and peak bytes per person of a Simulation.
+
+    Args:
+        population: Number of people to allocate (default: 1,000,000)
+        days: Days to run the Simulation for (default: 5)
+        output: Optional JSON file for the results (default: None)
+    """
+    person_list = traced_bytes(lambda: [Person(health_status = HS.SUSCEPTIBLE, transmission_rate = random.random())
+                                        for _ in range(population)])
+    arrays = traced_bytes(lambda: Population(np.full(population, HS.SUSCEPTIBLE), np.zeros(population),
+                                             np.random.default_rng().random(population)))
+    simulations = []
+    build_peak = traced_peak(lambda: simulations.append(Simulation(population, max(1, population // 1000), 0, rng = random.Random(0))))
+    # as_array keeps pandas, imported on first use, out of the run peak
+    run_peak = traced_peak(lambda: simulations[0].run(0.4, 0.02, days, as_array = True))
+    result = {'population': population, 'days': days, 'person_list_bytes': person_list, 'population_bytes': arrays,
+              'simulation_build_peak_bytes': build_peak, 'simulation_run_peak_bytes': run_peak,
+              'person_list_bytes_per_person': person_list / population, 'population_bytes_per_person': arrays / population,
+              'simulation_build_peak_bytes_per_person': build_peak / population,
+              'simulation_run_peak_bytes_per_person': run_peak / population}
+    print(f"List[Person]: {person_list / 2**20:,.1f} MiB ({result['person_list_bytes_per_person']:.1f} bytes/person)")
+    print(f"Population:   {arrays / 2**20:,.1f} MiB ({result['population_bytes_per_person']:.1f} bytes/person)")
+    print(f"Simulation build peak: {build_peak / 2**20:,.1f} MiB ({result['simulation_build_peak_bytes_per_person']:.1f} bytes/person)")
+    print(f"Simulation run peak:   {run_peak / 2**20:,.1f} MiB above the stored population "
+          f"({result['simulation_run_peak_bytes_per_person']:.1f} bytes/person)")
+    if output:
+        Path(output).write_text(json.dumps(result, indent = 2))
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,58 @@
+"""
+CLI Startup Benchmark
+
+Measures the wall time of `python virus.py --help`, which is dominated by
+module imports. Run it before and after changes that touch imports:
+
+    python benchmarks/bench_startup.py --repeats 20
+    python benchmarks/bench_startup.py --output startup.json
+"""
+
+from typing import Annotated, List
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+import typer
+
+VIRUS_SCRIPT = Path(__file__).resolve().parent.parent / 'virus.py'
+
+def time_startup(args: List[str], repeats: int) -> List[float]:
+    """
+    Time repeated runs of virus.py in fresh interpreters.
+    
+    Args:
+        args: Command-line arguments passed to virus.py
+        repeats: Number of timed runs
+        
+    Returns:
+        Wall time of each run in seconds
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(VIRUS_SCRIPT), *args], check = True, stdout = subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main(repeats: Annotated[int, typer.Option(help = "Number of timed runs")] = 10,
+         output: Annotated[str | None, typer.Option(help = "Write results to this JSON file")] = None):
+    """
+    Report min and median wall time of `python virus.py --help`.
+    
+    Args:
+        repeats: Number of timed runs (default: 10)
+        output: Optional JSON file for the results (default: None)
+    """
+    time_startup(['--help'], 1)  # warm the filesystem cache
+    timings = time_startup(['--help'], repeats)
+    result = {'command': 'virus.py --help', 'repeats': repeats,
+              'min_s': min(timings), 'median_s': statistics.median(timings)}
+    print(f"virus.py --help: min {result['min_s']:.3f}s, median {result['median_s']:.3f}s over {repeats} runs")
+    if output:
+        Path(output).write_text(json.dumps(result, indent = 2))
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,205 @@
+"""
+Benchmark Suite
+
+Runs the throughput, analyze, and startup benchmarks in one go and saves
+the results as JSON so runs can be compared across commits:
+
+    python benchmarks/bench_suite.py run --output before.json
+    git checkout my-branch
+    python benchmarks/bench_suite.py run --output after.json
+    python benchmarks/bench_suite.py compare before.json after.json
+
+Every case runs in a fresh interpreter, so its peak memory (max RSS) is
+its own. Peak memory is read with the Unix-only resource module.
+"""
+
+from typing import Annotated, List
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import typer
+
+from bench_startup import VIRUS_SCRIPT, time_startup
+
+sys.path.insert(0, str(VIRUS_SCRIPT.parent))
+from virus import Engine, make_simulation, parse_grid
+
+app = typer.Typer()
+
+# parameters shared by every case; dprob is low so epidemics outlast short runs
+VPROB = 0.0
+TPROB = 0.3
+DPROB = 0.01
+INFECTED = 10
+
+def peak_memory_bytes(who: int = resource.RUSAGE_SELF) -> int:
+    """
+    Get the peak resident memory of this process or its finished children.
+
+    Args:
+        who: resource.RUSAGE_SELF or resource.RUSAGE_CHILDREN (default: RUSAGE_SELF)
+
+    Returns:
+        Maximum resident set size in bytes
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def run_case(args: List[str]) -> dict:
+    """
+    Run one benchmark case in a fresh interpreter.
+
+    Args:
+        args: Arguments of the case command
+
+    Returns:
+        The case's result dictionary
+    """
+    completed = subprocess.run([sys.executable, __file__, 'case', *args], check = True, capture_output = True, text = True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+@app.command(hidden = True)
+def case(kind: str, engine: Engine, population: int, days: int = 50, trials: int = 1):
+    """
+    Measure a single case and print its result as a JSON line.
+
+    Args:
+        kind: 'throughput' times Simulation.run, 'analyze' times the analyze command
+        engine: Simulation engine
+        population: Population size
+        days: Number of simulated days (default: 50)
+        trials: Number of analyze trials (default: 1)
+    """
+    result = {'kind': kind, 'engine': engine.value, 'population': population, 'days': days}
+    if kind == 'throughput':
+        sim = make_simulation(engine, population, INFECTED, int(VPROB * population), seed = np.random.SeedSequence(0))
+        start = time.perf_counter()
+        sim.run(TPROB, DPROB, days, as_array = True)
+        elapsed = time.perf_counter() - start
+        # days after the epidemic burns out are filled in without simulating
+        simulated_days = days if sim.extinction_day is None else sim.extinction_day + 1
+        result.update(seconds = elapsed, person_days_per_second = population * simulated_days / elapsed)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            args = [str(trials), str(VPROB), str(TPROB), str(DPROB), str(days), str(INFECTED), str(population),
+                    str(Path(directory) / 'analyze.csv'), '--engine', engine.value, '--seed', '0', '--no-cache']
+            start = time.perf_counter()
+            subprocess.run([sys.executable, str(VIRUS_SCRIPT), 'analyze', *args], check = True, capture_output = True)
+            elapsed = time.perf_counter() - start
+        # the command ran in a child process, so its memory is that child's peak
+        result.update(trials = trials, seconds = elapsed, trials_per_second = trials / elapsed,
+                      peak_memory_bytes = peak_memory_bytes(resource.RUSAGE_CHILDREN))
+    result.setdefault('peak_memory_bytes', peak_memory_bytes())
+    print(json.dumps(result))
+
+def git_commit() -> str | None:
+    """
+    Get the commit of the benchmarked tree.
+
+    Returns:
+        HEAD's hash with a '-dirty' suffix for uncommitted changes, or None outside a git checkout
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = VIRUS_SCRIPT.parent, check = True,
+                                capture_output = True, text = True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd = VIRUS_SCRIPT.parent,
+                               check = True, capture_output = True, text = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+@app.command()
+def run(populations: Annotated[str, typer.Option(help = "Population sizes for throughput: 'a,b,c' or 'start:stop:step'")] = '1e3,1e4,1e5,1e6,1e7',
+        days: Annotated[str, typer.Option(help = "Day counts for throughput")] = '50,365',
+        engines: Annotated[List[Engine], typer.Option("--engine", help = "Engines to benchmark (repeatable)")] = [Engine.PYTHON, Engine.NUMPY],
+        python_max_population: Annotated[int, typer.Option(help = "Largest population run with the python engine")] = 100_000,
+        trials: Annotated[str, typer.Option(help = "Trial counts for analyze")] = '10,100,1000',
+        analyze_population: Annotated[int, typer.Option(help = "Population size for analyze")] = 1000,
+        startup_repeats: Annotated[int, typer.Option(help = "Number of timed `virus.py --help` runs")] = 10,
+        output: Annotated[str | None, typer.Option(help = "Write results to this JSON file")] = None):
+    """
+    Run every benchmark and report throughput, timings and peak memory.
+
+    Args:
+        populations: Population sizes for Simulation.run throughput (default: 1e3 to 1e7)
+        days: Day counts for Simulation.run throughput (default: 50 and 365)
+        engines: Engines to benchmark (default: python and numpy)
+        python_max_population: Populations above this skip the python engine (default: 100,000)
+        trials: Trial counts for the analyze command (default: 10, 100, 1000)
+        analyze_population: Population size of each analyze trial (default: 1000)
+        startup_repeats: Number of timed `virus.py --help` runs (default: 10)
+        output: Optional JSON file for the results (default: None)
+    """
+    results = []
+    for engine in engines:
+        for population in parse_grid(populations, int):
+            if engine == Engine.PYTHON and population > python_max_population:
+                continue
+            for ndays in parse_grid(days, int):
+                result = run_case(['throughput', engine.value, str(population), '--days', str(ndays)])
+                print(f"throughput {engine.value:>7} population {population:>10,} days {ndays:>4}: "
+                      f"{result['person_days_per_second']:>14,.0f} person-days/s, peak {result['peak_memory_bytes'] / 2**20:,.0f} MiB")
+                results.append(result)
+    for engine in engines:
+        for ntrials in parse_grid(trials, int):
+            result = run_case(['analyze', engine.value, str(analyze_population), '--trials', str(ntrials)])
+            print(f"analyze    {engine.value:>7} trials {ntrials:>6,}: {result['seconds']:.2f}s "
+                  f"({result['trials_per_second']:,.1f} trials/s), peak {result['peak_memory_bytes'] / 2**20:,.0f} MiB")
+            results.append(result)
+    time_startup(['--help'], 1)  # warm the filesystem cache
+    startup = time_startup(['--help'], startup_repeats)
+    results.append({'kind': 'startup', 'seconds': min(startup)})
+    print(f"startup    virus.py --help: {min(startup):.3f}s")
+    report = {'commit': git_commit(), 'timestamp': datetime.now(timezone.utc).isoformat(),
+              'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+    if output:
+        Path(output).write_text(json.dumps(report, indent = 2))
+
+def case_key(result: dict) -> tuple:
+    """
+    Identify a result so the same case can be matched across reports.
+
+    Args:
+        result: One entry of a report's results
+
+    Returns:
+        Tuple of the case's kind and parameters
+    """
+    return tuple(result.get(field) for field in ('kind', 'engine', 'population', 'days', 'trials'))
+
+@app.command()
+def compare(baseline: Annotated[str, typer.Argument(help = "Earlier report")],
+            candidate: Annotated[str, typer.Argument(help = "Later report")]):
+    """
+    Compare two reports case by case.
+
+    Prints the candidate/baseline ratio of each case's time (lower is faster)
+    and peak memory.
+
+    Args:
+        baseline: JSON report of the earlier run
+        candidate: JSON report of the later run
+    """
+    before, after = (json.loads(Path(report).read_text()) for report in (baseline, candidate))
+    print(f"baseline {before['commit']} vs candidate {after['commit']}")
+    earlier = {case_key(result): result for result in before['results']}
+    for result in after['results']:
+        previous = earlier.get(case_key(result))
+        if previous is None:
+            continue
+        label = ' '.join(str(value) for value in case_key(result) if value is not None)
+        line = f"{label:<40} time x{result['seconds'] / previous['seconds']:.2f}"
+        if 'peak_memory_bytes' in result:
+            line += f"  memory x{result['peak_memory_bytes'] / previous['peak_memory_bytes']:.2f}"
+        print(line)
+
+if __name__ == "__main__":
+    app()
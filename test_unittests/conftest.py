@@ -10,6 +10,18 @@ import pandas as pd
 from virus import Person, HS, Simulation
 
 
+# ============================================================================
+# Result Cache
+# ============================================================================
+
+@pytest.fixture(autouse=True)
+def isolated_result_cache(tmp_path, monkeypatch):
+    """Point the result cache at a per-test directory so runs never share entries."""
+    cache_dir = tmp_path / "result_cache"
+    monkeypatch.setenv("VIRUS_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
 # ============================================================================
 # Person Fixtures
 # ============================================================================
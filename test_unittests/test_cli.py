@@ -19,8 +19,13 @@ Future Implementation Notes:
 - Verify CSV output structure and content
 """
 
+import json
+import subprocess
+import sys
+from pathlib import Path
 import pytest
 from typer.testing import CliRunner
+import virus
 from virus import app
 
 
@@ -109,6 +114,15 @@ def test_visualize_command_creates_plots():
     pass
 
 
+def test_visualize_rejects_file_without_rows(tmp_path):
+    """Test that a header-only file (e.g. from an interrupted run) gives a clean CLI error."""
+    input_file = tmp_path / "analyze.csv"
+    input_file.write_text(",".join(virus.ANALYZE_COLUMNS) + "\n")
+    result = CliRunner().invoke(app, ["visualize", str(input_file), "--output-dir", str(tmp_path / "plots")])
+    assert result.exit_code == 2
+    assert "no rows to plot" in result.output
+
+
 # ============================================================================
 # Integration Test Ideas
 # ============================================================================
@@ -129,3 +143,311 @@ def test_full_workflow_simulate_analyze_visualize():
     pass
 
 
+
+
+# ============================================================================
+# Parallel Analyze
+# ============================================================================
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_analyze_output_identical_for_any_worker_count(tmp_path, engine):
+    """Test that a fixed seed gives the same analyze.csv with 1 or several workers."""
+    runner = CliRunner()
+    outputs = []
+    for workers in (1, 3):
+        output_file = tmp_path / f"analyze_{workers}.csv"
+        result = runner.invoke(app, ["analyze", "5", "0.1", "0.3", "0.05", "10", "5", "200", str(output_file),
+                                     "--engine", engine, "--workers", str(workers), "--seed", "42"])
+        assert result.exit_code == 0, result.output
+        outputs.append(output_file.read_text())
+    assert outputs[0] == outputs[1]
+    assert outputs[0].splitlines()[0] == "AVG_INFECTED,AVG_DEATHS,AVG_DEATH_STDV"
+
+
+# ============================================================================
+# Checkpoint and Resume
+# ============================================================================
+
+def test_resumed_analyze_matches_uninterrupted_run(tmp_path, monkeypatch):
+    """Test that an interrupted analyze resumed from its checkpoint gives the same file."""
+    # two trials per worker task, so checkpoints fall every two trials
+    monkeypatch.setattr(virus, "TRIAL_CHUNK", 2)
+    runner = CliRunner()
+    args = ["analyze", "7", "0.1", "0.3", "0.05", "10", "5", "200"]
+    options = ["--seed", "42", "--checkpoint-every", "2", "--no-cache"]
+    expected_file = tmp_path / "expected.csv"
+    result = runner.invoke(app, [*args, str(expected_file), *options])
+    assert result.exit_code == 0, result.output
+
+    output_file = tmp_path / "analyze.csv"
+    calls = []
+    real_run_trial = virus.run_trial
+    def interrupted_run_trial(*trial_args):
+        calls.append(1)
+        if len(calls) == 6:
+            raise KeyboardInterrupt
+        return real_run_trial(*trial_args)
+    monkeypatch.setattr(virus, "run_trial", interrupted_run_trial)
+    result = runner.invoke(app, [*args, str(output_file), *options])
+    assert result.exit_code != 0
+    checkpoint = virus.load_checkpoint(str(output_file) + virus.CHECKPOINT_SUFFIX)
+    assert checkpoint['completed'] == 4
+
+    calls.clear()
+    result = runner.invoke(app, [*args, str(output_file), *options, "--resume"])
+    assert result.exit_code == 0, result.output
+    assert len(calls) == 3
+    assert output_file.read_text() == expected_file.read_text()
+    assert not (tmp_path / ("analyze.csv" + virus.CHECKPOINT_SUFFIX)).exists()
+
+
+def test_resume_rejects_different_parameters(tmp_path):
+    """Test that resuming with other simulation parameters is refused."""
+    output_file = tmp_path / "analyze.csv"
+    virus.write_checkpoint(str(output_file) + virus.CHECKPOINT_SUFFIX,
+                           {'parameters': {'vprob': 0.5}, 'entropy': 1, 'trials': []})
+    result = CliRunner().invoke(app, ["analyze", "3", "0.1", "0.3", "0.05", "10", "5", "200",
+                                      str(output_file), "--resume"])
+    assert result.exit_code != 0
+    assert "different" in result.output
+
+
+# ============================================================================
+# Startup Imports
+# ============================================================================
+
+def test_import_does_not_load_pandas_or_matplotlib():
+    """Test that importing virus (as every CLI call does) defers the heavy imports."""
+    code = "import sys, virus; print(sorted(m for m in ('pandas', 'matplotlib') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=Path(virus.__file__).parent)
+    assert result.stdout.strip() == "[]"
+
+
+@pytest.mark.parametrize("engine", ["python", "batched"])
+def test_analyze_profile_covers_every_trial(tmp_path, engine):
+    """Test that --profile-output sums worker profiles over every trial."""
+    runner = CliRunner()
+    profile_file = tmp_path / "profile.json"
+    result = runner.invoke(app, ["analyze", "4", "0.0", "0.3", "0.0", "5", "10", "200", str(tmp_path / "analyze.csv"),
+                                 "--engine", engine, "--workers", "2", "--batch-size", "2", "--seed", "1",
+                                 "--profile", "--profile-output", str(profile_file)])
+    assert result.exit_code == 0, result.output
+    assert "Phase" in result.output
+    profile = json.loads(profile_file.read_text())
+    assert [day['day'] for day in profile['days']] == list(range(5))
+    assert sum(day['deaths'] for day in profile['days']) == 0
+    assert profile['phases']['stats']['calls'] == (4 if engine == "python" else 2)
+    assert profile['phases']['write']['calls'] == 1
+
+
+def test_simulate_profile_times_final_write(tmp_path):
+    """Test that simulate's profile includes writing the output file."""
+    profile_file = tmp_path / "profile.json"
+    result = CliRunner().invoke(app, ["simulate", "0.1", "0.3", "0.05", "5", "10", "100", str(tmp_path / "sim.csv"),
+                                      "--profile-output", str(profile_file)])
+    assert result.exit_code == 0, result.output
+    assert set(json.loads(profile_file.read_text())['phases']) >= {'construct', 'step', 'record', 'write'}
+
+
+def test_threads_require_numpy_engine(tmp_path):
+    """Test that --threads above 1 is rejected for engines other than numpy."""
+    runner = CliRunner()
+    result = runner.invoke(app, ["simulate", "0.1", "0.3", "0.05", "5", "10", "100", str(tmp_path / "sim.csv"), "--threads", "2"])
+    assert result.exit_code != 0
+    assert "numpy" in result.output
+
+
+@pytest.mark.parametrize("command", [["simulate", "0.1", "0.3", "0.05", "5", "10", "100"],
+                                     ["analyze", "2", "0.1", "0.3", "0.05", "10", "5", "100"]])
+def test_synchronous_requires_python_engine(tmp_path, command):
+    """Test that --synchronous is rejected for the always-synchronous engines."""
+    result = CliRunner().invoke(app, [*command, str(tmp_path / "out.csv"), "--engine", "numpy", "--synchronous"])
+    assert result.exit_code != 0
+    assert "--synchronous" in result.output
+
+
+def test_analyze_edge_list_contact_model(tmp_path):
+    """Test analyze on a graph read from an edge list, and its engine check."""
+    runner = CliRunner()
+    edge_list = tmp_path / "edges.txt"
+    edge_list.write_text("# a path of 100 people\n" + "".join(f"{i} {i + 1}\n" for i in range(99)))
+    args = ["analyze", "2", "0.0", "0.5", "0.0", "20", "5", "100", str(tmp_path / "analyze.csv"),
+            "--contact-model", "edge-list", "--edge-list", str(edge_list), "--seed", "3"]
+    result = runner.invoke(app, [*args, "--engine", "numpy"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, args)
+    assert result.exit_code != 0
+    assert "numpy" in result.output
+
+
+def test_compartmental_engine(tmp_path):
+    """Test simulate and analyze with the compartmental engine on a population too large for the agent engines."""
+    runner = CliRunner()
+    result = runner.invoke(app, ["simulate", "0.1", "0.3", "0.05", "10", "30", "1000000000", str(tmp_path / "sim.csv"),
+                                 "--engine", "compartmental", "--seed", "1"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["analyze", "20", "0.1", "0.3", "0.05", "30", "10", "1000000000", str(tmp_path / "analyze.csv"),
+                                 "--engine", "compartmental", "--seed", "1"])
+    assert result.exit_code == 0, result.output
+    assert len((tmp_path / "analyze.csv").read_text().splitlines()) == 21
+
+
+def test_simulate_state_dir_resume(tmp_path):
+    """Test that --resume from a --state-dir run writes the same output, and its option checks."""
+    runner = CliRunner()
+    args = ["simulate", "0.1", "0.3", "0.05", "10", "30", "2000"]
+    options = ["--engine", "numpy", "--state-dir", str(tmp_path / "state"), "--tile-size", "300"]
+    result = runner.invoke(app, [*args, str(tmp_path / "a.csv"), *options, "--seed", "4"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, [*args, str(tmp_path / "b.csv"), *options, "--resume"])
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "b.csv").read_text() == (tmp_path / "a.csv").read_text()
+    result = runner.invoke(app, ["simulate", "0.1", "0.5", "0.05", "10", "30", "2000", str(tmp_path / "c.csv"), *options, "--resume"])
+    assert result.exit_code != 0
+    assert "different" in result.output
+    result = runner.invoke(app, [*args, str(tmp_path / "d.csv"), "--state-dir", str(tmp_path / "state")])
+    assert result.exit_code != 0
+    assert "numpy" in result.output
+
+def test_simulate_state_dir_resume_extends_days(tmp_path):
+    """Test that --resume with more days extends a finished run to match a longer uninterrupted one."""
+    runner = CliRunner()
+    options = ["--engine", "numpy", "--tile-size", "300", "--seed", "4"]
+    result = runner.invoke(app, ["simulate", "0.1", "0.3", "0.05", "10", "30", "2000", str(tmp_path / "a.csv"),
+                                 *options, "--state-dir", str(tmp_path / "state")])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["simulate", "0.1", "0.3", "0.05", "10", "45", "2000", str(tmp_path / "b.csv"),
+                                 *options, "--state-dir", str(tmp_path / "state"), "--resume"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["simulate", "0.1", "0.3", "0.05", "10", "45", "2000", str(tmp_path / "c.csv"),
+                                 *options, "--state-dir", str(tmp_path / "fresh")])
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "b.csv").read_text() == (tmp_path / "c.csv").read_text()
+    assert len((tmp_path / "b.csv").read_text().splitlines()) > len((tmp_path / "a.csv").read_text().splitlines())
+    with open(tmp_path / "state" / "state.json") as f:
+        assert json.load(f)['parameters']['days'] == 45
+
+# ============================================================================
+# Parameter Sweep
+# ============================================================================
+
+class TestParseGrid:
+    """Test sweep grid specifications."""
+    
+    def test_comma_list(self):
+        """Test that comma-separated values are parsed in order."""
+        assert virus.parse_grid("0.1,0.5,0.2") == [0.1, 0.5, 0.2]
+    
+    def test_inclusive_range_has_clean_floats(self):
+        """Test that start:stop:step includes stop and rounds away float noise."""
+        assert virus.parse_grid("0.1:0.3:0.1") == [0.1, 0.2, 0.3]
+    
+    def test_integer_grid(self):
+        """Test that integer grids are cast to int."""
+        assert virus.parse_grid("100:300:100", int) == [100, 200, 300]
+    
+    def test_non_positive_step_rejected(self):
+        """Test that a zero step raises ValueError."""
+        with pytest.raises(ValueError, match="step must be positive"):
+            virus.parse_grid("0.1:0.3:0")
+
+
+def test_sweep_widened_grid_only_computes_new_points(tmp_path):
+    """Test that re-running a widened sweep reuses cached points and appends the rest."""
+    runner = CliRunner()
+    output_file = tmp_path / "sweep.csv"
+    common = ["sweep", "2", str(output_file), "--vprob", "0,0.5", "--days", "10", "--population-count", "100",
+              "--engine", "numpy", "--seed", "3"]
+    result = runner.invoke(app, [*common, "--tprob", "0.1,0.2"])
+    assert result.exit_code == 0, result.output
+    first_rows = output_file.read_text().splitlines()
+    assert len(first_rows) == 1 + 4 * 2
+    assert first_rows[0].split(",") == virus.SWEEP_COLUMNS
+
+    result = runner.invoke(app, [*common, "--tprob", "0.1:0.3:0.1", "--workers", "2"])
+    assert result.exit_code == 0, result.output
+    assert "2 of 6 grid points to compute" in result.output
+    rows = output_file.read_text().splitlines()
+    assert rows[:len(first_rows)] == first_rows
+    assert len(rows) == 1 + 6 * 2
+
+
+def sweep_rows(output_file):
+    """Read a sweep table's data rows, sorted by point and trial."""
+    return sorted(output_file.read_text().splitlines()[1:])
+
+
+def test_sweep_more_trials_only_computes_missing(tmp_path):
+    """Test that raising nsimulations adds only the new trials of each point."""
+    runner = CliRunner()
+    common = ["--tprob", "0.1,0.2", "--days", "10", "--population-count", "100", "--engine", "numpy", "--seed", "3"]
+    grown, fresh = tmp_path / "grown.csv", tmp_path / "fresh.csv"
+    result = runner.invoke(app, ["sweep", "3", str(grown), *common])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["sweep", "5", str(grown), *common])
+    assert result.exit_code == 0, result.output
+    assert "2 of 2 grid points to compute" in result.output
+    result = runner.invoke(app, ["sweep", "5", str(fresh), *common])
+    assert result.exit_code == 0, result.output
+    assert sweep_rows(grown) == sweep_rows(fresh)
+
+
+def test_sweep_resumes_interrupted_run(tmp_path):
+    """Test that a sweep cut short recomputes only the trials missing from the file."""
+    runner = CliRunner()
+    common = ["--tprob", "0.1,0.2", "--days", "10", "--population-count", "100", "--engine", "numpy", "--seed", "3"]
+    output_file = tmp_path / "sweep.csv"
+    result = runner.invoke(app, ["sweep", "4", str(output_file), *common])
+    assert result.exit_code == 0, result.output
+    complete = sweep_rows(output_file)
+    lines = output_file.read_text().splitlines()
+    # keep the header, all of the first point and one trial of the second
+    output_file.write_text("\n".join(lines[:6]) + "\n")
+    result = runner.invoke(app, ["sweep", "4", str(output_file), *common, "--tprob", "0.1:0.3:0.1"])
+    assert result.exit_code == 0, result.output
+    assert "2 of 3 grid points to compute" in result.output
+    rows = sweep_rows(output_file)
+    assert len(rows) == 3 * 4
+    assert set(complete) <= set(rows)
+
+
+def test_sweep_batched_blocks_respect_batch_size(tmp_path, monkeypatch):
+    """Test that batched sweeps split a point's trials into blocks of at most default_batch_size."""
+    blocks = []
+    real_run_trial_block = virus.run_trial_block
+    def recording_run_trial_block(seeds, *args):
+        blocks.append(len(seeds))
+        return real_run_trial_block(seeds, *args)
+    monkeypatch.setattr(virus, "run_trial_block", recording_run_trial_block)
+    monkeypatch.setattr(virus, "default_batch_size", lambda population, days: 2)
+    result = CliRunner().invoke(app, ["sweep", "5", str(tmp_path / "sweep.csv"), "--days", "10",
+                                      "--population-count", "100", "--engine", "batched", "--seed", "3"])
+    assert result.exit_code == 0, result.output
+    assert blocks == [2, 2, 1]
+
+
+def test_sweep_interrupted_point_keeps_finished_chunks(tmp_path, monkeypatch):
+    """Test that a point's trials run in TRIAL_CHUNK tasks and an interruption keeps the finished ones."""
+    monkeypatch.setattr(virus, "TRIAL_CHUNK", 2)
+    calls = []
+    real_run_trials = virus.run_trials
+    def interrupted_run_trials(*args):
+        calls.append(len(args[1]))
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return real_run_trials(*args)
+    monkeypatch.setattr(virus, "run_trials", interrupted_run_trials)
+    runner = CliRunner()
+    output_file, fresh = tmp_path / "sweep.csv", tmp_path / "fresh.csv"
+    common = ["--days", "10", "--population-count", "100", "--engine", "numpy", "--seed", "3"]
+    result = runner.invoke(app, ["sweep", "5", str(output_file), *common])
+    assert result.exit_code != 0
+    assert calls == [2, 2, 1]
+    assert len(sweep_rows(output_file)) == 4
+    monkeypatch.setattr(virus, "run_trials", real_run_trials)
+    result = runner.invoke(app, ["sweep", "5", str(output_file), *common])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["sweep", "5", str(fresh), *common])
+    assert result.exit_code == 0, result.output
+    assert sweep_rows(output_file) == sweep_rows(fresh)
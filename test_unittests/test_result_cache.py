@@ -0,0 +1,111 @@
+"""
+Unit tests for ResultCache - on-disk cache of simulate and analyze results.
+
+Tests cover key derivation, lookups, LRU eviction, and the CLI commands
+reusing cached results.
+"""
+
+import os
+import numpy as np
+from typer.testing import CliRunner
+import virus
+from virus import app, ResultCache
+
+
+class TestCacheKey:
+    """Test ResultCache.key."""
+
+    def test_same_run_same_key(self):
+        """Test that identical parameters and seed give the same key."""
+        parameters = {'vprob': 0.1, 'tprob': 0.2}
+        assert ResultCache.key('simulate', parameters, 42) == ResultCache.key('simulate', dict(parameters), 42)
+
+    def test_seed_command_and_version_change_key(self, monkeypatch):
+        """Test that the seed, command and engine version are all part of the key."""
+        parameters = {'vprob': 0.1, 'tprob': 0.2}
+        key = ResultCache.key('simulate', parameters, 42)
+        assert ResultCache.key('simulate', parameters, 43) != key
+        assert ResultCache.key('analyze', parameters, 42) != key
+        monkeypatch.setattr(virus, 'ENGINE_VERSION', virus.ENGINE_VERSION + 1)
+        assert ResultCache.key('simulate', parameters, 42) != key
+
+
+class TestCacheStorage:
+    """Test storing, loading and evicting entries."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that a stored array is returned unchanged."""
+        cache = ResultCache(str(tmp_path))
+        counts = np.arange(12, dtype=np.int64).reshape(2, 6)
+        cache.put('entry', counts)
+        np.testing.assert_array_equal(cache.get('entry'), counts)
+        assert cache.get('missing') is None
+
+    def test_directory_from_environment(self, isolated_result_cache):
+        """Test that the default directory comes from VIRUS_CACHE_DIR."""
+        assert ResultCache().directory == str(isolated_result_cache)
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that entries not read recently are evicted first once over the bound."""
+        entry = np.zeros(100)
+        cache = ResultCache(str(tmp_path), max_bytes=10**9)
+        for key in ['a', 'b', 'c']:
+            cache.put(key, entry)
+        entry_bytes = os.path.getsize(tmp_path / 'a.npy')
+        for age, key in enumerate(['a', 'b', 'c']):
+            os.utime(tmp_path / f'{key}.npy', ns=(age * 10**9, age * 10**9))
+        cache.get('a')
+        cache.max_bytes = 2 * entry_bytes
+        cache.evict()
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+
+
+class TestCachedCommands:
+    """Test simulate and analyze reusing cached results."""
+
+    def test_simulate_cache_hit_skips_simulation(self, tmp_path, monkeypatch):
+        """Test that a repeated seeded simulate writes the same file without simulating."""
+        runner = CliRunner()
+        args = ["simulate", "0.1", "0.3", "0.05", "5", "20", "200"]
+        first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+        result = runner.invoke(app, [*args, str(first), "--seed", "7"])
+        assert result.exit_code == 0, result.output
+        def no_simulation(*args, **kwargs):
+            raise AssertionError("simulation should come from the cache")
+        monkeypatch.setattr(virus, "make_simulation", no_simulation)
+        result = runner.invoke(app, [*args, str(second), "--seed", "7"])
+        assert result.exit_code == 0, result.output
+        assert "loaded from the result cache" in result.output
+        assert second.read_text() == first.read_text()
+
+    def test_no_cache_recomputes(self, tmp_path, monkeypatch):
+        """Test that --no-cache neither reads nor writes the cache."""
+        runner = CliRunner()
+        args = ["analyze", "3", "0.1", "0.3", "0.05", "10", "5", "200"]
+        result = runner.invoke(app, [*args, str(tmp_path / "a.csv"), "--seed", "7"])
+        assert result.exit_code == 0, result.output
+        calls = []
+        real_run_trial = virus.run_trial
+        def counting_run_trial(*trial_args):
+            calls.append(1)
+            return real_run_trial(*trial_args)
+        monkeypatch.setattr(virus, "run_trial", counting_run_trial)
+        result = runner.invoke(app, [*args, str(tmp_path / "b.csv"), "--seed", "7", "--no-cache"])
+        assert result.exit_code == 0, result.output
+        assert len(calls) == 3
+        assert (tmp_path / "b.csv").read_text() == (tmp_path / "a.csv").read_text()
+        result = runner.invoke(app, [*args, str(tmp_path / "c.csv"), "--seed", "7"])
+        assert result.exit_code == 0, result.output
+        assert len(calls) == 3
+        assert (tmp_path / "c.csv").read_text() == (tmp_path / "a.csv").read_text()
+
+    def test_unseeded_runs_leave_cache_empty(self, isolated_result_cache, tmp_path):
+        """Test that runs without --seed neither store nor evict entries."""
+        runner = CliRunner()
+        for command in (["simulate", "0.1", "0.3", "0.05", "5", "20", "200", str(tmp_path / "s.csv")],
+                        ["analyze", "3", "0.1", "0.3", "0.05", "10", "5", "200", str(tmp_path / "a.csv")]):
+            result = runner.invoke(app, command)
+            assert result.exit_code == 0, result.output
+        assert not isolated_result_cache.exists() or not any(isolated_result_cache.iterdir())
@@ -0,0 +1,103 @@
+"""
+Unit tests for ResultSink - streaming CSV/Parquet output.
+
+Tests cover batching, appending, missing values, and streaming the daily
+counts of Simulation.run.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from virus import ResultSink, Simulation, STATUS_COLUMNS, ANALYZE_COLUMNS
+
+
+class TestCsvSink:
+    """Test ResultSink writing CSV files."""
+    
+    def test_writes_header_and_rows(self, tmp_path):
+        """Test that rows are written after the header in column order."""
+        path = tmp_path / "out.csv"
+        with ResultSink(str(path), ANALYZE_COLUMNS) as sink:
+            sink.write({'AVG_INFECTED': 1.5, 'AVG_DEATHS': 2.0, 'AVG_DEATH_STDV': 0.5, 'Trial': 0})
+            sink.write([3.0, 4.0, 1.0])
+        assert path.read_text() == "AVG_INFECTED,AVG_DEATHS,AVG_DEATH_STDV\n1.5,2.0,0.5\n3.0,4.0,1.0\n"
+    
+    def test_flushes_every_batch(self, tmp_path):
+        """Test that full batches reach disk before the sink is closed."""
+        path = tmp_path / "out.csv"
+        sink = ResultSink(str(path), ['a'], flush_every=2)
+        sink.write([1])
+        assert path.read_text() == "a\n"
+        sink.write([2])
+        assert path.read_text() == "a\n1\n2\n"
+        sink.close()
+    
+    def test_append_keeps_existing_rows(self, tmp_path):
+        """Test that append mode adds rows without repeating the header."""
+        path = tmp_path / "out.csv"
+        with ResultSink(str(path), ['a']) as sink:
+            sink.write([1])
+        with ResultSink(str(path), ['a'], append=True) as sink:
+            sink.write([2])
+        assert path.read_text() == "a\n1\n2\n"
+    
+    def test_nan_written_as_empty_field(self, tmp_path):
+        """Test that missing values are written like pandas writes them."""
+        path = tmp_path / "out.csv"
+        with ResultSink(str(path), ['a', 'b']) as sink:
+            sink.write([np.float64(1.0), np.nan])
+        assert path.read_text() == "a,b\n1.0,\n"
+    
+    def test_truncate_to_position(self, tmp_path):
+        """Test that rows written after tell() are discarded by truncate."""
+        path = tmp_path / "out.csv"
+        with ResultSink(str(path), ['a']) as sink:
+            sink.write([1])
+            sink.flush()
+            position = sink.tell()
+            sink.write([2])
+        ResultSink.truncate(str(path), position)
+        assert path.read_text() == "a\n1\n"
+        with pytest.raises(ValueError, match="shorter"):
+            ResultSink.truncate(str(path), position + 10)
+    
+    def test_invalid_flush_every(self, tmp_path):
+        """Test that a non-positive batch size is rejected."""
+        with pytest.raises(ValueError, match="flush_every"):
+            ResultSink(str(tmp_path / "out.csv"), ['a'], flush_every=0)
+
+
+class TestParquetSink:
+    """Test ResultSink writing Parquet datasets."""
+    
+    def test_parts_read_back_as_one_table(self, tmp_path):
+        """Test that each flushed batch is a readable part of the dataset."""
+        pytest.importorskip("pyarrow")
+        path = tmp_path / "out.parquet"
+        with ResultSink(str(path), ['a', 'b'], flush_every=2) as sink:
+            sink.write_many([[1, 2.0], [3, 4.0], [5, 6.0]])
+        assert len(list(path.iterdir())) == 2
+        df = pd.read_parquet(path)
+        assert list(df['a']) == [1, 3, 5]
+
+    def test_missing_pyarrow_rejected(self, tmp_path, monkeypatch):
+        """Test that Parquet output without pyarrow installed raises ImportError before creating the dataset."""
+        monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+        path = tmp_path / "out.parquet"
+        with pytest.raises(ImportError, match="pyarrow"):
+            ResultSink(str(path), ['a', 'b'])
+        assert not path.exists()
+
+
+class TestRunStreaming:
+    """Test that Simulation.run streams each day's counts to a sink."""
+    
+    def test_streamed_rows_match_returned_dataframe(self, tmp_path):
+        """Test that the file written during run() matches the returned DataFrame."""
+        path = tmp_path / "simulate.csv"
+        sim = Simulation(population=50, infected=5, vaccinated=5)
+        with ResultSink(str(path), STATUS_COLUMNS, flush_every=3) as sink:
+            df = sim.run(tprob=0.3, dprob=0.2, days=25, sink=sink)
+        written = pd.read_csv(path)
+        assert len(written) == 25
+        assert (written.to_numpy() == df.to_numpy()).all()
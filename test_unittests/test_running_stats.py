@@ -0,0 +1,288 @@
+"""
+Unit tests for RunningStats and QuantileSketch - streaming statistics.
+
+Tests cover the Welford mean and variance, merging, quantile sketches,
+per-day statistics of Simulation.run, confidence intervals, the
+convergence check, and analyze stopping early with --target-ci.
+"""
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+import virus
+from virus import app, RunningStats, QuantileSketch, Simulation, NumpySimulation, ci_converged
+
+
+class TestRunningStats:
+    """Test the Welford accumulator."""
+
+    def test_matches_numpy(self):
+        """Test that the running mean and variance match a two-pass computation."""
+        values = np.random.default_rng(0).normal(1e6, 3.0, 1000)
+        stats = RunningStats()
+        for value in values:
+            stats.add(value)
+        assert stats.count == 1000
+        assert stats.mean == pytest.approx(values.mean())
+        assert stats.variance == pytest.approx(values.var(ddof=1))
+
+    def test_skips_nan(self):
+        """Test that NaN values are not counted."""
+        stats = RunningStats()
+        for value in [1.0, float('nan'), 3.0]:
+            stats.add(value)
+        assert stats.count == 2
+        assert stats.mean == 2.0
+
+    def test_min_max(self):
+        """Test that the extremes are tracked."""
+        stats = RunningStats()
+        for value in [3.0, -1.0, 7.0]:
+            stats.add(value)
+        assert (stats.min, stats.max) == (-1.0, 7.0)
+
+    def test_repeated_value_matches_single_adds(self):
+        """Test that adding copies of a value in one step matches adding them one by one."""
+        bulk, single = RunningStats(quantiles=True), RunningStats(quantiles=True)
+        for stats in (bulk, single):
+            for value in [4.0, 9.0, 1.0]:
+                stats.add(value)
+        bulk.add(6.0, 500)
+        for _ in range(500):
+            single.add(6.0)
+        assert bulk.count == single.count == 503
+        assert bulk.mean == pytest.approx(single.mean)
+        assert bulk.variance == pytest.approx(single.variance)
+        assert (bulk.min, bulk.max) == (single.min, single.max)
+        assert bulk.quantile(0.5) == single.quantile(0.5)
+
+    def test_per_element_counts(self):
+        """Test that per-element copy counts leave elements with a count of 0 unchanged."""
+        stats = RunningStats()
+        stats.add(np.array([1.0, 2.0]))
+        stats.add(np.array([5.0, 7.0]), np.array([3, 0]))
+        np.testing.assert_array_equal(stats.count, [4, 1])
+        np.testing.assert_array_equal(stats.max, [5.0, 2.0])
+        assert stats.mean[1] == 2.0
+        assert np.isnan(stats.std[1])
+        assert stats.std[0] == pytest.approx(np.std([1, 5, 5, 5], ddof=1))
+
+    def test_merge_matches_single_pass(self):
+        """Test that merging two accumulators equals adding every value to one."""
+        values = np.random.default_rng(1).exponential(5.0, 500)
+        whole, left, right = RunningStats(quantiles=True), RunningStats(quantiles=True), RunningStats(quantiles=True)
+        for value in values:
+            whole.add(value)
+        for value in values[:123]:
+            left.add(value)
+        for value in values[123:]:
+            right.add(value)
+        left.merge(right)
+        assert left.count == whole.count
+        assert left.mean == pytest.approx(whole.mean)
+        assert left.variance == pytest.approx(whole.variance)
+        assert (left.min, left.max) == (whole.min, whole.max)
+        assert left.quantile(0.5) == whole.quantile(0.5)
+
+    def test_round_trip_through_dict(self):
+        """Test that a saved accumulator continues exactly where it stopped."""
+        stats = RunningStats(quantiles=True)
+        for value in [1.0, 2.0, 4.0]:
+            stats.add(value)
+        restored = RunningStats.from_dict(stats.to_dict())
+        for accumulator in (stats, restored):
+            accumulator.add(8.0)
+        assert restored.to_dict() == stats.to_dict()
+
+    def test_arrays_match_scalars(self):
+        """Test that array values give bit-identical per-element results to scalar accumulators."""
+        values = np.random.default_rng(2).integers(0, 1000, (30, 4))
+        columns = RunningStats()
+        scalars = [RunningStats() for _ in range(4)]
+        for row in values:
+            columns.add(row)
+            for stats, value in zip(scalars, row):
+                stats.add(value)
+        assert list(columns.mean) == [stats.mean for stats in scalars]
+        assert list(columns.std) == [stats.std for stats in scalars]
+
+    def test_half_width(self):
+        """Test the 95% interval against 1.96 standard errors, and infinity before two values."""
+        stats = RunningStats()
+        stats.add(1.0)
+        assert stats.half_width() == float('inf')
+        for value in [2.0, 3.0, 4.0]:
+            stats.add(value)
+        assert stats.half_width(0.95) == pytest.approx(1.959964 * np.std([1, 2, 3, 4], ddof=1) / 2)
+
+
+class TestQuantileSketch:
+    """Test the DDSketch quantile estimates."""
+
+    def test_relative_accuracy(self):
+        """Test that quantiles are within the relative accuracy of the exact ones."""
+        values = np.random.default_rng(3).lognormal(3.0, 1.5, 20000)
+        sketch = QuantileSketch(0.01)
+        for value in values:
+            sketch.add(value)
+        for q in [0.01, 0.25, 0.5, 0.9, 0.99]:
+            exact = np.quantile(values, q, method='lower')
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+
+    def test_memory_bounded_by_value_range(self):
+        """Test that the number of buckets does not grow with the number of values."""
+        sketch = QuantileSketch(0.01)
+        for value in np.random.default_rng(4).uniform(1, 100, 50000):
+            sketch.add(value)
+        assert len(sketch.to_dict()['positive']) < 240
+
+    def test_zero_negative_and_empty(self):
+        """Test zeros and negative values, and NaN from an empty sketch."""
+        sketch = QuantileSketch()
+        assert np.isnan(sketch.quantile(0.5))
+        for value in [-10.0, 0.0, 0.0, 5.0]:
+            sketch.add(value)
+        assert sketch.quantile(0.0) == pytest.approx(-10.0, rel=0.01)
+        assert sketch.quantile(0.5) == 0.0
+        assert sketch.quantile(1.0) == pytest.approx(5.0, rel=0.01)
+
+    def test_merge_requires_same_accuracy(self):
+        """Test that sketches of different accuracy cannot be merged."""
+        with pytest.raises(ValueError, match="accuracy"):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+class TestDailyStats:
+    """Test the per-day statistics Simulation.run keeps as it goes."""
+
+    def test_run_matches_calculate_stats(self):
+        """Test that run's daily_stats equal calculate_stats of the returned counts, filled days included."""
+        sim = NumpySimulation(population=500, infected=5, vaccinated=0, rng=np.random.default_rng(5))
+        counts = sim.run(0.3, 0.2, 80, as_array=True)
+        assert sim.extinction_day is not None
+        assert Simulation.summarize_days(sim.daily_stats) == Simulation.calculate_stats(counts)
+        assert Simulation.calculate_stats(counts)[2] == pytest.approx(counts[:, 4].std(ddof=1))
+
+    def test_extinct_days_added_in_one_step(self, monkeypatch):
+        """Test that the days after extinction are added with one call, not one per day."""
+        sim = NumpySimulation(population=500, infected=5, vaccinated=0, rng=np.random.default_rng(5))
+        calls = []
+        real_add_day = Simulation.add_day
+        def counting_add_day(daily_stats, row, ndays=1):
+            calls.append(ndays)
+            real_add_day(daily_stats, row, ndays)
+        monkeypatch.setattr(Simulation, "add_day", staticmethod(counting_add_day))
+        sim.run(0.3, 0.2, 1000, as_array=True)
+        assert len(calls) == sim.extinction_day + 2
+        assert calls[-1] == 1000 - sim.extinction_day - 1
+
+
+class TestConvergence:
+    """Test ci_converged."""
+
+    def test_requires_every_metric(self):
+        """Test that every measured metric must be within the target."""
+        narrow, wide = RunningStats(), RunningStats()
+        for value in [100.0, 101.0, 99.0, 100.0]:
+            narrow.add(value)
+        for value in [1.0, 100.0, 50.0, 3.0]:
+            wide.add(value)
+        assert ci_converged({'a': narrow}, 0.05, 0.95)
+        assert not ci_converged({'a': narrow, 'b': wide}, 0.05, 0.95)
+
+    def test_not_converged_without_values(self):
+        """Test that no trials never count as converged, while all-NaN metrics are ignored."""
+        assert not ci_converged({'a': RunningStats()}, 0.05, 0.95)
+        constant, empty = RunningStats(), RunningStats()
+        for _ in range(3):
+            constant.add(0.0)
+        assert ci_converged({'a': constant, 'b': empty}, 0.05, 0.95)
+
+
+class TestTargetCi:
+    """Test analyze with --target-ci."""
+
+    def test_stops_early_for_any_worker_count(self, tmp_path):
+        """Test that analyze stops at a batch boundary and gives the same file for 1 and 2 workers."""
+        runner = CliRunner()
+        args = ["analyze", "1000", "0.1", "0.3", "0.05", "30", "10", "500"]
+        options = ["--engine", "numpy", "--seed", "1", "--target-ci", "0.05", "--ci-batch", "20", "--no-cache"]
+        result = runner.invoke(app, [*args, str(tmp_path / "one.csv"), *options])
+        assert result.exit_code == 0, result.output
+        assert "(converged)" in result.output
+        rows = len((tmp_path / "one.csv").read_text().splitlines()) - 1
+        assert rows < 1000 and rows % 20 == 0
+        assert f"Trials used: {rows} of 1000" in result.output
+        result = runner.invoke(app, [*args, str(tmp_path / "two.csv"), *options, "--workers", "2"])
+        assert result.exit_code == 0, result.output
+        assert (tmp_path / "two.csv").read_text() == (tmp_path / "one.csv").read_text()
+
+    def test_each_trial_is_its_own_task(self, tmp_path, monkeypatch):
+        """Test that a ci_batch round is split into one-trial tasks, so it can occupy up to ci_batch workers."""
+        import virus
+        sizes = []
+        real_run_trial_chunk = virus.run_trial_chunk
+        def recording_run_trial_chunk(engine, seeds, *args):
+            sizes.append(len(seeds))
+            return real_run_trial_chunk(engine, seeds, *args)
+        monkeypatch.setattr(virus, "run_trial_chunk", recording_run_trial_chunk)
+        result = CliRunner().invoke(app, ["analyze", "12", "0.1", "0.3", "0.05", "10", "5", "200", str(tmp_path / "a.csv"),
+                                          "--seed", "1", "--target-ci", "1e-9", "--ci-batch", "8", "--no-cache"])
+        assert result.exit_code == 0, result.output
+        assert sizes == [1] * 12
+
+    def test_budget_reached(self, tmp_path):
+        """Test that an unreachable target runs the whole budget and says so."""
+        runner = CliRunner()
+        result = runner.invoke(app, ["analyze", "6", "0.1", "0.3", "0.05", "10", "5", "200", str(tmp_path / "a.csv"),
+                                     "--seed", "1", "--target-ci", "1e-9", "--ci-batch", "4"])
+        assert result.exit_code == 0, result.output
+        assert "Trials used: 6 of 6 (budget reached before convergence)" in result.output
+
+    def test_invalid_options(self, tmp_path):
+        """Test that out-of-range options are rejected."""
+        runner = CliRunner()
+        args = ["analyze", "6", "0.1", "0.3", "0.05", "10", "5", "200", str(tmp_path / "a.csv")]
+        for options in (["--target-ci", "0"], ["--confidence", "1.5"], ["--ci-batch", "1"]):
+            result = runner.invoke(app, [*args, *options])
+            assert result.exit_code != 0
+
+
+class TestAnalyzeChunks:
+    """Test the per-chunk statistics analyze merges from its workers."""
+
+    def test_merged_chunks_match_all_rows(self):
+        """Test that merging each chunk's statistics equals summarizing every row."""
+        seeds = np.random.SeedSequence(9).spawn(6)
+        args = (virus.Engine.NUMPY, 200, 5, 0, 0.3, 0.05, 10)
+        rows, merged = [], virus.summarize_trials([])
+        for first in range(0, 6, 2):
+            chunk_rows, chunk_stats = virus.run_trial_chunk(args[0], seeds[first:first + 2], *args[1:])
+            rows += chunk_rows
+            for column, stats in chunk_stats.items():
+                merged[column].merge(stats)
+        for column, stats in virus.summarize_trials(rows).items():
+            assert merged[column].count == stats.count == 6
+            assert merged[column].mean == pytest.approx(stats.mean)
+            assert merged[column].std == pytest.approx(stats.std)
+            assert merged[column].max == stats.max
+
+    def test_cache_entry_built_without_reading_output(self, tmp_path, monkeypatch, isolated_result_cache):
+        """Test that analyze caches the rows it wrote without reading the output file back."""
+        def no_read(filename):
+            raise AssertionError("the output file should not be read back")
+        monkeypatch.setattr(virus, "read_trial_rows", no_read)
+        args = ["analyze", "12", "0.1", "0.3", "0.05", "10", "5", "200", "--seed", "4"]
+        result = CliRunner().invoke(app, [*args[:8], str(tmp_path / "a.csv"), *args[8:]])
+        assert result.exit_code == 0, result.output
+        (entry,) = isolated_result_cache.glob("*.npy")
+        rows = np.loadtxt(tmp_path / "a.csv", delimiter=",", skiprows=1)
+        np.testing.assert_array_equal(np.load(entry), rows)
+
+    def test_large_runs_not_cached(self, tmp_path, monkeypatch, isolated_result_cache):
+        """Test that runs over CACHE_MAX_TRIALS store nothing."""
+        monkeypatch.setattr(virus, "CACHE_MAX_TRIALS", 5)
+        result = CliRunner().invoke(app, ["analyze", "6", "0.1", "0.3", "0.05", "10", "5", "200",
+                                          str(tmp_path / "a.csv"), "--seed", "4"])
+        assert result.exit_code == 0, result.output
+        assert not list(isolated_result_cache.glob("*.npy"))
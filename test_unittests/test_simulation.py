@@ -2,11 +2,17 @@
 Unit tests for the Simulation class - Core integration tests.
 
 Tests cover initialization, state management, and simulation execution.
-Private methods (_handle_susceptible, _handle_infected) are tested indirectly through run().
+Private methods (_handle_susceptible, _handle_infected) are tested directly and against step's bulk update.
 """
 
+import os
+import random
+import signal
+from unittest.mock import Mock
 import pytest
-from virus import Simulation, Person, HS
+import numpy as np
+from virus import (Simulation, NumpySimulation, BatchedSimulation, Person, Population, Profiler, HS, Engine, MAX_SICK_DAYS, STATUS_COLUMNS,
+                   CompartmentalSimulation, ContactGraph, ContactModel, ContactNetwork, MappedSimulation, exposure_probability, make_simulation, run_trial, run_trial_block, default_batch_size)
 import pandas as pd
 
 
@@ -105,6 +111,25 @@ class TestCalculateStats:
         assert avg_deaths == 0.4
 
 
+class TestRawCountArray:
+    """Test run(..., as_array=True) and calculate_stats on the raw count array."""
+    
+    def test_returns_days_by_six_integer_array(self):
+        """Test that the raw result is a preallocated days x 6 integer array."""
+        sim = Simulation(population=10, infected=2, vaccinated=2)
+        counts = sim.run(tprob=0.1, dprob=0.1, days=7, as_array=True)
+        assert isinstance(counts, np.ndarray)
+        assert counts.shape == (7, len(STATUS_COLUMNS))
+        assert counts.dtype.kind == 'i'
+        assert list(counts[:, 0]) == list(range(7))
+    
+    def test_stats_match_dataframe_stats(self, sample_dataframe):
+        """Test that calculate_stats gives the same result for an array and a DataFrame."""
+        sim = Simulation(population=10, infected=1, vaccinated=0)
+        counts = sample_dataframe[STATUS_COLUMNS].to_numpy()
+        assert sim.calculate_stats(counts) == pytest.approx(sim.calculate_stats(sample_dataframe))
+
+
 class TestSimulationRun:
     """Test the run method - core simulation loop (tests private methods indirectly)."""
     
@@ -195,3 +220,637 @@ class TestSimulationRun:
         
         # At least some state change should occur
         assert (final_dead + final_recovered) > 0
+
+
+class TestExposureProbability:
+    """Test the exposure_probability helper used by the vectorized engine."""
+    
+    def test_no_infected_means_no_exposure(self):
+        """Test that nobody can be exposed when nobody is infected."""
+        assert exposure_probability(100, 0) == 0.0
+    
+    def test_everyone_infected_means_certain_exposure(self):
+        """Test that every contact is infected when the whole population is."""
+        assert exposure_probability(100, 100) == pytest.approx(1.0)
+    
+    def test_matches_sampled_contacts(self):
+        """Test that the closed form agrees with sampling contacts like _handle_susceptible."""
+        rng = random.Random(1234)
+        population = list(range(50))
+        infected = set(range(5))
+        trials = 20000
+        exposed = 0
+        for _ in range(trials):
+            nexposures = rng.randint(1, 8)
+            contacts = rng.sample(population, rng.randint(1, min(nexposures, len(population))))
+            exposed += any(contact in infected for contact in contacts)
+        assert exposed / trials == pytest.approx(exposure_probability(50, 5), abs=0.01)
+    
+    def test_contact_weights_are_point_probabilities(self):
+        """Test that CONTACT_WEIGHTS rows are the distribution of the number of contacts."""
+        from virus import CONTACT_WEIGHTS, MAX_DAILY_CONTACTS
+        np.testing.assert_allclose(CONTACT_WEIGHTS[1:].sum(axis=1), 1.0)
+        # 8 reachable people: P(one contact) = (1/8) * sum over exposures n of 1/n
+        assert CONTACT_WEIGHTS[MAX_DAILY_CONTACTS, 0] == pytest.approx(sum(1 / n for n in range(1, 9)) / 8)
+        assert CONTACT_WEIGHTS[MAX_DAILY_CONTACTS, -1] == pytest.approx(1 / 64)
+
+    def test_vectorized_over_infected_counts(self):
+        """Test that an array of infected counts returns one probability each."""
+        result = exposure_probability(100, np.array([0, 10, 100]))
+        assert result.shape == (3,)
+        assert result[0] == 0.0 and 0 < result[1] < 1
+
+
+class TestEarlyTermination:
+    """Test that run() stops once the epidemic has burned out."""
+    
+    @pytest.mark.parametrize("simulation_class", [Simulation, NumpySimulation])
+    def test_series_keeps_full_length_after_extinction(self, simulation_class):
+        """Test that the remaining days are filled with the final counts."""
+        sim = simulation_class(population=30, infected=30, vaccinated=0)
+        df = sim.run(tprob=0.0, dprob=1.0, days=10)
+        assert sim.extinction_day == 0
+        assert list(df['Day']) == list(range(10))
+        assert all(df[HS.DEAD] == 30)
+        assert all(df[HS.INFECTED] == 0)
+    
+    def test_no_extinction_day_while_infections_continue(self):
+        """Test that extinction_day is None when infected people remain at the end."""
+        sim = Simulation(population=20, infected=20, vaccinated=0)
+        sim.run(tprob=0.0, dprob=0.0, days=3)
+        assert sim.extinction_day is None
+    
+    def test_stats_see_full_series(self):
+        """Test that calculate_stats averages over every day, including filled ones."""
+        sim = Simulation(population=10, infected=10, vaccinated=0)
+        counts = sim.run(tprob=0.0, dprob=1.0, days=4, as_array=True)
+        avg_infected, avg_deaths, deaths_stdv = sim.calculate_stats(counts)
+        assert avg_deaths == 10
+        assert deaths_stdv == 0
+
+
+class TestLiveInfectedCount:
+    """Test that susceptible contact checks use the live infected count."""
+    
+    def test_no_random_draws_when_nobody_infected(self):
+        """Test that the susceptible loop is skipped entirely when nobody is infected."""
+        rng = random.Random(5)
+        sim = Simulation(population=50, infected=0, vaccinated=0, rng=rng)
+        state = rng.getstate()
+        sim.run(tprob=1.0, dprob=0.5, days=10)
+        assert rng.getstate() == state
+    
+    def test_exposure_probability_follows_infected_count(self):
+        """Test that the cached exposure probability matches the closed form."""
+        sim = Simulation(population=100, infected=10, vaccinated=0)
+        assert sim._exposure_probability(10) == pytest.approx(exposure_probability(100, 10))
+        assert sim._exposure_probability(0) == 0.0
+    
+    def test_exposed_susceptible_is_infected(self):
+        """Test that a susceptible person is infected when the exposure draw succeeds."""
+        sim = Simulation(population=20, infected=19, vaccinated=0, rng=Mock(random=Mock(return_value=0.0)))
+        status_counts = sim.health_status_dict()
+        person = next(p for p in sim.population if p.health_status == HS.SUSCEPTIBLE)
+        person.transmission_rate = 0.0
+        sim._handle_susceptible(person, status_counts, tprob=0.5)
+        assert person.health_status == HS.INFECTED
+        assert status_counts[HS.INFECTED] == 20
+
+
+    @pytest.mark.parametrize("synchronous", [False, True])
+    def test_step_matches_per_person_updates(self, synchronous, monkeypatch):
+        """Test that step's bulk update draws and transitions exactly like update_person_status on each person."""
+        import virus
+        # several chunks, the last one partial
+        monkeypatch.setattr(virus, "PERSON_CHUNK", 300)
+        bulk = Simulation(population=2000, infected=20, vaccinated=100, rng=random.Random(8), synchronous=synchronous)
+        single = Simulation(population=2000, infected=20, vaccinated=100, rng=random.Random(8), synchronous=synchronous)
+        bulk_counts, single_counts = bulk.health_status_dict(), single.health_status_dict()
+        for _ in range(20):
+            bulk.step(bulk_counts, tprob=0.4, dprob=0.05)
+            infected = single_counts[HS.INFECTED] if synchronous else None
+            for person in list(single.population):
+                single.update_person_status(person, single_counts, 0.4, 0.05, infected=infected)
+        assert bulk_counts == single_counts
+        np.testing.assert_array_equal(bulk.population.health_status, single.population.health_status)
+        np.testing.assert_array_equal(bulk.population.sick_days, single.population.sick_days)
+
+
+class TestRunValidation:
+    """Test that probabilities are validated once when a run starts."""
+    
+    @pytest.mark.parametrize("tprob, dprob, name", [(-0.1, 0.1, "tprob"), (0.1, 1.5, "dprob")])
+    def test_invalid_probability_rejected_before_simulating(self, tprob, dprob, name):
+        """Test that run raises even when nobody would ever reach the per-person checks."""
+        sim = Simulation(population=10, infected=0, vaccinated=10)
+        with pytest.raises(ValueError, match=f"{name} must be between 0 and 1"):
+            sim.run(tprob, dprob, days=5)
+    
+    def test_batched_run_validates(self):
+        """Test that the batched engine validates probabilities too."""
+        sim = BatchedSimulation(np.random.SeedSequence(0).spawn(2), population=10, infected=1, vaccinated=0)
+        with pytest.raises(ValueError, match="tprob"):
+            sim.run(2.0, 0.1, days=5)
+    
+    def test_hot_path_matches_validated_methods(self):
+        """Test that the unchecked methods agree with die_or_not and calculate_adjusted_sick_days."""
+        person = Person(health_status=HS.INFECTED, sick_days=4)
+        for rand_dprob in [0.0, 0.2, 0.7]:
+            assert person.check_if_survive(0.3, rand_dprob, 0.5, person) == person.die_or_not(0.3, rand_dprob, 0.5, person)
+        assert person._adjusted_sick_days(person, 0.5) == person.calculate_adjusted_sick_days(person, 0.5)
+
+
+class TestProfiler:
+    """Test per-day profiling of runs."""
+    
+    @pytest.mark.parametrize("engine", list(Engine))
+    def test_transitions_add_up_to_counts(self, engine):
+        """Test that per-day transitions sum to the changes in the daily counts."""
+        sim = make_simulation(engine, 300, 5, 30, seed=np.random.SeedSequence(3))
+        sim.profiler = Profiler()
+        counts = sim.run(0.4, 0.05, days=20, as_array=True)
+        days = sim.profiler.to_dict()['days']
+        simulated = 20 if sim.extinction_day is None else sim.extinction_day + 1
+        assert [day['day'] for day in days] == list(range(simulated))
+        assert sum(day['infections'] for day in days) == 300 - 5 - 30 - counts[-1, STATUS_COLUMNS.index(HS.SUSCEPTIBLE)]
+        assert sum(day['deaths'] for day in days) == counts[-1, STATUS_COLUMNS.index(HS.DEAD)]
+        assert sum(day['recoveries'] for day in days) == counts[-1, STATUS_COLUMNS.index(HS.RECOVERED)]
+        assert sim.profiler.phases['step']['calls'] == simulated
+    
+    def test_batched_transitions_summed_over_trials(self):
+        """Test that a block's per-day transitions are the sum of its trials'."""
+        seeds = np.random.SeedSequence(4).spawn(3)
+        sim = BatchedSimulation(seeds, population=200, infected=5, vaccinated=0)
+        sim.profiler = Profiler()
+        counts = sim.run(0.4, 0.05, days=10)
+        days = sim.profiler.to_dict()['days']
+        assert sum(day['deaths'] for day in days) == counts[:, -1, STATUS_COLUMNS.index(HS.DEAD)].sum()
+    
+    def test_merge_sums_profiles(self):
+        """Test that merging adds phase totals and per-day entries by day index."""
+        profiler = Profiler()
+        profiler.record_day(0, 0.5, infections=2, deaths=1, recoveries=0)
+        other = Profiler()
+        other.record_day(0, 0.25, infections=3, deaths=0, recoveries=1)
+        other.record_day(1, 0.25, infections=1, deaths=0, recoveries=0)
+        profiler.merge(other.to_dict())
+        assert profiler.phases['step'] == {'seconds': 1.0, 'calls': 3}
+        assert profiler.to_dict()['days'][0] == {'day': 0, 'seconds': 0.75, 'calls': 2, 'infections': 5, 'deaths': 1, 'recoveries': 1}
+    
+    def test_profiling_off_by_default(self):
+        """Test that simulations have no profiler unless one is attached."""
+        assert Simulation(population=10, infected=1, vaccinated=0).profiler is None
+
+
+class TestSynchronousMode:
+    """Test the python engine's synchronous daily update."""
+    
+    def record_exposures(self, sim):
+        """Wrap sim._exposure_probability to record the infected counts it is asked about."""
+        seen = []
+        exposure = sim._exposure_probability
+        def recording_exposure(infected):
+            seen.append(infected)
+            return exposure(infected)
+        sim._exposure_probability = recording_exposure
+        return seen
+    
+    def test_exposure_uses_start_of_day_count(self):
+        """Test that every susceptible person's exposure uses the day's starting infected count."""
+        sim = Simulation(population=500, infected=20, vaccinated=0, rng=random.Random(1), synchronous=True)
+        seen = self.record_exposures(sim)
+        status_counts = sim.health_status_dict()
+        sim.step(status_counts, tprob=1.0, dprob=0.0)
+        assert status_counts[HS.INFECTED] > 20
+        assert set(seen) == {20}
+    
+    def test_in_place_mode_uses_live_count(self):
+        """Test that the default mode lets earlier infections raise later exposure the same day."""
+        sim = Simulation(population=500, infected=20, vaccinated=0, rng=random.Random(1))
+        seen = self.record_exposures(sim)
+        sim.step(sim.health_status_dict(), tprob=1.0, dprob=0.0)
+        assert max(seen) > 20
+    
+    def test_updates_in_place(self):
+        """Test that a synchronous day updates the population without copying it."""
+        sim = Simulation(population=200, infected=20, vaccinated=0, rng=random.Random(2), synchronous=True)
+        population = sim.population
+        status_counts = sim.health_status_dict()
+        sim.step(status_counts, tprob=1.0, dprob=0.5)
+        assert sim.population is population
+        assert (population.health_status == HS.INFECTED).sum() == status_counts[HS.INFECTED]
+    
+    def test_conservation_of_population(self):
+        """Test that synchronous runs keep the population constant."""
+        sim = make_simulation(Engine.PYTHON, 300, 5, 30, seed=np.random.SeedSequence(5), synchronous=True)
+        counts = sim.run(0.4, 0.05, days=30, as_array=True)
+        assert (counts[:, 1:].sum(axis=1) == 300).all()
+
+
+class TestPopulation:
+    """Test the struct-of-arrays population and its Person views."""
+    
+    def test_compact_dtypes(self):
+        """Test that each person is stored in 7 bytes."""
+        sim = Simulation(population=100, infected=10, vaccinated=20)
+        assert sim.population.health_status.dtype == np.int8
+        assert sim.population.sick_days.dtype == np.uint16
+        assert sim.population.transmission_rate.dtype == np.float32
+        assert sim.population.nbytes == 7 * 100
+
+    def test_peak_memory_stays_near_stored_population(self, monkeypatch):
+        """Test that building and stepping a simulation never holds per-person Python lists."""
+        import tracemalloc
+        import virus
+        monkeypatch.setattr(virus, "PERSON_CHUNK", 1_000)
+        population = 50_000
+        tracemalloc.start()
+        try:
+            sim = Simulation(population=population, infected=500, vaccinated=0, rng=random.Random(2))
+            build_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            sim.step(sim.health_status_dict(), tprob=0.4, dprob=0.05)
+            step_peak = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+        # whole-population lists cost about 50 bytes per person; what remains is the exposure cache
+        assert build_peak < 20 * population
+        assert step_peak < 8 * population
+
+    def test_views_write_through(self):
+        """Test that updates made through a view land in the arrays."""
+        population = Population.from_persons([Person(health_status=HS.SUSCEPTIBLE, transmission_rate=0.25)] * 3)
+        person = population[1]
+        assert isinstance(person, Person)
+        assert person.health_status is HS.SUSCEPTIBLE
+        assert person.transmission_rate == 0.25
+        person.health_status = HS.INFECTED
+        person.sick_days += 2
+        assert population.health_status.tolist() == [HS.SUSCEPTIBLE, HS.INFECTED, HS.SUSCEPTIBLE]
+        assert population.sick_days.tolist() == [0, 2, 0]
+    
+    def test_person_methods_work_on_views(self):
+        """Test that catch_or_not and die_or_not accept views like Person objects."""
+        population = Population.from_persons([Person(health_status=HS.SUSCEPTIBLE, transmission_rate=0.1),
+                                              Person(health_status=HS.INFECTED, sick_days=3)])
+        person, contact = population
+        assert person.catch_or_not(0.5, [contact]) is True
+        assert person.catch_or_not(0.05, [contact]) is False
+        assert contact.die_or_not(0.5, 0.2, 0.5, contact) is True
+    
+    def test_index_out_of_range(self):
+        """Test that indexing past the end raises IndexError."""
+        population = Population.from_persons([Person()])
+        assert population[-1].health_status == HS.SUSCEPTIBLE
+        with pytest.raises(IndexError):
+            population[1]
+    
+    def test_mismatched_arrays_rejected(self):
+        """Test that arrays of different lengths raise ValueError."""
+        with pytest.raises(ValueError, match="same length"):
+            Population(np.zeros(3), np.zeros(2), np.zeros(3))
+
+
+class TestNumpySimulation:
+    """Test the vectorized NumPy engine against the same invariants as Simulation.run."""
+    
+    def test_population_distribution(self):
+        """Test that the status array has the requested distribution."""
+        sim = NumpySimulation(population=100, infected=10, vaccinated=20)
+        assert (sim.health_status == HS.INFECTED).sum() == 10
+        assert (sim.health_status == HS.VACCINATED).sum() == 20
+        assert (sim.health_status == HS.SUSCEPTIBLE).sum() == 70
+    
+    def test_returns_same_dataframe_structure(self):
+        """Test that run() returns the same columns and rows as the python engine."""
+        sim = NumpySimulation(population=10, infected=2, vaccinated=2)
+        df = sim.run(tprob=0.1, dprob=0.1, days=5)
+        expected = Simulation(population=10, infected=2, vaccinated=2).run(tprob=0.1, dprob=0.1, days=5)
+        assert list(df.columns) == list(expected.columns)
+        assert list(df['Day']) == [0, 1, 2, 3, 4]
+    
+    def test_conservation_of_population(self):
+        """Test that total population remains constant."""
+        sim = NumpySimulation(population=500, infected=20, vaccinated=50)
+        df = sim.run(tprob=0.3, dprob=0.1, days=30)
+        totals = df[[HS.SUSCEPTIBLE, HS.INFECTED, HS.RECOVERED, HS.DEAD, HS.VACCINATED]].sum(axis=1)
+        assert all(totals == 500)
+    
+    def test_counts_match_status_array(self):
+        """Test that the tracked counts agree with the final status array."""
+        sim = NumpySimulation(population=300, infected=30, vaccinated=30)
+        df = sim.run(tprob=0.5, dprob=0.05, days=20)
+        for status in (HS.SUSCEPTIBLE, HS.INFECTED, HS.RECOVERED, HS.DEAD, HS.VACCINATED):
+            assert df[status].iloc[-1] == (sim.health_status == status).sum()
+    
+    def test_zero_transmission_prevents_spread(self):
+        """Test that tprob=0 prevents all new infections."""
+        sim = NumpySimulation(population=200, infected=10, vaccinated=0)
+        df = sim.run(tprob=0.0, dprob=0.0, days=5)
+        assert all(df[HS.SUSCEPTIBLE] == 190)
+    
+    def test_infected_recover_after_max_sick_days(self):
+        """Test that with dprob=0 every infected person recovers within the sick-day limit."""
+        sim = NumpySimulation(population=50, infected=50, vaccinated=0)
+        df = sim.run(tprob=0.0, dprob=0.0, days=MAX_SICK_DAYS + 1)
+        assert df[HS.RECOVERED].iloc[-1] == 50
+
+
+class TestSeeding:
+    """Test that injected random generators make runs reproducible."""
+    
+    def test_same_rng_seed_gives_same_run(self):
+        """Test that two simulations with equally seeded generators evolve identically."""
+        first = Simulation(population=100, infected=5, vaccinated=10, rng=random.Random(99)).run(0.3, 0.1, 15)
+        second = Simulation(population=100, infected=5, vaccinated=10, rng=random.Random(99)).run(0.3, 0.1, 15)
+        pd.testing.assert_frame_equal(first, second)
+    
+    def test_global_random_state_is_not_used(self):
+        """Test that reseeding the global random module does not affect a seeded run."""
+        random.seed(1)
+        first = Simulation(population=50, infected=5, vaccinated=0, rng=random.Random(7)).run(0.5, 0.1, 10)
+        random.seed(2)
+        second = Simulation(population=50, infected=5, vaccinated=0, rng=random.Random(7)).run(0.5, 0.1, 10)
+        pd.testing.assert_frame_equal(first, second)
+    
+    @pytest.mark.parametrize("engine", [Engine.PYTHON, Engine.NUMPY])
+    def test_make_simulation_seed_sequence(self, engine):
+        """Test that make_simulation derives the engine RNG from the seed sequence."""
+        first = make_simulation(engine, 100, 5, 10, seed=np.random.SeedSequence(11)).run(0.3, 0.1, 15)
+        second = make_simulation(engine, 100, 5, 10, seed=np.random.SeedSequence(11)).run(0.3, 0.1, 15)
+        pd.testing.assert_frame_equal(first, second)
+
+
+class TestRunTrial:
+    """Test run_trial, the unit of work shipped to analyze worker processes."""
+    
+    @pytest.mark.parametrize("engine", [Engine.PYTHON, Engine.NUMPY])
+    def test_same_seed_gives_same_stats(self, engine):
+        """Test that a trial's statistics depend only on its seed."""
+        first = run_trial(engine, np.random.SeedSequence(3), 200, 5, 20, 0.3, 0.05, 10)
+        second = run_trial(engine, np.random.SeedSequence(3), 200, 5, 20, 0.3, 0.05, 10)
+        assert first == second
+    
+    def test_returns_statistics_dict(self):
+        """Test that run_trial fills in the analyze statistics columns."""
+        stats = run_trial(Engine.NUMPY, np.random.SeedSequence(0), 100, 5, 0, 0.3, 0.05, 10)
+        assert set(stats) == {'Trial', 'AVG_DEATHS', 'AVG_DEATH_STDV', 'AVG_INFECTED'}
+
+
+class TestChunkedNumpySimulation:
+    """Test the numpy engine's chunked multi-threaded day update."""
+    
+    def test_reproducible_for_fixed_thread_count(self):
+        """Test that a fixed seed and thread count give identical runs."""
+        runs = [make_simulation(Engine.NUMPY, 5000, 10, 100, seed=np.random.SeedSequence(8), threads=4).run(0.4, 0.05, 30, as_array=True)
+                for _ in range(2)]
+        np.testing.assert_array_equal(runs[0], runs[1])
+    
+    def test_counts_match_population_arrays(self):
+        """Test that the reduced chunk counts agree with the status arrays after every day."""
+        sim = NumpySimulation(population=1001, infected=10, vaccinated=50, rng=np.random.default_rng(2), threads=3)
+        status_counts = sim.health_status_dict()
+        for _ in range(20):
+            sim.step(status_counts, 0.5, 0.05)
+            for status in HS:
+                assert status_counts[status] == (sim.health_status == status).sum()
+    
+    def test_pool_released_after_run(self):
+        """Test that the thread pool only lives for the duration of run."""
+        sim = NumpySimulation(population=500, infected=5, vaccinated=0, rng=np.random.default_rng(1), threads=2)
+        counts = sim.run(0.4, 0.05, 10, as_array=True)
+        assert sim._executor is None
+        assert (counts[:, 1:].sum(axis=1) == 500).all()
+    
+    def test_invalid_thread_count(self):
+        """Test that a non-positive thread count raises ValueError."""
+        with pytest.raises(ValueError, match="threads"):
+            NumpySimulation(population=10, infected=1, vaccinated=0, threads=0)
+
+
+class TestContactGraph:
+    """Test the CSR contact graph and the numpy engine running on it."""
+    
+    def test_from_edges_symmetric_without_duplicates(self):
+        """Test that edges are stored both ways, with self-loops and repeats dropped."""
+        graph = ContactGraph.from_edges([0, 1, 2, 2, 3], [1, 0, 2, 3, 1], 5)
+        neighbours = [sorted(graph.indices[graph.indptr[i]:graph.indptr[i + 1]]) for i in range(5)]
+        assert neighbours == [[1], [0, 3], [3], [1, 2], []]
+        np.testing.assert_array_equal(graph.degree, [1, 2, 1, 2, 0])
+    
+    def test_from_edges_rejects_out_of_range(self):
+        """Test that an endpoint outside the population raises ValueError."""
+        with pytest.raises(ValueError, match="between 0 and 2"):
+            ContactGraph.from_edges([0], [3], 3)
+    
+    def test_small_world_ring_without_rewiring(self):
+        """Test that rewire_prob 0 gives a ring lattice of the requested degree."""
+        graph = ContactGraph.small_world(20, 4, 0.0, np.random.default_rng(0))
+        assert (graph.degree == 4).all()
+        assert sorted(graph.indices[graph.indptr[0]:graph.indptr[1]]) == [1, 2, 18, 19]
+    
+    def test_infected_neighbours(self):
+        """Test that infected neighbours are counted per person."""
+        graph = ContactGraph.from_edges([0, 0, 1, 3], [1, 2, 2, 4], 5)
+        infected = np.array([True, False, True, False, False])
+        np.testing.assert_array_equal(graph.infected_neighbours(infected), [1, 2, 1, 0, 0])
+    
+    def test_exposure_per_person(self):
+        """Test that exposure_probability takes each person's degree as their population."""
+        result = exposure_probability(np.array([1, 10]), np.array([1, 5]))
+        assert result[0] == pytest.approx(1.0)
+        assert result[1] == pytest.approx(exposure_probability(10, 5))
+    
+    def test_infection_stays_in_component(self):
+        """Test that nobody outside the infected people's component is ever infected."""
+        edges = np.arange(99)
+        sim = NumpySimulation(population=200, infected=0, vaccinated=0, rng=np.random.default_rng(3))
+        sim.graph = ContactGraph.from_edges(edges, edges + 1, 200)
+        sim.health_status[0] = HS.INFECTED
+        counts = sim.run(1.0, 0.0, 200, as_array=True)
+        assert (sim.health_status[100:] == HS.SUSCEPTIBLE).all()
+        assert (counts[:, 1:].sum(axis=1) == 200).all()
+    
+    def test_small_world_network_reproducible(self):
+        """Test that seeded small-world runs draw the same graph and counts."""
+        network = ContactNetwork(ContactModel.SMALL_WORLD, degree=6, rewire_prob=0.2)
+        sims = [make_simulation(Engine.NUMPY, 2000, 10, 0, seed=np.random.SeedSequence(5), network=network) for _ in range(2)]
+        np.testing.assert_array_equal(sims[0].graph.indices, sims[1].graph.indices)
+        runs = [sim.run(0.5, 0.05, 30, as_array=True) for sim in sims]
+        np.testing.assert_array_equal(runs[0], runs[1])
+    
+    def test_well_mixed_network_has_no_graph(self):
+        """Test that the default network leaves the well-mixed engine unchanged."""
+        sim = make_simulation(Engine.NUMPY, 100, 5, 0, seed=np.random.SeedSequence(1), network=ContactNetwork())
+        assert sim.graph is None
+    
+    def test_python_engine_rejects_graph(self):
+        """Test that only the numpy engine accepts a contact graph."""
+        with pytest.raises(ValueError, match="numpy"):
+            make_simulation(Engine.PYTHON, 100, 5, 0, network=ContactNetwork(ContactModel.SMALL_WORLD))
+
+
+class TestMappedSimulation:
+    """Test the memory-mapped, tiled out-of-core engine."""
+    
+    def test_initial_population_in_mapped_files(self, tmp_path):
+        """Test that the population is built in .npy files with exact status counts."""
+        sim = MappedSimulation(population=5000, infected=10, vaccinated=300, state_dir=str(tmp_path), rng=np.random.default_rng(1), tile_size=999)
+        assert isinstance(sim.health_status, np.memmap)
+        assert (tmp_path / "health_status.npy").exists()
+        assert (sim.health_status == HS.INFECTED).sum() == 10
+        assert (sim.health_status == HS.VACCINATED).sum() == 300
+        assert sim.sick_days.sum() == 10
+    
+    def test_counts_match_mapped_arrays(self, tmp_path):
+        """Test that the tile counts agree with the status arrays after every day."""
+        sim = MappedSimulation(population=1001, infected=10, vaccinated=50, state_dir=str(tmp_path), rng=np.random.default_rng(2), tile_size=100)
+        status_counts = sim.health_status_dict()
+        for _ in range(20):
+            sim.step(status_counts, 0.5, 0.05)
+            for status in HS:
+                assert status_counts[status] == (sim.health_status == status).sum()
+    
+    def test_continue_matches_uninterrupted_run(self, tmp_path):
+        """Test that a run continued from its saved state matches one run straight through."""
+        full = MappedSimulation(3000, 10, 0, str(tmp_path / "full"), rng=np.random.default_rng(5), tile_size=700).run(0.5, 0.02, 40, as_array=True)
+        MappedSimulation(3000, 10, 0, str(tmp_path / "split"), rng=np.random.default_rng(5), tile_size=700).run(0.5, 0.02, 15, as_array=True)
+        continued = MappedSimulation.open(str(tmp_path / "split")).run(0.5, 0.02, 40, as_array=True)
+        np.testing.assert_array_equal(continued, full)
+    
+    def test_interrupt_stops_after_saving_day(self, tmp_path, monkeypatch):
+        """Test that SIGINT during a day stops the run once that day is saved."""
+        full = MappedSimulation(2000, 10, 0, str(tmp_path / "full"), rng=np.random.default_rng(6), tile_size=500).run(0.5, 0.02, 30, as_array=True)
+        sim = MappedSimulation(2000, 10, 0, str(tmp_path / "split"), rng=np.random.default_rng(6), tile_size=500)
+        real_step_chunk = sim._step_chunk
+        def interrupted_step_chunk(chunk, *args):
+            if sim._day == 8 and chunk.start == 0:
+                os.kill(os.getpid(), signal.SIGINT)
+            return real_step_chunk(chunk, *args)
+        monkeypatch.setattr(sim, "_step_chunk", interrupted_step_chunk)
+        with pytest.raises(KeyboardInterrupt, match="after day 8"):
+            sim.run(0.5, 0.02, 30, as_array=True)
+        continued = MappedSimulation.open(str(tmp_path / "split")).run(0.5, 0.02, 30, as_array=True)
+        np.testing.assert_array_equal(continued, full)
+    
+    def test_refuses_state_left_mid_day(self, tmp_path):
+        """Test that state marked as in progress cannot be continued."""
+        sim = MappedSimulation(100, 5, 0, str(tmp_path), rng=np.random.default_rng(1))
+        sim._save_state(in_progress=True)
+        with pytest.raises(ValueError, match="middle of day"):
+            MappedSimulation.open(str(tmp_path))
+
+
+class TestCompartmentalSimulation:
+    """Test the aggregate binomial-chain engine, including against the agent engine."""
+    
+    def test_counts_conserved(self):
+        """Test that every day's counts add up to the population and cohorts to the infected."""
+        sim = CompartmentalSimulation(population=5000, infected=10, vaccinated=200, rng=np.random.default_rng(1))
+        counts = sim.run(0.5, 0.05, 60, as_array=True)
+        assert (counts[:, 1:].sum(axis=1) == 5000).all()
+        assert (counts[:, STATUS_COLUMNS.index(HS.VACCINATED)] == 200).all()
+        assert sim.cohorts.sum() == counts[-1, STATUS_COLUMNS.index(HS.INFECTED)]
+    
+    def test_recovery_follows_sick_day_rule(self):
+        """Test that nobody dies or recovers before day 12 without deaths, and everyone recovers by day 14."""
+        sim = CompartmentalSimulation(population=1000, infected=1000, vaccinated=0, rng=np.random.default_rng(2))
+        counts = sim.run(0.5, 0.0, 20, as_array=True)
+        recovered = counts[:, STATUS_COLUMNS.index(HS.RECOVERED)]
+        assert (recovered[:11] == 0).all()
+        assert recovered[13] == 1000
+    
+    def test_cost_independent_of_population(self):
+        """Test that a trillion-person run makes exactly as many random draws as a ten-thousand-person one."""
+        class CountingGenerator:
+            """Generator wrapper counting the binomial variates drawn."""
+            def __init__(self, rng):
+                self.rng, self.draws = rng, 0
+            def binomial(self, n, p):
+                result = self.rng.binomial(n, p)
+                self.draws += np.size(result)
+                return result
+        draws = []
+        for population in (10_000, 10**12):
+            sim = make_simulation(Engine.COMPARTMENTAL, population, 1000, 0, seed=np.random.SeedSequence(3))
+            sim._rng = CountingGenerator(sim._rng)
+            # nobody recovers this early, so neither run can end before the last day
+            counts = sim.run(0.5, 0.01, 10, as_array=True)
+            assert sim.extinction_day is None
+            assert (counts[:, 1:].sum(axis=1) == population).all()
+            draws.append(sim._rng.draws)
+        # the split of people at risk, then each day's infections and a death and recovery draw per cohort
+        assert draws == [1 + 10 * (1 + 2 * (MAX_SICK_DAYS + 1))] * 2
+    
+    def test_matches_agent_engine_statistically(self):
+        """Test that final and peak counts agree with the numpy agent engine across trials."""
+        def outcomes(engine):
+            runs = np.array([make_simulation(engine, 2000, 10, 100, seed=np.random.SeedSequence([trial, 7])).run(0.4, 0.05, 60, as_array=True)
+                             for trial in range(200)])
+            infected = runs[:, :, STATUS_COLUMNS.index(HS.INFECTED)]
+            return np.column_stack([runs[:, -1, STATUS_COLUMNS.index(HS.DEAD)], runs[:, -1, STATUS_COLUMNS.index(HS.RECOVERED)],
+                                    infected.max(axis=1), infected.argmax(axis=1)])
+        agent, compartmental = outcomes(Engine.NUMPY), outcomes(Engine.COMPARTMENTAL)
+        standard_error = np.sqrt((agent.var(axis=0, ddof=1) + compartmental.var(axis=0, ddof=1)) / 200)
+        assert (np.abs(agent.mean(axis=0) - compartmental.mean(axis=0)) < 4 * standard_error).all()
+        assert np.allclose(agent.std(axis=0), compartmental.std(axis=0), rtol=0.25)
+    
+    def test_rejects_contact_graph(self):
+        """Test that a contact graph is refused, like the python engine."""
+        with pytest.raises(ValueError, match="numpy"):
+            make_simulation(Engine.COMPARTMENTAL, 100, 5, 0, network=ContactNetwork(ContactModel.SMALL_WORLD))
+
+
+class TestBatchedSimulation:
+    """Test the batched multi-trial engine against the single-trial NumPy engine."""
+    
+    def test_rows_match_numpy_engine_exactly(self):
+        """Test that each row reproduces a NumpySimulation with the same seed."""
+        seeds = np.random.SeedSequence(21).spawn(4)
+        counts = BatchedSimulation(seeds, 300, 5, 30).run(tprob=0.4, dprob=0.05, days=40)
+        assert counts.shape == (4, 40, len(STATUS_COLUMNS))
+        for seed, trial_counts in zip(seeds, counts):
+            expected = make_simulation(Engine.NUMPY, 300, 5, 30, seed=seed).run(0.4, 0.05, 40, as_array=True)
+            assert np.array_equal(trial_counts, expected)
+    
+    def test_trial_block_matches_run_trial(self):
+        """Test that run_trial_block returns the same statistics as run_trial per trial."""
+        seeds = np.random.SeedSequence(8).spawn(3)
+        block = run_trial_block(seeds, 200, 5, 20, 0.3, 0.05, 15)
+        assert block == [run_trial(Engine.NUMPY, seed, 200, 5, 20, 0.3, 0.05, 15) for seed in seeds]
+    
+    def test_trial_block_matches_run_trial_across_extinction_days(self):
+        """Test that trials burning out on different days keep run_trial's exact statistics."""
+        seeds = np.random.SeedSequence(8).spawn(6)
+        counts = BatchedSimulation(seeds, 100, 3, 0).run(0.2, 0.3, 40)
+        extinction_days = {int(np.argmax(trial[:, 2] == 0)) for trial in counts}
+        assert len(extinction_days) > 1
+        block = run_trial_block(seeds, 100, 3, 0, 0.2, 0.3, 40)
+        assert block == [run_trial(Engine.NUMPY, seed, 100, 3, 0, 0.2, 0.3, 40) for seed in seeds]
+
+    def test_conservation_of_population(self):
+        """Test that every trial keeps its population constant."""
+        counts = BatchedSimulation(np.random.SeedSequence(2).spawn(5), 100, 10, 10).run(0.5, 0.1, 20)
+        assert (counts[:, :, 1:].sum(axis=2) == 100).all()
+    
+    def test_default_batch_size_shrinks_with_population(self):
+        """Test that larger populations get smaller blocks, never below one trial."""
+        assert default_batch_size(1_000) > default_batch_size(1_000_000) >= 1
+        assert default_batch_size(10**12) == 1
+
+    def test_default_batch_size_covers_step_and_counts(self, monkeypatch):
+        """Test that a default block's peak memory while running stays within BATCH_MEMORY_BYTES."""
+        import tracemalloc
+        import virus
+        monkeypatch.setattr(virus, "BATCH_MEMORY_BYTES", 32 * 2**20)
+        population, days = 5_000, 2_000
+        trials = default_batch_size(population, days)
+        assert trials < default_batch_size(population, 1)
+        tracemalloc.start()
+        try:
+            BatchedSimulation(np.random.SeedSequence(3).spawn(trials), population, 4_500, 0).run(1.0, 0.0, days)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert peak <= virus.BATCH_MEMORY_BYTES
@@ -21,7 +21,8 @@ Future Implementation Notes:
 
 import pytest
 from unittest.mock import Mock, patch
-from virus import Visualize
+from virus import Visualize, HS
+import numpy as np
 import pandas as pd
 
 
@@ -135,3 +136,83 @@ Future Automation:
 """
 
 
+
+
+# ============================================================================
+# Headless Rendering
+# ============================================================================
+
+class TestHeadlessRendering:
+    """Test headless (Agg backend) rendering to image files."""
+    
+    def test_plot_writes_png(self, tmp_path, sample_dataframe):
+        """Test that a time series is saved without opening a window."""
+        vis = Visualize(0, 0, headless=True)
+        path = tmp_path / "sim.png"
+        vis.render(sample_dataframe, str(path))
+        vis.close()
+        assert path.read_bytes().startswith(b'\x89PNG')
+    
+    def test_histogram_writes_svg(self, tmp_path):
+        """Test that analyze output is drawn as a histogram and saved as SVG."""
+        vis = Visualize(0, 0, headless=True)
+        path = tmp_path / "trials.svg"
+        df = pd.DataFrame({'AVG_INFECTED': [10.0, 12.0], 'AVG_DEATHS': [1.0, 2.0], 'AVG_DEATH_STDV': [0.5, 0.7]})
+        vis.render(df, str(path))
+        vis.close()
+        assert '<svg' in path.read_text()
+    
+    def test_figure_reused_and_closed(self, tmp_path, sample_dataframe):
+        """Test that rendering many files keeps one open figure, closed by close()."""
+        import matplotlib.pyplot as plt
+        plt.close('all')
+        vis = Visualize(0, 0, headless=True)
+        for i in range(5):
+            vis.render(sample_dataframe, str(tmp_path / f"sim_{i}.png"))
+        assert len(plt.get_fignums()) == 1
+        vis.close()
+        assert plt.get_fignums() == []
+
+    def test_interactive_plots_get_their_own_figure(self, sample_dataframe):
+        """Test that without headless each plot is drawn on a new figure, closed after show()."""
+        import matplotlib.pyplot as plt
+        plt.close('all')
+        vis = Visualize(0, 0)
+        shown = []
+        with patch('matplotlib.pyplot.show', side_effect=lambda: shown.append(vis._figure)):
+            for _ in range(3):
+                vis.render(sample_dataframe)
+        assert len({id(figure) for figure in shown}) == 3
+        assert plt.get_fignums() == []
+
+    def test_read_file_restores_health_status_columns(self, tmp_path, sample_dataframe):
+        """Test that columns written as 'HS.INFECTED' are read back as HS members."""
+        path = tmp_path / "sim.csv"
+        sample_dataframe.to_csv(path, index=False)
+        df = Visualize(0, 0).read_file(str(path))
+        assert list(df[HS.INFECTED]) == list(sample_dataframe[HS.INFECTED])
+
+
+class TestTrialSummary:
+    """Test the distribution summary behind the trial histogram."""
+    
+    def test_summary_quantiles_and_moments(self):
+        """Test that summarize reports quantiles, mean and spread per metric."""
+        df = pd.DataFrame({'AVG_INFECTED': np.arange(101.0), 'AVG_DEATHS': np.arange(101.0) / 10,
+                           'AVG_DEATH_STDV': np.zeros(101)})
+        summary = Visualize(0, 0).summarize(df)
+        assert set(summary) == {'AVG_DEATHS', 'AVG_INFECTED'}
+        assert summary['AVG_INFECTED']['trials'] == 101
+        assert summary['AVG_INFECTED']['q50'] == 50.0
+        assert summary['AVG_INFECTED']['q05'] == 5.0
+        assert summary['AVG_DEATHS']['max'] == 10.0
+    
+    def test_many_trials_render_without_printing_rows(self, tmp_path, capsys):
+        """Test that thousands of trials render and only the summary is printed."""
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({'AVG_INFECTED': rng.gamma(5, 10, 5000), 'AVG_DEATHS': rng.gamma(3, 2, 5000),
+                           'AVG_DEATH_STDV': rng.random(5000)})
+        vis = Visualize(0, 0, headless=True)
+        vis.generate_histogram(df, str(tmp_path / "trials.png"))
+        vis.close()
+        assert len(capsys.readouterr().out.splitlines()) == 2
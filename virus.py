@@ -8,23 +8,50 @@ and visualizing results.
 
 Key Components:
     - Person: Represents an individual in the population
+    - Population: Stores a population's states as compact arrays with Person views
     - Simulation: Manages the simulation execution and state tracking
+    - NumpySimulation: Vectorized engine storing the population as NumPy arrays
+    - MappedSimulation: Vectorized engine whose population lives in memory-mapped files, for out-of-core runs
+    - BatchedSimulation: Runs a block of trials together as (trials x population) arrays
+    - CompartmentalSimulation: Stochastic engine over status counts, without individual people
+    - ContactGraph: CSR contact network whose neighbours are a person's only possible contacts
+    - ResultSink: Streams daily or per-trial rows to CSV or Parquet
+    - ResultCache: On-disk LRU cache of simulate and analyze results
+    - Profiler: Per-phase and per-day timings and transition counts for --profile
+    - RunningStats: Mergeable one-pass mean, variance, extremes and confidence interval of a metric
+    - QuantileSketch: Mergeable streaming quantile estimates with bounded relative error
     - Visualize: Handles visualization of simulation results
-    - CLI Commands: simulate, analyze, and visualize commands via Typer
+    - CLI Commands: simulate, analyze, sweep, and visualize commands via Typer
+
+pandas and matplotlib are imported where they are first needed rather than
+at module load, so short CLI invocations (and --help) start quickly.
 """
 
+from __future__ import annotations
 from enum import Enum
-from typing import List, Annotated
+from typing import List, Annotated, TYPE_CHECKING
 from dataclasses import dataclass
 import random
-import pandas as pd
 from typing_extensions import Self
 import sys
 import typer
-import matplotlib.pyplot as plt
 import csv
+import json
+import os
+import shutil
+from array import array
 from collections import Counter
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from itertools import product
+import hashlib
+import math
+import time
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 app = typer.Typer()
 
@@ -32,9 +59,37 @@ DEFAULT_POPULATION = 1000
 DEFAULT_DAYS = 50
 DEFAULT_INFECTED_INITIAL = 10
 MAX_NEXPOSURES: int = 21
+MAX_DAILY_CONTACTS: int = 8
+MAX_SICK_DAYS: int = 14
 
 SIMULATE_FILE = 'simulate.csv'
 ANALYZE_FILE = 'analyze.csv'
+SWEEP_FILE = 'sweep.csv'
+DEFAULT_FLUSH_ROWS = 100
+DEFAULT_CHECKPOINT_EVERY = 100
+BATCH_MEMORY_BYTES = 256 * 2**20
+DEFAULT_GRAPH_DEGREE = 10
+DEFAULT_TILE_SIZE = 1_000_000
+DEFAULT_CI_BATCH = 50
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_SKETCH_ACCURACY = 0.01
+# trials submitted to the worker pool at a time by analyze
+TRIAL_BATCH = 10_000
+# trials per analyze worker task; each task returns its own running statistics
+TRIAL_CHUNK = 10
+# analyze runs with more trials than this are not stored in the result cache
+CACHE_MAX_TRIALS = 100_000
+# people the python engine draws for or updates at a time, bounding its temporary lists
+PERSON_CHUNK = 65_536
+DEFAULT_REWIRE_PROB = 0.1
+MAX_HISTOGRAM_BINS = 50
+HISTOGRAM_COLUMNS = ['AVG_DEATHS', 'AVG_INFECTED']
+HISTOGRAM_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+# bump whenever a change to the engines alters results for a given seed, so stale cache entries are ignored
+ENGINE_VERSION = 4
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'virus')
+DEFAULT_CACHE_BYTES = 512 * 2**20
 
 class HS(int, Enum):
     """
@@ -57,6 +112,54 @@ class HS(int, Enum):
 
 HealthStatus = HS | int
 
+# column order of the daily-count table returned by Simulation.run
+STATUS_COLUMNS = ['Day', HS.SUSCEPTIBLE, HS.INFECTED, HS.RECOVERED, HS.DEAD, HS.VACCINATED]
+# column order of the per-trial table written by analyze
+ANALYZE_COLUMNS = ['AVG_INFECTED', 'AVG_DEATHS', 'AVG_DEATH_STDV']
+# long-format table written by sweep: grid point, trial number, trial statistics
+SWEEP_COLUMNS = ['vprob', 'tprob', 'dprob', 'days', 'population_count', 'infected', 'engine', 'seed', 'Trial', *ANALYZE_COLUMNS]
+
+class Engine(str, Enum):
+    """
+    Simulation engine selectable from the CLI.
+    
+    Attributes:
+        PYTHON: Per-person loop over Person objects (Simulation)
+        NUMPY: Batched array operations over the whole population (NumpySimulation)
+        BATCHED: Blocks of analyze trials advanced together as 2-D arrays
+            (BatchedSimulation); a single simulate run is identical to NUMPY
+        COMPARTMENTAL: Binomial draws over status counts and sick-day cohorts
+            (CompartmentalSimulation); cost does not depend on the population size
+    """
+    PYTHON = 'python'
+    NUMPY = 'numpy'
+    BATCHED = 'batched'
+    COMPARTMENTAL = 'compartmental'
+
+class ImageFormat(str, Enum):
+    """
+    Image formats the visualize command can save.
+    
+    Attributes:
+        PNG: Raster image
+        SVG: Vector image
+    """
+    PNG = 'png'
+    SVG = 'svg'
+
+class ContactModel(str, Enum):
+    """
+    Who a person can meet each day.
+    
+    Attributes:
+        WELL_MIXED: Contacts are drawn from the whole population
+        SMALL_WORLD: Contacts are drawn from neighbours on a generated small-world graph
+        EDGE_LIST: Contacts are drawn from neighbours on a graph read from an edge list file
+    """
+    WELL_MIXED = 'well-mixed'
+    SMALL_WORLD = 'small-world'
+    EDGE_LIST = 'edge-list'
+
 class Simulation:
     """
     Manages the virus spread simulation.
@@ -67,10 +170,16 @@ class Simulation:
     Attributes:
         vaccinated: Number of vaccinated individuals in the population
         _infected: Number of initially infected individuals
-        _population: List of Person objects representing the population
+        _population: Population storing every person's state in compact arrays
+        _rng: Random number generator used for every random draw in the simulation
+        extinction_day: Day the last infection ended during the latest run (None if it did not)
+        profiler: Profiler recording each day's timings and transitions during run (None disables profiling)
+        synchronous: Decide each day's transitions from the start-of-day state (see step)
     """
+    profiler: Profiler | None = None
+    synchronous: bool = False
     
-    def __init__(self, population: int, infected: int, vaccinated: int):
+    def __init__(self, population: int, infected: int, vaccinated: int, rng: random.Random | None = None, synchronous: bool = False):
         """
         Initialize a simulation with a population.
         
@@ -78,6 +187,10 @@ class Simulation:
             population: Total number of individuals in the population
             infected: Number of initially infected individuals
             vaccinated: Number of vaccinated individuals
+            rng: Random generator to draw from; pass a seeded random.Random for
+                reproducible runs (default: a freshly seeded generator)
+            synchronous: Decide each day's transitions from the start-of-day
+                infected count instead of the live one (default: False)
             
         Note:
             The remaining individuals (population - infected - vaccinated)
@@ -86,18 +199,35 @@ class Simulation:
         self.vaccinated = vaccinated
         self._infected = infected
         self._total_population = population  # Store for accurate status tracking
-        # using list comprehnsion and splat operator to generate list of person objects for population
-        # with varying healthstatuses
-        self._population: List[Person] = [*(Person(health_status=HS.INFECTED, sick_days = 1) for _ in range(infected)), *(Person(health_status=HS.VACCINATED, sick_days = 0) for _ in range(vaccinated)), *(Person(transmission_rate=random.random()) for _ in range(population - (infected + vaccinated)))]    
-        random.shuffle(self.population)
+        self._rng = rng if rng is not None else random.Random()
+        self.synchronous = synchronous
+        self._exposure_cache: dict = {}
+        # infected first, then vaccinated, then susceptible people with their own transmission rates
+        health_status = np.full(population, HS.SUSCEPTIBLE, dtype = np.int8)
+        health_status[:infected] = HS.INFECTED
+        health_status[infected:infected + vaccinated] = HS.VACCINATED
+        sick_days = np.zeros(population, dtype = np.uint16)
+        sick_days[:infected] = 1
+        transmission_rate = np.zeros(population, dtype = np.float32)
+        for start in range(infected + vaccinated, population, PERSON_CHUNK):
+            stop = min(start + PERSON_CHUNK, population)
+            transmission_rate[start:stop] = [self._rng.random() for _ in range(stop - start)]
+        # shuffling a typed array draws the same permutation as a list without boxing every index
+        order = array('i' if population < 2**31 else 'q', range(population))
+        self._rng.shuffle(order)
+        order = np.frombuffer(order, dtype = order.typecode)
+        health_status = health_status[order]
+        sick_days = sick_days[order]
+        transmission_rate = transmission_rate[order]
+        self._population = Population(health_status, sick_days, transmission_rate)
 
     @property
-    def population(self) -> int:
+    def population(self) -> Population:
         """
-        Get the population list.
+        Get the population.
         
         Returns:
-            List of Person objects representing the population
+            Population whose items are Person views of each individual
         """
         return self._population 
     
@@ -107,7 +237,7 @@ class Simulation:
         Set the population list.
         
         Args:
-            population: List of Person objects
+            population: Population of the simulation
             
         Raises:
             ValueError: If population is negative
@@ -192,7 +322,8 @@ class Simulation:
             HS.VACCINATED: self.vaccinated
         })
 
-    def calculate_stats(self, df: pd.DataFrame) -> tuple:
+    @staticmethod
+    def calculate_stats(df: pd.DataFrame | np.ndarray) -> tuple:
         """
         Calculate statistical measures from simulation results.
         
@@ -200,18 +331,91 @@ class Simulation:
         of deaths across all days in the simulation.
         
         Args:
-            df: DataFrame containing daily health status counts
+            df: DataFrame containing daily health status counts, or the raw
+                days x 6 count array returned by run(..., as_array = True);
+                a trials x days x 6 array gives one statistic per trial
             
         Returns:
-            Tuple containing (avg_infected, avg_deaths, deaths_stdv)
+            Tuple containing (avg_infected, avg_deaths, deaths_stdv); for arrays
+            identical to the daily_stats that run keeps as it goes
         """
+        if isinstance(df, np.ndarray):
+            daily_stats = Simulation.new_daily_stats()
+            Simulation.add_days(daily_stats, df)
+            return Simulation.summarize_days(daily_stats)
+
         avg_infected = df[HS.INFECTED].mean()
         avg_deaths = df[HS.DEAD].mean()
         deaths_stdv = df[HS.DEAD].std()
 
         return avg_infected, avg_deaths, deaths_stdv
     
-    def generate_statistics_dict(self) -> dict:
+    @staticmethod
+    def new_daily_stats() -> dict:
+        """
+        Create the running statistics that run updates each day.
+        
+        Returns:
+            Dictionary of RunningStats of the infected and dead counts, keyed by HS
+        """
+        return {HS.INFECTED: RunningStats(), HS.DEAD: RunningStats()}
+
+    @staticmethod
+    def add_day(daily_stats: dict, row: np.ndarray, ndays: int | np.ndarray = 1) -> None:
+        """
+        Add one day's counts to the running statistics.
+        
+        Args:
+            daily_stats: Dictionary returned by new_daily_stats
+            row: The day's counts, columns ordered as STATUS_COLUMNS (one row per trial for a block)
+            ndays: Number of days with these counts, or one number per trial (default: 1)
+        """
+        for status, stats in daily_stats.items():
+            stats.add(row[..., STATUS_COLUMNS.index(status)], ndays)
+
+    @staticmethod
+    def add_days(daily_stats: dict, counts: np.ndarray) -> None:
+        """
+        Add a run's daily counts to the running statistics the way run does.
+        
+        Days up to the first one with nobody infected are added one at a time;
+        the days after it repeat that day's counts and are added in one step.
+        
+        Args:
+            daily_stats: Dictionary returned by new_daily_stats
+            counts: days x 6 count array, or trials x days x 6 for a block whose
+                trials can burn out on different days
+        """
+        ndays = counts.shape[-2]
+        if not ndays:
+            return
+        extinct = counts[..., STATUS_COLUMNS.index(HS.INFECTED)] == 0
+        last = np.where(extinct.any(axis = -1), extinct.argmax(axis = -1), ndays - 1)
+        if counts.ndim == 2:
+            last = int(last)
+            for day in range(last + 1):
+                Simulation.add_day(daily_stats, counts[day])
+            Simulation.add_day(daily_stats, counts[last], ndays - 1 - last)
+            return
+        for day in range(int(last.max()) + 1):
+            Simulation.add_day(daily_stats, counts[:, day], (day <= last).astype(np.int64))
+        Simulation.add_day(daily_stats, counts[np.arange(len(counts)), last], ndays - 1 - last)
+
+    @staticmethod
+    def summarize_days(daily_stats: dict) -> tuple:
+        """
+        Get a trial's statistics from its running daily statistics.
+        
+        Args:
+            daily_stats: Dictionary returned by new_daily_stats, with every day added
+            
+        Returns:
+            Tuple containing (avg_infected, avg_deaths, deaths_stdv)
+        """
+        return daily_stats[HS.INFECTED].mean, daily_stats[HS.DEAD].mean, daily_stats[HS.DEAD].std
+
+    @staticmethod
+    def generate_statistics_dict() -> dict:
         """
         Generate a dictionary template for storing trial statistics.
         
@@ -227,55 +431,222 @@ class Simulation:
 
         return adf_dict
      
-    def run(self, tprob: float, dprob: float, days: int) -> pd.DataFrame:
+    def run(self, tprob: float, dprob: float, days: int, as_array: bool = False, sink: ResultSink | None = None) -> pd.DataFrame | np.ndarray:
         """
         Run the simulation for a specified number of days.
         
         For each day, updates the status of each person in the population
         based on transmission and death probabilities, then records the
-        daily counts of each health status.
+        daily counts of each health status in a preallocated days x 6 array.
+        The DataFrame is built once at the end.
+        
+        Once nobody is infected the counts can no longer change, so the loop
+        stops and the remaining days are filled, and added to daily_stats, in
+        one step; extinction_day records the day this happened (None if the
+        epidemic outlasts the run).
+        
+        The mean infected and dead counts and the deaths' standard deviation
+        are updated as each day is recorded, in daily_stats (see
+        summarize_days), so a trial's statistics need no second pass.
         
         Args:
             tprob: Transmission probability (0-1) for susceptible individuals
             dprob: Death probability (0-1) for infected individuals
             days: Number of days to simulate
+            as_array: Return the raw integer count array (columns ordered as
+                STATUS_COLUMNS) instead of a DataFrame (default: False)
+            sink: ResultSink that receives each day's counts as soon as the day
+                completes (default: None)
+            
+        Returns:
+            DataFrame with daily counts of each health status, or the raw count array
+            
+        Raises:
+            ValueError: If tprob or dprob is not between 0 and 1
+        """
+        # validated once here so the per-person hot path can skip the checks
+        Person.validate_probability(tprob, 'tprob')
+        Person.validate_probability(dprob, 'dprob')
+        counts = np.zeros((days, len(STATUS_COLUMNS)), dtype = np.int64)
+        first_day, status_counts = self._restore_days(counts)
+        if sink is not None:
+            sink.write_many(counts[:first_day])
+        self.daily_stats = daily_stats = self.new_daily_stats()
+        self.add_days(daily_stats, counts[:first_day])
+        self.extinction_day = None
+        profiler = self.profiler
+        for day in range(first_day, days):
+            if profiler is not None:
+                before, start = dict(status_counts), time.perf_counter()
+            self.step(status_counts, tprob, dprob)
+            if profiler is not None:
+                profiler.record_day(day, time.perf_counter() - start, infections = before[HS.SUSCEPTIBLE] - status_counts[HS.SUSCEPTIBLE],
+                                    deaths = status_counts[HS.DEAD] - before[HS.DEAD],
+                                    recoveries = status_counts[HS.RECOVERED] - before[HS.RECOVERED])
+                start = time.perf_counter()
+            status_counts['Day'] = day
+            counts[day] = [status_counts[column] for column in STATUS_COLUMNS]
+            self.add_day(daily_stats, counts[day])
+            if sink is not None:
+                sink.write(counts[day])
+            if profiler is not None:
+                profiler.add('record', time.perf_counter() - start)
+            self._end_day(counts[:day + 1], status_counts)
+            if status_counts[HS.INFECTED] == 0:
+                # nobody left to spread, die or recover: the remaining days repeat this one
+                self.extinction_day = day
+                counts[day + 1:] = counts[day]
+                counts[day + 1:, 0] = np.arange(day + 1, days)
+                self.add_day(daily_stats, counts[day], days - day - 1)
+                if sink is not None:
+                    sink.write_many(counts[day + 1:])
+                break
+        
+        if as_array:
+            return counts
+        import pandas as pd
+        return pd.DataFrame(counts, columns = STATUS_COLUMNS)
+
+    def _restore_days(self, counts: np.ndarray) -> tuple:
+        """
+        Get the day run starts from.
+        
+        A fresh simulation starts from day 0; engines that can continue an
+        earlier run fill counts with the days already simulated.
+        
+        Args:
+            counts: days x 6 count array of the run
             
         Returns:
-            DataFrame with daily counts of each health status
+            Tuple of (first day to simulate, status counts at the start of that day)
         """
-        daily_counts = []
-        status_counts: dict = self.health_status_dict()
-        df = pd.DataFrame(columns = ['Day', HS.SUSCEPTIBLE, HS.INFECTED, HS.RECOVERED, HS.DEAD, HS.VACCINATED])
-        for day in range(days):
-            for person in self.population:
-                self.update_person_status(person, status_counts, tprob, dprob)
+        return 0, self.health_status_dict()
 
-            status_counts['Day'] = day
-            df.loc[day] = status_counts
+    def _end_day(self, counts: np.ndarray, status_counts: dict) -> None:
+        """
+        Hook called by run after each simulated day has been recorded.
+        
+        Args:
+            counts: Count rows of every day so far
+            status_counts: Status counts at the end of the day
+        """
+
+    def step(self, status_counts: dict, tprob: float, dprob: float) -> None:
+        """
+        Advance the population by one day.
+        
+        People are updated in place, in population order. By default exposure
+        uses the live infected count, so someone infected earlier in the day
+        already raises the exposure of everyone after them. In synchronous mode
+        exposure uses the start-of-day infected count instead. Each person's
+        update reads only their own state, so with that count fixed every
+        transition is decided from the previous day's state without a second
+        buffer: the result no longer depends on population order (the
+        transitions match NumpySimulation's), and the loop could be split across
+        threads writing disjoint slices of the population.
+        
+        Args:
+            status_counts: Dictionary tracking counts of each health status
+            tprob: Transmission probability
+            dprob: Death probability
+        """
+        # with nobody infected no one can be infected, die or recover
+        if status_counts[HS.INFECTED] == 0:
+            return
+        # a person's status only changes on their own turn, so the people who can change
+        # today are exactly those susceptible or infected at the start of the day; a chunk's
+        # later people are untouched until the chunk is reached, so they are found chunk by chunk
+        population = self.population
+        infected = status_counts[HS.INFECTED] if self.synchronous else None
+        for start in range(0, len(population), PERSON_CHUNK):
+            statuses = population.health_status[start:start + PERSON_CHUNK]
+            active = start + np.flatnonzero((statuses == HS.SUSCEPTIBLE) | (statuses == HS.INFECTED))
+            self._step_people(population, active, status_counts, tprob, dprob, infected = infected)
+
+    def _step_people(self, population: Population, active: np.ndarray, status_counts: dict, tprob: float, dprob: float,
+                     infected: int | None = None) -> None:
+        """
+        Apply one day's transitions to the given people, in order.
+        
+        The hot path of step: the same draws and transitions as
+        update_person_status, but on plain lists copied out of the population's
+        arrays and written back once, instead of one Person view per person.
+        step passes at most PERSON_CHUNK people at a time to bound the lists.
         
-        return df
+        Args:
+            population: Population to update
+            active: Indices of the people susceptible or infected at the start of the day
+            status_counts: Dictionary tracking counts of each health status
+            tprob: Transmission probability, already validated by run()
+            dprob: Death probability, already validated by run()
+            infected: Infected count that drives exposure (default: None, the live
+                count, which includes today's earlier transitions)
+        """
+        statuses = population.health_status[active].tolist()
+        sick_days = population.sick_days[active].tolist()
+        transmission_rates = population.transmission_rate[active].tolist()
+        draw = self._rng.random
+        susceptible, sick, recovered, dead = HS.SUSCEPTIBLE.value, HS.INFECTED.value, HS.RECOVERED.value, HS.DEAD.value
+        live = infected is None
+        ninfected = status_counts[HS.INFECTED] if live else infected
+        infections = deaths = recoveries = 0
+        # exposure only changes with the infected count, so it is looked up again only then
+        exposed_count, p_exposed = None, 0.0
+        for person, status in enumerate(statuses):
+            if status == susceptible:
+                if transmission_rates[person] < tprob:
+                    if exposed_count != ninfected:
+                        exposed_count, p_exposed = ninfected, self._exposure_probability(ninfected)
+                    if draw() < p_exposed:
+                        statuses[person] = sick
+                        sick_days[person] = 1
+                        infections += 1
+                        ninfected += live
+            else:
+                # death draw, then the (unused) sickness factor, then the recovery factor
+                rand_dprob = draw()
+                draw()
+                if rand_dprob < dprob:
+                    statuses[person] = dead
+                    deaths += 1
+                    ninfected -= live
+                elif sick_days[person] + 3.0 * draw() > MAX_SICK_DAYS:
+                    statuses[person] = recovered
+                    recoveries += 1
+                    ninfected -= live
+                else:
+                    sick_days[person] += 1
+        population.health_status[active] = statuses
+        population.sick_days[active] = sick_days
+        status_counts[HS.SUSCEPTIBLE] -= infections
+        status_counts[HS.INFECTED] += infections - deaths - recoveries
+        status_counts[HS.DEAD] += deaths
+        status_counts[HS.RECOVERED] += recoveries
 
-    def update_person_status(self, person: 'Person', status_counts: dict, tprob: float, dprob: float) -> None:
+    def update_person_status(self, person: 'Person', status_counts: dict, tprob: float, dprob: float, infected: int | None = None) -> None:
         """
         Update a person's health status based on their current state.
         
         Routes to appropriate handler based on person's current health status.
-        Vaccinated and recovered individuals remain unchanged.
+        Vaccinated and recovered individuals remain unchanged. step applies the
+        same draws and transitions to the whole population at once (see _step_people).
         
         Args:
             person: Person object to update
             status_counts: Dictionary tracking counts of each health status
             tprob: Transmission probability
             dprob: Death probability
+            infected: Infected count that drives exposure (default: None, the live
+                count in status_counts)
         """
         if person.health_status == HS.SUSCEPTIBLE:
-            self._handle_susceptible(person, status_counts, tprob)
+            self._handle_susceptible(person, status_counts, tprob, infected)
         elif person.health_status == HS.INFECTED:
             self._handle_infected(person, status_counts, dprob)
         elif person.health_status == HS.VACCINATED or person.health_status == HS.RECOVERED:
             pass
 
-    def _handle_susceptible(self, person: 'Person', status_counts: dict, tprob: float) -> None:
+    def _handle_susceptible(self, person: 'Person', status_counts: dict, tprob: float, infected: int | None = None) -> None:
         """
         Handle status update for a susceptible person.
         
@@ -283,18 +654,40 @@ class Simulation:
         infection occurs based on transmission probability. Updates status
         counts if person becomes infected.
         
+        Rather than sampling contacts from the population and scanning them,
+        the chance that the day's contacts include an infected person is
+        drawn directly from the infected count (see exposure_probability),
+        which has the same distribution.
+        
         Args:
             person: Susceptible person to check
             status_counts: Dictionary tracking counts of each health status
-            tprob: Transmission probability
+            tprob: Transmission probability, already validated by run()
+            infected: Infected count that drives exposure (default: None, the live
+                count in status_counts)
         """
-        nexposures: int = random.randint(1, 8)
-        other_persons_list: List[Person] = random.sample(self.population, random.randint(1, min(nexposures, len(self.population))))
-        if person.catch_or_not(tprob, other_persons_list):
+        if infected is None:
+            infected = status_counts[HS.INFECTED]
+        if person.transmission_rate < tprob and self._rng.random() < self._exposure_probability(infected):
             person.health_status = HS.INFECTED
             person.sick_days = 1
             status_counts[HS.INFECTED] += 1; status_counts[HS.SUSCEPTIBLE] -= 1
 
+    def _exposure_probability(self, infected: int) -> float:
+        """
+        Look up the probability of meeting an infected person, caching by infected count.
+        
+        Args:
+            infected: Current number of infected individuals
+            
+        Returns:
+            Probability (0-1) that a susceptible person's contacts include an infected person
+        """
+        p_exposed = self._exposure_cache.get(infected)
+        if p_exposed is None:
+            p_exposed = self._exposure_cache[infected] = float(exposure_probability(self._total_population, infected))
+        return p_exposed
+
     def _handle_infected(self, person: 'Person', status_counts: dict, dprob: float) -> None:
         """
         Handle status update for an infected person.
@@ -305,23 +698,25 @@ class Simulation:
         Args:
             person: Infected person to check
             status_counts: Dictionary tracking counts of each health status
-            dprob: Death probability
+            dprob: Death probability, already validated by run()
         """
-        rand_dprob = random.random()  # Random value for death probability check
-        sickness_factor = random.random()  # Random factor affecting disease severity
-        if person.die_or_not(dprob, rand_dprob, sickness_factor, person):
+        rand_dprob = self._rng.random()  # Random value for death probability check
+        sickness_factor = self._rng.random()  # Random factor affecting disease severity
+        # dprob is validated once by run() and the draws are in [0, 1), so skip die_or_not's checks
+        if person.check_if_survive(dprob, rand_dprob, sickness_factor, person):
             person.health_status = HS.DEAD
             status_counts[HS.DEAD] += 1; status_counts[HS.INFECTED] -= 1
         else:
-            recovery_factor = random.random()  # Random factor for recovery time calculation
-            days_sick = person.calculate_adjusted_sick_days(person, recovery_factor)
-            if days_sick > 14:
+            recovery_factor = self._rng.random()  # Random factor for recovery time calculation
+            days_sick = person._adjusted_sick_days(person, recovery_factor)
+            if days_sick > MAX_SICK_DAYS:
                 person.health_status = HS.RECOVERED
                 status_counts[HS.RECOVERED] += 1; status_counts[HS.INFECTED] -= 1
             else: 
                 person.sick_days += 1
     
-    def print_report(self, df: pd.DataFrame, tprob: float, vaccinated: int, infected: int, days: int, population_count: int) -> None:
+    @staticmethod
+    def print_report(df: pd.DataFrame, tprob: float, vaccinated: int, infected: int, days: int, population_count: int) -> None:
         """
         Print a summary report of the simulation results.
         
@@ -367,12 +762,13 @@ class Person:
         sick_days: Number of days the person has been sick (default: 0)
         transmission_rate: Individual susceptibility factor (0-1, randomly generated)
     """
-    MAX_SICK_DAYS: int = 14
+    MAX_SICK_DAYS: int = MAX_SICK_DAYS
     health_status: HealthStatus = HS.SUSCEPTIBLE
     sick_days: int = 0
     transmission_rate: float = random.random() 
 
-    def validate_probability(self, prob: float, name: str) -> None: 
+    @staticmethod
+    def validate_probability(prob: float, name: str) -> None: 
         """
         Validate that a probability value is between 0 and 1.
         
@@ -451,6 +847,22 @@ class Person:
         """
         if (sickness_factor < 0 or sickness_factor > 1):      
             raise ValueError("sickness_factor must be between 0 and 1")
+        return self._adjusted_sick_days(person, sickness_factor)
+
+    def _adjusted_sick_days(self, person: 'Person', sickness_factor: float) -> float:
+        """
+        Internal unchecked version of calculate_adjusted_sick_days.
+        
+        Note: This method assumes sickness_factor is in [0, 1], as random.random()
+        guarantees on the simulation's hot path.
+        
+        Args:
+            person: Person object to check
+            sickness_factor: Random factor (0-1) affecting recovery time
+            
+        Returns:
+            Adjusted number of sick days (sick_days + 3.0 * sickness_factor)
+        """
         return person.sick_days + 3.0 * sickness_factor
 
     def check_if_survive(self, dprob: float, rand_dprob: float, sickness_factor: float, person: 'Person') -> bool:
@@ -502,213 +914,2764 @@ class Person:
         
         return self.check_if_survive(dprob, rand_dprob, sickness_factor, person)
 
-class Visualize:
+class PersonView(Person):
     """
-    Handles visualization of simulation results.
+    A Person backed by one row of a Population.
     
-    Provides methods to read CSV files and generate various plots including
-    time series plots and histograms comparing multiple trials.
+    Reads and writes go straight to the population's arrays, so every Person
+    method (catch_or_not, die_or_not, ...) works on it unchanged and updates
+    are seen by the simulation.
+    """
+    __slots__ = ('_arrays', '_index')
+
+    def __init__(self, population: 'Population', index: int):
+        self._arrays = population
+        self._index = index
+
+    @property
+    def health_status(self) -> HS:
+        return _STATUS_BY_VALUE[self._arrays.health_status.item(self._index)]
+
+    @health_status.setter
+    def health_status(self, health_status: HealthStatus):
+        self._arrays.health_status[self._index] = health_status
+
+    @property
+    def sick_days(self) -> int:
+        return self._arrays.sick_days.item(self._index)
+
+    @sick_days.setter
+    def sick_days(self, sick_days: int):
+        self._arrays.sick_days[self._index] = sick_days
+
+    @property
+    def transmission_rate(self) -> float:
+        return self._arrays.transmission_rate.item(self._index)
+
+    @transmission_rate.setter
+    def transmission_rate(self, transmission_rate: float):
+        self._arrays.transmission_rate[self._index] = transmission_rate
+
+_STATUS_BY_VALUE = {status.value: status for status in HS}
+
+class Population:
+    """
+    Struct-of-arrays storage for a simulated population.
+    
+    Each person costs 7 bytes: health status as int8, sick days as uint16
+    and transmission rate as float32. A list of slotted Person objects costs
+    about 100 bytes per person (the object, its boxed transmission rate and
+    the list slot), so a 10M-person population drops from roughly 1 GB to
+    70 MB. Indexing or iterating yields PersonView objects, so code written
+    against Person keeps working.
     
     Attributes:
-        dmin: Minimum deaths for filtering (currently unused)
-        dmax: Maximum deaths for filtering (currently unused)
+        health_status: int8 array of HS values, one entry per person
+        sick_days: uint16 array of days each person has been sick
+        transmission_rate: float32 array of individual susceptibility factors (0-1)
     """
     
-    def __init__(self, dmin: int, dmax: int):
+    def __init__(self, health_status: np.ndarray, sick_days: np.ndarray, transmission_rate: np.ndarray):
         """
-        Initialize visualization object.
+        Wrap per-person arrays, converting them to the compact dtypes.
         
         Args:
-            dmin: Minimum deaths threshold (currently unused)
-            dmax: Maximum deaths threshold (currently unused)
+            health_status: HS value of each person
+            sick_days: Days each person has been sick
+            transmission_rate: Susceptibility factor (0-1) of each person
+            
+        Raises:
+            ValueError: If the arrays differ in length
         """
-        # self.dmin =  dmin
-        # self.dmax = dmax
-        pass
+        if not len(health_status) == len(sick_days) == len(transmission_rate):
+            raise ValueError("population arrays must have the same length")
+        self.health_status = np.asarray(health_status, dtype = np.int8)
+        self.sick_days = np.asarray(sick_days, dtype = np.uint16)
+        self.transmission_rate = np.asarray(transmission_rate, dtype = np.float32)
 
-    def read_file(self, filename: str) -> pd.DataFrame:
+    @classmethod
+    def from_persons(cls, persons: List[Person]) -> Self:
         """
-        Read simulation results from a CSV file.
+        Build a population from Person objects.
         
         Args:
-            filename: Path to the CSV file containing simulation data
+            persons: People to copy into the population
             
         Returns:
-            DataFrame containing the simulation results
+            Population holding the same states in the same order
+        """
+        return cls([person.health_status for person in persons], [person.sick_days for person in persons],
+                   [person.transmission_rate for person in persons])
+
+    def copy(self) -> Self:
+        """
+        Copy the population into new arrays.
+        
+        Returns:
+            Population with the same states that shares no memory with this one
+        """
+        return Population(self.health_status.copy(), self.sick_days.copy(), self.transmission_rate.copy())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the memory used by the population's arrays.
+        
+        Returns:
+            Total size of the arrays in bytes
         """
-        return pd.read_csv(filename)
+        return self.health_status.nbytes + self.sick_days.nbytes + self.transmission_rate.nbytes
+
+    def __len__(self) -> int:
+        return len(self.health_status)
+
+    def __getitem__(self, index: int) -> PersonView:
+        if not -len(self) <= index < len(self):
+            raise IndexError("population index out of range")
+        return PersonView(self, index % len(self))
+
+    def __iter__(self):
+        return (PersonView(self, index) for index in range(len(self)))
+
+def _contact_weights() -> np.ndarray:
+    """
+    Tabulate the distribution of how many people a person meets in a day.
+    
+    Returns:
+        (MAX_DAILY_CONTACTS + 1) x MAX_DAILY_CONTACTS array; row c is for someone
+        who can meet at most c people, and entry k is the probability that they
+        meet exactly k + 1 people, marginalized over the number of exposures
+        (point probabilities, not P(contacts >= k + 1): exposure_probability
+        weights the chance that the first k + 1 contacts include an infected
+        person by them, so each row sums to 1)
+    """
+    table = np.zeros((MAX_DAILY_CONTACTS + 1, MAX_DAILY_CONTACTS))
+    for reachable in range(1, MAX_DAILY_CONTACTS + 1):
+        for nexposures in range(1, MAX_DAILY_CONTACTS + 1):
+            # contacts are uniform on 1..max_contacts for this number of exposures
+            max_contacts = min(nexposures, reachable)
+            table[reachable, :max_contacts] += 1 / (MAX_DAILY_CONTACTS * max_contacts)
+    return table
+
+CONTACT_WEIGHTS = _contact_weights()
+
+class ContactGraph:
+    """
+    Undirected contact network stored as a CSR adjacency structure.
+    
+    The neighbours of person i are indices[indptr[i]:indptr[i + 1]]. Every
+    edge is stored in both directions, so counting a person's infected
+    neighbours is a sum over their row, done for everyone at once with a
+    cumulative sum over the edge array.
     
-    def generate_histogram(self, df: pd.DataFrame) -> None:
+    Memory is 12 bytes per person plus 8 bytes per edge (two int32 entries),
+    so a 10M-person small-world graph of degree 10 takes about 520 MB.
+    
+    Attributes:
+        indptr: int64 array of row offsets, one more than the number of people
+        indices: int32 array of neighbour indices, row after row
+        degree: int32 array of each person's number of neighbours
+    """
+    
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        """
+        Wrap CSR arrays.
+        
+        Args:
+            indptr: Row offsets into indices (length population + 1)
+            indices: Neighbour indices of every row, concatenated
+        """
+        self.indptr = np.asarray(indptr, dtype = np.int64)
+        self.indices = np.asarray(indices, dtype = np.int32)
+        self.degree = np.diff(self.indptr).astype(np.int32)
+
+    @classmethod
+    def from_edges(cls, sources: np.ndarray, targets: np.ndarray, population: int) -> Self:
         """
-        Generate a grouped bar chart comparing results across multiple trials.
+        Build a graph from undirected edges.
         
-        Creates a histogram showing average infected, average deaths, and
-        average death standard deviation for each trial in the analysis.
+        Self-loops and repeated edges are dropped.
         
         Args:
-            df: DataFrame containing trial statistics with columns:
-                AVG_INFECTED, AVG_DEATHS, AVG_DEATH_STDV
+            sources: One endpoint of each edge
+            targets: The other endpoint of each edge
+            population: Number of people (nodes)
+            
+        Returns:
+            ContactGraph with every edge stored in both directions
+            
+        Raises:
+            ValueError: If an endpoint is not in range(population)
         """
-        # plt.hist(round(df['AVG_DEATHS']))
-        # plt.xlabel('Deaths')
-        # plt.ylabel('Frequency')
-        # plt.title('Deaths per Trial')
-        # plt.show()
-    
-        # generate set of health_statuses
-        # column_list = df.columns.tolist()
-        column_list = ['AVG_INFECTED', 'AVG_DEATHS', 'AVG_DEATH_STDV']
-        # print(column_list)
-        # create dict of trial results (each row in df)
-        # print(trials_dict)
-        # trials_dict = {i: values for i, values in enumerate(df.to_numpy())}
-        # ['AVG_SUSCEPTIBLE','AVG_INFECTED', 'AVG_RECOVERED', 'AVG_DEATHS', 'STDV', 'AVG_VACCINATED']
-        df_row_values = df.loc[range(len(df))].values.tolist()
-        print(df_row_values)
-        trials_dict = {i + 1: values for i, values in enumerate(df_row_values)}
-        # print(trials_dict)
-
-        # get number of trials
-        # trial_count = len(df)
-        width = 0.05
-        # multiplier = 0
-        x = np.arange(len(column_list))
-
-        fig, ax = plt.subplots(figsize = (12, 6)) #layout = 'constrained')
-
-        # for trial, values in trials_dict.items():
-        for i, (trial, values) in enumerate(trials_dict.items()):
-            offset = width * i
-            rects = ax.bar(x + offset, values, width, label = f'Trial {trial}')
-            ax.bar_label(rects, padding = 3, rotation = 90)
-            # multiplier += 1
-        
-        ax.set_ylabel('Count')
-        ax.set_title(f'Results by Health Status and Trial ({DEFAULT_POPULATION} Persons Population)')
-        ax.set_xticks(x + width * (len(trials_dict) - 1) / 2)
-        # ax.legend(loc = 'upper left', ncols = trial_count)
-        ax.set_xticklabels(column_list, rotation = 0)
-        # ax.set_ylim(0, 1000)
-        ax.legend()
+        sources, targets = np.asarray(sources, dtype = np.int64), np.asarray(targets, dtype = np.int64)
+        if sources.size and (min(sources.min(), targets.min()) < 0 or max(sources.max(), targets.max()) >= population):
+            raise ValueError(f"edge endpoints must be between 0 and {population - 1}")
+        keep = sources != targets
+        # one sorted key per directed edge orders rows and their neighbours; a plain
+        # sort and a neighbour comparison dedupe much faster than np.unique
+        keys = np.sort(np.concatenate([sources[keep] * population + targets[keep], targets[keep] * population + sources[keep]]))
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if keys.size else keys
+        indptr = np.zeros(population + 1, dtype = np.int64)
+        np.cumsum(np.bincount(keys // population, minlength = population), out = indptr[1:])
+        return cls(indptr, keys % population)
 
-        plt.tight_layout()
-        plt.show() 
-    
-    def plot(self, df: pd.DataFrame) -> None:
+    @classmethod
+    def small_world(cls, population: int, degree: int, rewire_prob: float, rng: np.random.Generator) -> Self:
         """
-        Generate a time series plot of health status counts over days.
+        Generate a Watts-Strogatz small-world graph.
         
-        Creates a line plot showing how the number of susceptible, infected,
-        recovered, and dead individuals changes over the course of the simulation.
-        Saves the plot as 'virus_simulation.png' and displays it.
+        Everyone starts linked to their degree // 2 nearest neighbours on each
+        side of a ring, then each edge's far end is moved to a uniformly random
+        person with probability rewire_prob.
         
         Args:
-            df: DataFrame containing daily health status counts with columns:
-                Day, SUSCEPTIBLE, INFECTED, RECOVERED, DEAD
+            population: Number of people (nodes)
+            degree: Ring-lattice degree before rewiring (even)
+            rewire_prob: Probability (0-1) of rewiring each edge
+            rng: Random generator for the rewiring
+            
+        Returns:
+            ContactGraph of the generated network
+        """
+        Person.validate_probability(rewire_prob, 'rewire_prob')
+        half = min(degree // 2, (population - 1) // 2)
+        sources = np.repeat(np.arange(population, dtype = np.int64), half)
+        targets = (sources + np.tile(np.arange(1, half + 1), population)) % population
+        rewired = rng.random(targets.size) < rewire_prob
+        targets[rewired] = rng.integers(0, population, int(rewired.sum()))
+        return cls.from_edges(sources, targets, population)
+
+    @classmethod
+    def read_edge_list(cls, filename: str, population: int) -> Self:
+        """
+        Read a graph from an edge list file.
+        
+        Each line holds two person indices separated by whitespace (or by a
+        comma for a '.csv' file); lines starting with '#' are ignored.
+        
+        Args:
+            filename: Path of the edge list
+            population: Number of people (nodes)
+            
+        Returns:
+            ContactGraph of the listed edges
+            
+        Raises:
+            ValueError: If an endpoint is not in range(population)
+        """
+        import pandas as pd
+        # pandas' C parser handles both separators quickly, unlike a regex that matches either
+        edges = pd.read_csv(filename, sep = ',' if filename.endswith('.csv') else r'\s+', comment = '#',
+                            header = None, usecols = [0, 1], dtype = np.int64)
+        return cls.from_edges(edges[0].to_numpy(), edges[1].to_numpy(), population)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the memory used by the graph's arrays.
+        
+        Returns:
+            Total size of indptr, indices and degree in bytes
         """
-        plt.figure(figsize=(10, 6))
-        plt.plot(df['Day'], df[HS.SUSCEPTIBLE], label='Susceptible', color='blue')
-        plt.plot(df['Day'], df[HS.INFECTED], label='Infected', color='red')
-        plt.plot(df['Day'], df[HS.RECOVERED], label='Recovered', color='green')
-        plt.plot(df['Day'], df[HS.DEAD], label='Dead', color='black')
+        return self.indptr.nbytes + self.indices.nbytes + self.degree.nbytes
 
-        plt.title('Virus Spread Simulation Over Time')
-        plt.xlabel('Days')
-        plt.ylabel('Number of People')
-        plt.legend()
-        plt.grid(True)
+    def infected_neighbours(self, infected: np.ndarray) -> np.ndarray:
+        """
+        Count every person's infected neighbours.
+        
+        Args:
+            infected: Boolean array marking infected people
+            
+        Returns:
+            Array of infected-neighbour counts, one entry per person
+        """
+        # scatter from the infected rows only, so the cost follows the infected
+        # people's edges rather than the whole graph's
+        rows = np.flatnonzero(infected)
+        starts, lengths = self.indptr[rows], self.degree[rows]
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        return np.bincount(self.indices[offsets], minlength = self.degree.size)
 
-        plt.savefig('virus_simulation.png')
-        plt.show() 
+@lru_cache(maxsize = 1)
+def read_contact_graph(filename: str, population: int) -> ContactGraph:
+    """
+    Read an edge list once per process and reuse it for every trial.
     
-@app.command()
-def visualize(
-    # dmin: Annotated[int, typer.Argument()],
-    #         dmax: Annotated[int, typer.Argument()],
-            input_file: Annotated[str, typer.Argument()]):
+    Args:
+        filename: Path of the edge list
+        population: Number of people (nodes)
+        
+    Returns:
+        ContactGraph of the listed edges (see ContactGraph.read_edge_list)
+    """
+    return ContactGraph.read_edge_list(filename, population)
+
+@dataclass(frozen = True)
+class ContactNetwork:
     """
-    CLI command to visualize analysis results.
+    How to build a simulation's contact graph.
     
-    Reads a CSV file containing trial statistics and generates a histogram
-    comparing results across multiple trials.
+    Small enough to ship to worker processes in place of the graph itself:
+    each trial generates its small-world graph from its own random stream, and
+    an edge list is read once per process.
     
-    Args:
-        input_file: Path to CSV file containing analysis results (typically from analyze command)
+    Attributes:
+        model: Contact model (default: WELL_MIXED, no graph)
+        degree: Ring-lattice degree of a small-world graph (default: 10)
+        rewire_prob: Rewiring probability of a small-world graph (default: 0.1)
+        edge_list: Edge list file for the EDGE_LIST model (default: None)
     """
-    vis = Visualize(0, 0)  # dmin and dmax currently unused
-    df = vis.read_file(input_file)
-    vis.generate_histogram(df)
+    model: ContactModel = ContactModel.WELL_MIXED
+    degree: int = DEFAULT_GRAPH_DEGREE
+    rewire_prob: float = DEFAULT_REWIRE_PROB
+    edge_list: str | None = None
 
-@app.command()
-def analyze(nsimulations: Annotated[int, typer.Argument],
-            vprob: Annotated[float, typer.Argument()],
-            tprob: Annotated[float, typer.Argument()] = 0.05, 
-            dprob: Annotated[float, typer.Argument()] = 0.05,
-            days: Annotated[int, typer.Argument()] = DEFAULT_DAYS,
-            infected: Annotated[int, typer.Argument()] = DEFAULT_INFECTED_INITIAL,
-            population_count: Annotated[int, typer.Argument()] = DEFAULT_POPULATION,
-            output_file: Annotated[str, typer.Argument()] = ANALYZE_FILE): 
+    def build(self, population: int, rng: np.random.Generator) -> ContactGraph | None:
+        """
+        Build the contact graph for one simulation.
+        
+        Args:
+            population: Number of people (nodes)
+            rng: Random generator for generated graphs
+            
+        Returns:
+            ContactGraph, or None for the well-mixed model
+        """
+        if self.model == ContactModel.SMALL_WORLD:
+            return ContactGraph.small_world(population, self.degree, self.rewire_prob, rng)
+        if self.model == ContactModel.EDGE_LIST:
+            return read_contact_graph(self.edge_list, population)
+        return None
+
+    def identity(self) -> dict:
+        """
+        Describe the network for cache keys and checkpoints.
+        
+        Returns:
+            Dictionary of the settings that affect results; an edge list is
+            identified by its path and modification time
+        """
+        if self.model == ContactModel.SMALL_WORLD:
+            return {'contact_model': self.model.value, 'degree': self.degree, 'rewire_prob': self.rewire_prob}
+        if self.model == ContactModel.EDGE_LIST:
+            return {'contact_model': self.model.value, 'edge_list': os.path.abspath(self.edge_list),
+                    'edge_list_mtime': os.path.getmtime(self.edge_list)}
+        return {'contact_model': self.model.value}
+
+def exposure_probability(population, infected) -> float | np.ndarray:
     """
-    CLI command to run multiple simulations and analyze results.
+    Probability that a susceptible person's daily contacts include an infected person.
     
-    Executes the specified number of simulation trials with the same parameters
-    and calculates average statistics (infected, deaths, standard deviation)
-    across all trials. Results are saved to a CSV file.
+    Mirrors the contact draw in Simulation._handle_susceptible: a person has
+    randint(1, MAX_DAILY_CONTACTS) exposures and meets randint(1, min(exposures, population))
+    people sampled without replacement. The number of contacts is marginalized out,
+    leaving a single probability per day that can be compared against one uniform draw.
+    
+    On a contact graph the pool a person draws from is their neighbours, so
+    population is their degree and infected their number of infected neighbours.
     
     Args:
-        nsimulations: Number of simulation trials to run
-        vprob: Vaccination probability (fraction of population vaccinated)
-        tprob: Transmission probability (default: 0.05)
-        dprob: Death probability for infected individuals (default: 0.05)
-        days: Number of days to simulate (default: 50)
-        infected: Initial number of infected individuals (default: 10)
-        population_count: Total population size (default: 1000)
-        output_file: Name of output CSV file (default: 'analyze.csv')
-    """ 
-    vaccinated: int = int(vprob * population_count)
-    # adf = pd.DataFrame(columns = ['AVG_SUSCEPTIBLE', 'AVG_INFECTED', 'AVG_RECOVERED', 'AVG_DEATHS', 'AVG_DEATH_STDV', 'AVG_VACCINATED'])
-    adf = pd.DataFrame(columns = ['AVG_INFECTED', 'AVG_DEATHS', 'AVG_DEATH_STDV'])
-    for trial in range(nsimulations):
-        print(f"trial number {trial + 1} in progress...")
-        sim = Simulation(population_count, infected, vaccinated) 
-        adf_dict = sim.generate_statistics_dict()
-        df = sim.run(tprob, dprob, days)
-        # adf_dict['AVG_SUSCEPTIBLE'], adf_dict['AVG_INFECTED'], adf_dict['AVG_RECOVERED'], adf_dict['AVG_DEATHS'], adf_dict['AVG_STDV'], adf_dict['AVG_VACCINATED'] = sim.calculate_stats(df)
-        adf_dict['AVG_INFECTED'], adf_dict['AVG_DEATHS'], adf_dict['AVG_DEATH_STDV'] = sim.calculate_stats(df)
-        adf_dict['Trial'] = trial
-        adf.loc[trial + 1] = adf_dict
-    print(adf)
-    sim.write_values_to_file(adf, output_file)
+        population: Size of the pool contacts are drawn from (scalar, or array of
+            per-person pool sizes)
+        infected: Number of infected individuals in the pool (scalar or array)
+        
+    Returns:
+        Probability (0-1) of meeting at least one infected person, with the
+        broadcast shape of population and infected
+    """
+    population = np.asarray(population)
+    contact_weights = CONTACT_WEIGHTS[np.clip(population, 0, MAX_DAILY_CONTACTS)]
+    draws = np.arange(MAX_DAILY_CONTACTS)
+    population = population[..., None]
+    infected = np.asarray(infected, dtype = float)[..., None]
+    # hypergeometric probability that the first k contacts are all uninfected
+    ratios = np.clip(population - infected - draws, 0, None) / np.maximum(population - draws, 1)
+    p_none = np.cumprod(ratios, axis = -1)
+    return ((1 - p_none) * contact_weights).sum(axis = -1)
 
-@app.command()
-def simulate(vprob: Annotated[float, typer.Argument()],
-             tprob: Annotated[float, typer.Argument()] = 0.5, 
-             dprob: Annotated[float, typer.Argument()] = 0.5,
-             infected: Annotated[int, typer.Argument()] = DEFAULT_INFECTED_INITIAL,
-             days: Annotated[int, typer.Argument()] = DEFAULT_DAYS,
-             population_count: Annotated[int, typer.Argument()] = DEFAULT_POPULATION,
-             output_file: Annotated[str, typer.Argument()] = SIMULATE_FILE): 
+class NumpySimulation(Simulation):
     """
-    CLI command to run a single virus spread simulation.
+    Vectorized simulation engine.
     
-    Executes one simulation trial with the specified parameters, tracks health
-    status changes over time, and outputs results to a CSV file. Also prints
-    a summary report to the console.
+    Stores the population as NumPy arrays instead of Person views and
+    performs each day's transitions as batched array operations. Shares run()
+    with Simulation, so it produces the same daily-count DataFrame or array.
     
-    Args:
-        vprob: Vaccination probability (fraction of population vaccinated)
-        tprob: Transmission probability (default: 0.5)
+    Transitions are decided from the state at the start of each day, so a person
+    infected today is first checked for death or recovery tomorrow.
+    
+    Because of that, contiguous chunks of the population can be updated
+    independently. With threads > 1 the population is split into that many
+    chunks, each with its own random substream spawned from rng, and each day
+    the chunks are updated on a thread pool (NumPy's kernels release the GIL)
+    and their transition counts summed into status_counts. Results are
+    reproducible for a fixed seed and thread count, but differ between thread
+    counts since the draws are split differently.
+    
+    With a contact graph, a person's contacts are drawn from their neighbours
+    only: exposure_probability is evaluated per person with their degree and
+    their number of infected neighbours at the start of the day.
+    
+    Attributes:
+        health_status: int8 array of HS values, one entry per person
+        sick_days: Array of days each person has been sick
+        transmission_rate: Array of individual susceptibility factors (0-1)
+        threads: Number of chunks updated in parallel each day
+        graph: ContactGraph limiting who meets whom (None for a well-mixed population)
+    """
+    
+    def __init__(self, population: int, infected: int, vaccinated: int, rng: np.random.Generator | None = None, threads: int = 1,
+                 network: ContactNetwork | None = None):
+        """
+        Initialize a vectorized simulation with a population.
+        
+        Args:
+            population: Total number of individuals in the population
+            infected: Number of initially infected individuals
+            vaccinated: Number of vaccinated individuals
+            rng: NumPy random generator (default: a freshly seeded generator)
+            threads: Number of population chunks updated in parallel (default: 1)
+            network: Contact network to build, drawing from rng after the
+                population (default: None, well-mixed)
+            
+        Raises:
+            ValueError: If threads is not positive
+        """
+        if threads < 1:
+            raise ValueError("threads must be a positive number")
+        self.vaccinated = vaccinated
+        self._infected = infected
+        self._total_population = population
+        self._rng = rng if rng is not None else np.random.default_rng()
+        health_status = np.full(population, HS.SUSCEPTIBLE, dtype = np.int8)
+        health_status[:infected] = HS.INFECTED
+        health_status[infected:infected + vaccinated] = HS.VACCINATED
+        sick_days = np.zeros(population, dtype = np.int64)
+        sick_days[:infected] = 1
+        order = self._rng.permutation(population)
+        self.health_status = health_status[order]
+        self.sick_days = sick_days[order]
+        self.transmission_rate = self._rng.random(population)
+        self.graph = network.build(population, self._rng) if network is not None else None
+        self.threads = threads
+        if threads > 1:
+            bounds = np.linspace(0, population, threads + 1).astype(int)
+            self._chunks = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+            self._chunk_rngs = self._rng.spawn(threads)
+        self._executor: ThreadPoolExecutor | None = None
+
+    def run(self, tprob: float, dprob: float, days: int, as_array: bool = False, sink: ResultSink | None = None) -> pd.DataFrame | np.ndarray:
+        """
+        Run the simulation for a specified number of days (see Simulation.run).
+        
+        With threads > 1, the thread pool that updates the chunks lives for the
+        duration of the run.
+        
+        Args:
+            tprob: Transmission probability (0-1) for susceptible individuals
+            dprob: Death probability (0-1) for infected individuals
+            days: Number of days to simulate
+            as_array: Return the raw integer count array instead of a DataFrame (default: False)
+            sink: ResultSink that receives each day's counts (default: None)
+            
+        Returns:
+            DataFrame with daily counts of each health status, or the raw count array
+        """
+        if self.threads == 1:
+            return super().run(tprob, dprob, days, as_array, sink)
+        self._executor = ThreadPoolExecutor(self.threads)
+        try:
+            return super().run(tprob, dprob, days, as_array, sink)
+        finally:
+            self._executor.shutdown()
+            self._executor = None
+
+    def step(self, status_counts: dict, tprob: float, dprob: float) -> None:
+        """
+        Advance the whole population by one day.
+        
+        Args:
+            status_counts: Dictionary tracking counts of each health status
+            tprob: Transmission probability
+            dprob: Death probability
+        """
+        if status_counts[HS.INFECTED] == 0:
+            return
+        if self.graph is None:
+            p_exposed, infected_neighbours = exposure_probability(self._total_population, status_counts[HS.INFECTED]), None
+        else:
+            p_exposed, infected_neighbours = None, self.graph.infected_neighbours(self.health_status == HS.INFECTED)
+        if self.threads == 1:
+            ninfected, ndead, nrecovered = self._step_chunk(slice(None), self._rng, p_exposed, tprob, dprob, infected_neighbours)
+        else:
+            chunk_args = (self._chunks, self._chunk_rngs, [p_exposed] * self.threads, [tprob] * self.threads, [dprob] * self.threads,
+                          [infected_neighbours] * self.threads)
+            # outside run() there is no pool, so the chunks are updated in turn
+            chunk_counts = self._executor.map(self._step_chunk, *chunk_args) if self._executor else map(self._step_chunk, *chunk_args)
+            ninfected, ndead, nrecovered = np.sum(list(chunk_counts), axis = 0).tolist()
+        status_counts[HS.SUSCEPTIBLE] -= ninfected
+        status_counts[HS.INFECTED] += ninfected - ndead - nrecovered
+        status_counts[HS.DEAD] += ndead
+        status_counts[HS.RECOVERED] += nrecovered
+
+    def _step_chunk(self, chunk: slice, rng: np.random.Generator, p_exposed: float | None, tprob: float, dprob: float,
+                    infected_neighbours: np.ndarray | None = None) -> tuple:
+        """
+        Advance one contiguous chunk of the population by one day.
+        
+        Only touches the chunk's slice of the arrays and draws only from rng,
+        so chunks can run concurrently.
+        
+        Args:
+            chunk: Slice of the population to update
+            rng: Random generator of the chunk
+            p_exposed: Probability that a susceptible person meets an infected one today
+                (None on a contact graph)
+            tprob: Transmission probability
+            dprob: Death probability
+            infected_neighbours: Start-of-day infected-neighbour count of every person
+                on a contact graph (default: None, well-mixed)
+            
+        Returns:
+            Tuple of (new infections, deaths, recoveries) in the chunk
+        """
+        health_status, sick_days = self.health_status[chunk], self.sick_days[chunk]
+        candidates = np.flatnonzero((health_status == HS.SUSCEPTIBLE) & (self.transmission_rate[chunk] < tprob))
+        if infected_neighbours is not None:
+            # only people with an infected neighbour can be exposed
+            neighbours = infected_neighbours[chunk][candidates]
+            exposed = neighbours > 0
+            candidates = candidates[exposed]
+            p_exposed = exposure_probability(self.graph.degree[chunk][candidates], neighbours[exposed])
+        newly_infected = candidates[rng.random(candidates.size) < p_exposed]
+
+        sick = np.flatnonzero(health_status == HS.INFECTED)
+        dies = rng.random(sick.size) < dprob
+        recovery_factor = rng.random(sick.size)
+        recovers = ~dies & (sick_days[sick] + 3.0 * recovery_factor > MAX_SICK_DAYS)
+        health_status[sick[dies]] = HS.DEAD
+        health_status[sick[recovers]] = HS.RECOVERED
+        sick_days[sick[~dies & ~recovers]] += 1
+
+        health_status[newly_infected] = HS.INFECTED
+        sick_days[newly_infected] = 1
+        return newly_infected.size, int(dies.sum()), int(recovers.sum())
+
+class MappedSimulation(NumpySimulation):
+    """
+    Out-of-core vectorized engine.
+    
+    Keeps health_status (int8), sick_days (uint16) and transmission_rate
+    (float32) in memory-mapped .npy files in state_dir, 7 bytes of disk per
+    person, and advances them in tiles of tile_size people. Only one tile's
+    temporaries are held in memory at a time, and the operating system pages
+    the mapped files in and out, so populations larger than RAM (hundreds of
+    millions of people) can be simulated. The population is also built tile
+    by tile, with each tile's infected and vaccinated counts drawn from a
+    multivariate hypergeometric distribution so the initial statuses are as
+    uniformly shuffled as NumpySimulation's.
+    
+    After every day the files are flushed and the day's counts, the random
+    generator's state and the status counts are saved to state.json and
+    counts.npy. MappedSimulation.open continues from there without rebuilding
+    the population, and gives the same results as an uninterrupted run. An
+    interrupt (Ctrl-C) during run takes effect once the current day has been
+    saved. A day cut short any other way (a crash or kill) leaves the state
+    marked as in progress, and open refuses it.
+    
+    Attributes:
+        state_dir: Directory of the mapped arrays and saved state
+        tile_size: Number of people updated per tile
+        parameters: Caller's description of the run, saved with the state
+    """
+    STATE_FILE = 'state.json'
+    COUNTS_FILE = 'counts.npy'
+    ARRAYS = {'health_status': np.int8, 'sick_days': np.uint16, 'transmission_rate': np.float32}
+    
+    def __init__(self, population: int, infected: int, vaccinated: int, state_dir: str, rng: np.random.Generator | None = None,
+                 tile_size: int = DEFAULT_TILE_SIZE, parameters: dict | None = None):
+        """
+        Build a population in memory-mapped files, replacing any state in state_dir.
+        
+        Args:
+            population: Total number of individuals in the population
+            infected: Number of initially infected individuals
+            vaccinated: Number of vaccinated individuals
+            state_dir: Directory for the mapped arrays and saved state (created if missing)
+            rng: NumPy random generator (default: a freshly seeded generator)
+            tile_size: Number of people updated per tile (default: 1,000,000)
+            parameters: JSON-serializable description of the run, saved with the state (default: None)
+            
+        Raises:
+            ValueError: If tile_size is not positive
+        """
+        if tile_size < 1:
+            raise ValueError("tile_size must be a positive number")
+        from numpy.lib.format import open_memmap
+        os.makedirs(state_dir, exist_ok = True)
+        self._setup(population, infected, vaccinated, state_dir, rng if rng is not None else np.random.default_rng(), tile_size, parameters)
+        for name, dtype in self.ARRAYS.items():
+            setattr(self, name, open_memmap(os.path.join(state_dir, f'{name}.npy'), mode = 'w+', dtype = dtype, shape = (population,)))
+        # split the infected and vaccinated people across tiles as a shuffle of the whole population would
+        sizes = np.array([tile.stop - tile.start for tile in self._tiles], dtype = np.int64)
+        tile_infected = self._rng.multivariate_hypergeometric(sizes, infected, method = 'marginals')
+        tile_vaccinated = self._rng.multivariate_hypergeometric(sizes - tile_infected, vaccinated, method = 'marginals')
+        for tile, ninfected, nvaccinated in zip(self._tiles, tile_infected, tile_vaccinated):
+            health_status = np.full(tile.stop - tile.start, HS.SUSCEPTIBLE, dtype = np.int8)
+            health_status[:ninfected] = HS.INFECTED
+            health_status[ninfected:ninfected + nvaccinated] = HS.VACCINATED
+            health_status = health_status[self._rng.permutation(health_status.size)]
+            self.health_status[tile] = health_status
+            self.sick_days[tile] = health_status == HS.INFECTED
+            self.transmission_rate[tile] = self._rng.random(health_status.size, dtype = np.float32)
+        self._day = 0
+        np.save(os.path.join(state_dir, self.COUNTS_FILE), np.zeros((0, len(STATUS_COLUMNS)), dtype = np.int64))
+        self._save_state(in_progress = False)
+
+    def _setup(self, population: int, infected: int, vaccinated: int, state_dir: str, rng: np.random.Generator,
+               tile_size: int, parameters: dict | None) -> None:
+        """Set the attributes shared by a new and a reopened simulation."""
+        self.vaccinated = vaccinated
+        self._infected = infected
+        self._total_population = population
+        self._rng = rng
+        self.state_dir = state_dir
+        self.tile_size = tile_size
+        self.parameters = parameters
+        self.graph = None
+        self.threads = 1
+        self._executor = None
+        self._interrupted = False
+        self._tiles = [slice(start, min(start + tile_size, population)) for start in range(0, population, tile_size)]
+
+    @classmethod
+    def open(cls, state_dir: str) -> Self:
+        """
+        Reopen the saved state of an earlier run to continue it.
+        
+        Args:
+            state_dir: Directory written by MappedSimulation
+            
+        Returns:
+            MappedSimulation that continues from the last saved day
+            
+        Raises:
+            FileNotFoundError: If state_dir holds no saved state
+            ValueError: If the state was left in the middle of a day
+        """
+        state = load_checkpoint(os.path.join(state_dir, cls.STATE_FILE))
+        if state['in_progress']:
+            raise ValueError(f"the state in {state_dir} was interrupted in the middle of day {state['day']} and cannot be continued")
+        rng = np.random.default_rng()
+        rng.bit_generator.state = state['rng']
+        sim = cls.__new__(cls)
+        sim._setup(state['population'], state['infected'], state['vaccinated'], state_dir, rng, state['tile_size'], state['parameters'])
+        for name in cls.ARRAYS:
+            setattr(sim, name, np.load(os.path.join(state_dir, f'{name}.npy'), mmap_mode = 'r+'))
+        sim._day = state['day']
+        return sim
+
+    def _save_state(self, in_progress: bool) -> None:
+        """
+        Save everything but the mapped arrays and daily counts to state.json.
+        
+        Args:
+            in_progress: Whether the arrays are about to be modified by the next day
+        """
+        state = {'population': self._total_population, 'infected': self._infected, 'vaccinated': self.vaccinated,
+                 'tile_size': self.tile_size, 'parameters': self.parameters, 'day': self._day, 'in_progress': in_progress,
+                 'rng': self._rng.bit_generator.state}
+        write_checkpoint(os.path.join(self.state_dir, self.STATE_FILE), state)
+
+    def run(self, tprob: float, dprob: float, days: int, as_array: bool = False, sink: ResultSink | None = None) -> pd.DataFrame | np.ndarray:
+        """
+        Run or continue the simulation for a specified number of days (see Simulation.run).
+        
+        Days already saved in state_dir are not simulated again; their counts are
+        returned (and written to sink) with the new ones.
+        
+        Args:
+            tprob: Transmission probability (0-1) for susceptible individuals
+            dprob: Death probability (0-1) for infected individuals
+            days: Total number of days, including those already saved
+            as_array: Return the raw integer count array instead of a DataFrame (default: False)
+            sink: ResultSink that receives each day's counts (default: None)
+            
+        Returns:
+            DataFrame with daily counts of each health status, or the raw count array
+            
+        Raises:
+            KeyboardInterrupt: After saving the current day, if interrupted during it
+        """
+        import signal
+        import threading
+        # signal handlers can only be installed from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return super().run(tprob, dprob, days, as_array, sink)
+        def defer_interrupt(signum, frame):
+            self._interrupted = True
+        previous = signal.signal(signal.SIGINT, defer_interrupt)
+        try:
+            return super().run(tprob, dprob, days, as_array, sink)
+        finally:
+            signal.signal(signal.SIGINT, previous)
+
+    def _restore_days(self, counts: np.ndarray) -> tuple:
+        """
+        Fill counts with the saved days and resume after the last of them.
+        
+        Args:
+            counts: days x 6 count array of the run
+            
+        Returns:
+            Tuple of (first day to simulate, status counts at the start of that day)
+        """
+        if self._day == 0:
+            return 0, self.health_status_dict()
+        saved = np.load(os.path.join(self.state_dir, self.COUNTS_FILE))
+        # a longer run continues after the saved days, a shorter one only reports its first days
+        first_day = min(self._day, len(counts))
+        counts[:first_day] = saved[:first_day]
+        return first_day, Counter(dict(zip(STATUS_COLUMNS, saved[first_day - 1].tolist())))
+
+    def _end_day(self, counts: np.ndarray, status_counts: dict) -> None:
+        """
+        Save the day once its updates have reached the mapped files.
+        
+        Args:
+            counts: Count rows of every day so far
+            status_counts: Status counts at the end of the day
+            
+        Raises:
+            KeyboardInterrupt: If an interrupt was deferred during the day
+        """
+        for name in self.ARRAYS:
+            getattr(self, name).flush()
+        np.save(os.path.join(self.state_dir, self.COUNTS_FILE), counts)
+        self._day = len(counts)
+        self._save_state(in_progress = False)
+        if self._interrupted:
+            self._interrupted = False
+            raise KeyboardInterrupt(f"stopped after day {self._day - 1}; state saved in {self.state_dir}")
+
+    def step(self, status_counts: dict, tprob: float, dprob: float) -> None:
+        """
+        Advance the whole population by one day, one tile at a time.
+        
+        Args:
+            status_counts: Dictionary tracking counts of each health status
+            tprob: Transmission probability
+            dprob: Death probability
+        """
+        if status_counts[HS.INFECTED] == 0:
+            return
+        self._save_state(in_progress = True)
+        p_exposed = exposure_probability(self._total_population, status_counts[HS.INFECTED])
+        ninfected = ndead = nrecovered = 0
+        for tile in self._tiles:
+            tile_infected, tile_dead, tile_recovered = self._step_chunk(tile, self._rng, p_exposed, tprob, dprob)
+            ninfected, ndead, nrecovered = ninfected + tile_infected, ndead + tile_dead, nrecovered + tile_recovered
+        status_counts[HS.SUSCEPTIBLE] -= ninfected
+        status_counts[HS.INFECTED] += ninfected - ndead - nrecovered
+        status_counts[HS.DEAD] += ndead
+        status_counts[HS.RECOVERED] += nrecovered
+
+class CompartmentalSimulation(Simulation):
+    """
+    Aggregate stochastic engine.
+    
+    Advances status counts instead of individual people, with the same
+    transition probabilities as NumpySimulation:
+    
+    - A susceptible person can only be infected if their transmission rate is
+      below tprob. Rates are uniform and fixed, so at the start of run a
+      Binomial(susceptible, tprob) draw splits the susceptible people into those
+      at risk and those who never will be.
+    - Each day Binomial(at risk, exposure_probability(population, infected))
+      of the people at risk are infected.
+    - Infected people are held in cohorts by sick days. Each cohort loses
+      Binomial(size, dprob) deaths, and then a Binomial draw of recoveries
+      among the survivors with the probability that sick_days + 3 * U exceeds
+      MAX_SICK_DAYS. The rest move on to the next cohort.
+    
+    A day costs a handful of draws over MAX_SICK_DAYS cohorts whatever the
+    population, but per-person detail (who is infected, individual transmission
+    rates) is not available.
+    
+    Attributes:
+        cohorts: Array of infected counts indexed by sick days (index 0 unused)
+    """
+    # probability of recovering with d sick days, given survival: P(d + 3U > MAX_SICK_DAYS)
+    RECOVERY_PROB = np.clip((np.arange(MAX_SICK_DAYS + 1) - (MAX_SICK_DAYS - 3)) / 3, 0, 1)
+    
+    def __init__(self, population: int, infected: int, vaccinated: int, rng: np.random.Generator | None = None):
+        """
+        Initialize a compartmental simulation.
+        
+        Args:
+            population: Total number of individuals in the population
+            infected: Number of initially infected individuals
+            vaccinated: Number of vaccinated individuals
+            rng: NumPy random generator (default: a freshly seeded generator)
+        """
+        self.vaccinated = vaccinated
+        self._infected = infected
+        self._total_population = population
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self.cohorts = np.zeros(MAX_SICK_DAYS + 1, dtype = np.int64)
+        self.cohorts[1] = infected
+        self._at_risk = 0
+
+    def run(self, tprob: float, dprob: float, days: int, as_array: bool = False, sink: ResultSink | None = None) -> pd.DataFrame | np.ndarray:
+        """
+        Run the simulation for a specified number of days (see Simulation.run).
+        
+        Args:
+            tprob: Transmission probability (0-1) for susceptible individuals
+            dprob: Death probability (0-1) for infected individuals
+            days: Number of days to simulate
+            as_array: Return the raw integer count array instead of a DataFrame (default: False)
+            sink: ResultSink that receives each day's counts (default: None)
+            
+        Returns:
+            DataFrame with daily counts of each health status, or the raw count array
+        """
+        Person.validate_probability(tprob, 'tprob')
+        susceptible = self._total_population - (self._infected + self.vaccinated)
+        self._at_risk = int(self._rng.binomial(susceptible, tprob))
+        return super().run(tprob, dprob, days, as_array, sink)
+
+    def step(self, status_counts: dict, tprob: float, dprob: float) -> None:
+        """
+        Advance the status counts and sick-day cohorts by one day.
+        
+        Args:
+            status_counts: Dictionary tracking counts of each health status
+            tprob: Transmission probability (already applied when splitting off the people at risk)
+            dprob: Death probability
+        """
+        if status_counts[HS.INFECTED] == 0:
+            return
+        p_exposed = exposure_probability(self._total_population, status_counts[HS.INFECTED])
+        ninfected = int(self._rng.binomial(self._at_risk, p_exposed))
+        deaths = self._rng.binomial(self.cohorts, dprob)
+        recoveries = self._rng.binomial(self.cohorts - deaths, self.RECOVERY_PROB)
+        # nobody outlasts the last cohort, whose recovery probability is 1
+        self.cohorts[2:] = (self.cohorts - deaths - recoveries)[1:-1]
+        self.cohorts[1] = ninfected
+        self._at_risk -= ninfected
+        ndead, nrecovered = int(deaths.sum()), int(recoveries.sum())
+        status_counts[HS.SUSCEPTIBLE] -= ninfected
+        status_counts[HS.INFECTED] += ninfected - ndead - nrecovered
+        status_counts[HS.DEAD] += ndead
+        status_counts[HS.RECOVERED] += nrecovered
+
+class BatchedSimulation:
+    """
+    Batched multi-trial engine.
+    
+    Holds a block of independent trials as rows of (trials x population) state
+    matrices and advances all of them together one day at a time, so running
+    many trials costs no per-trial Python loop over the population. Each trial
+    draws from its own generator in the same order as NumpySimulation, so row t
+    reproduces a NumpySimulation seeded with seeds[t] exactly.
+    
+    Memory grows with trials x population; analyze bounds it by running
+    trials in blocks of default_batch_size(population, days) rows.
+    
+    Attributes:
+        health_status: int8 matrix of HS values, one row per trial
+        sick_days: Matrix of days each person has been sick
+        transmission_rate: Matrix of individual susceptibility factors (0-1)
+        profiler: Profiler recording each day's timings and transitions during run (None disables profiling)
+    """
+    profiler: Profiler | None = None
+    
+    def __init__(self, seeds: List[np.random.SeedSequence], population: int, infected: int, vaccinated: int):
+        """
+        Initialize a block of trials with identical parameters.
+        
+        Args:
+            seeds: One seed sequence per trial (row)
+            population: Total number of individuals in each population
+            infected: Number of initially infected individuals
+            vaccinated: Number of vaccinated individuals
+        """
+        self._total_population = population
+        self._rngs = [np.random.default_rng(seed) for seed in seeds]
+        health_status = np.full(population, HS.SUSCEPTIBLE, dtype = np.int8)
+        health_status[:infected] = HS.INFECTED
+        health_status[infected:infected + vaccinated] = HS.VACCINATED
+        sick_days = np.zeros(population, dtype = np.int64)
+        sick_days[:infected] = 1
+        orders = np.stack([rng.permutation(population) for rng in self._rngs])
+        self.health_status = health_status[orders]
+        self.sick_days = sick_days[orders]
+        self.transmission_rate = np.stack([rng.random(population) for rng in self._rngs])
+        initial_counts = {'Day': 0, HS.SUSCEPTIBLE: population - (infected + vaccinated), HS.INFECTED: infected,
+                          HS.RECOVERED: 0, HS.DEAD: 0, HS.VACCINATED: vaccinated}
+        self._status_counts = np.tile([initial_counts[column] for column in STATUS_COLUMNS], (len(seeds), 1))
+
+    def run(self, tprob: float, dprob: float, days: int) -> np.ndarray:
+        """
+        Run every trial in the block for a specified number of days.
+        
+        Args:
+            tprob: Transmission probability (0-1) for susceptible individuals
+            dprob: Death probability (0-1) for infected individuals
+            days: Number of days to simulate
+            
+        Returns:
+            trials x days x 6 integer array; row t is the count array
+            Simulation.run(..., as_array = True) returns for trial t
+            
+        Raises:
+            ValueError: If tprob or dprob is not between 0 and 1
+        """
+        Person.validate_probability(tprob, 'tprob')
+        Person.validate_probability(dprob, 'dprob')
+        counts = np.zeros((len(self._rngs), days, len(STATUS_COLUMNS)), dtype = np.int64)
+        status_counts = self._status_counts
+        profiler = self.profiler
+        for day in range(days):
+            if profiler is not None:
+                before, start = status_counts.sum(axis = 0), time.perf_counter()
+            self.step(status_counts, tprob, dprob)
+            if profiler is not None:
+                after = status_counts.sum(axis = 0)
+                # transitions are summed over the block's trials
+                column = STATUS_COLUMNS.index
+                profiler.record_day(day, time.perf_counter() - start, infections = int(before[column(HS.SUSCEPTIBLE)] - after[column(HS.SUSCEPTIBLE)]),
+                                    deaths = int(after[column(HS.DEAD)] - before[column(HS.DEAD)]),
+                                    recoveries = int(after[column(HS.RECOVERED)] - before[column(HS.RECOVERED)]))
+            status_counts[:, 0] = day
+            counts[:, day] = status_counts
+            if not status_counts[:, STATUS_COLUMNS.index(HS.INFECTED)].any():
+                # every trial has burned out: the remaining days repeat this one
+                counts[:, day + 1:] = status_counts[:, None, :]
+                counts[:, day + 1:, 0] = np.arange(day + 1, days)
+                break
+        return counts
+
+    def step(self, status_counts: np.ndarray, tprob: float, dprob: float) -> None:
+        """
+        Advance every trial by one day.
+        
+        Args:
+            status_counts: trials x 6 array of current counts, columns ordered as STATUS_COLUMNS
+            tprob: Transmission probability
+            dprob: Death probability
+        """
+        population, trials = self._total_population, len(self._rngs)
+        health_status, sick_days = self.health_status.reshape(-1), self.sick_days.reshape(-1)
+        infected = status_counts[:, STATUS_COLUMNS.index(HS.INFECTED)]
+        p_exposed = exposure_probability(population, infected)
+        # flat indices are ordered by trial, so each trial's draws line up with its own candidates
+        candidates = np.flatnonzero((self.health_status == HS.SUSCEPTIBLE) & (self.transmission_rate < tprob) & (infected > 0)[:, None])
+        candidate_trials = candidates // population
+        draws = self._draw(np.bincount(candidate_trials, minlength = trials))
+        newly_infected = candidates[draws < p_exposed[candidate_trials]]
+
+        sick = np.flatnonzero(self.health_status == HS.INFECTED)
+        sick_trials = sick // population
+        sick_per_trial = np.bincount(sick_trials, minlength = trials)
+        dies = self._draw(sick_per_trial) < dprob
+        recovery_factor = self._draw(sick_per_trial)
+        recovers = ~dies & (sick_days[sick] + 3.0 * recovery_factor > MAX_SICK_DAYS)
+        health_status[sick[dies]] = HS.DEAD
+        health_status[sick[recovers]] = HS.RECOVERED
+        sick_days[sick[~dies & ~recovers]] += 1
+
+        health_status[newly_infected] = HS.INFECTED
+        sick_days[newly_infected] = 1
+
+        nnew = np.bincount(newly_infected // population, minlength = trials)
+        ndead = np.bincount(sick_trials[dies], minlength = trials)
+        nrecovered = np.bincount(sick_trials[recovers], minlength = trials)
+        status_counts[:, STATUS_COLUMNS.index(HS.SUSCEPTIBLE)] -= nnew
+        status_counts[:, STATUS_COLUMNS.index(HS.INFECTED)] += nnew - ndead - nrecovered
+        status_counts[:, STATUS_COLUMNS.index(HS.DEAD)] += ndead
+        status_counts[:, STATUS_COLUMNS.index(HS.RECOVERED)] += nrecovered
+
+    def _draw(self, sizes: np.ndarray) -> np.ndarray:
+        """
+        Draw uniform numbers from each trial's generator and concatenate them in trial order.
+        
+        Args:
+            sizes: Number of draws for each trial
+            
+        Returns:
+            1-D array of sizes.sum() uniform numbers
+        """
+        return np.concatenate([rng.random(size) for rng, size in zip(self._rngs, sizes)])
+
+def default_batch_size(population: int, days: int = DEFAULT_DAYS) -> int:
+    """
+    Number of trials per BatchedSimulation block that fits in BATCH_MEMORY_BYTES.
+    
+    The bound covers the state matrices, the temporaries of a step and the
+    trials x days x 6 count array run returns.
+    
+    Args:
+        population: Population size of each trial
+        days: Number of simulated days (default: 50)
+        
+    Returns:
+        Trials per block (at least 1)
+    """
+    # state: int8 status + int64 sick days + float64 transmission rate per person;
+    # step: int64 flat indices, trial ids, gathers and float64 draws of every susceptible
+    # or infected person, measured at up to 42 bytes per person at once
+    per_person = 17 + 48
+    per_trial = per_person * max(population, 1) + days * len(STATUS_COLUMNS) * np.dtype(np.int64).itemsize
+    return max(1, BATCH_MEMORY_BYTES // per_trial)
+
+def make_simulation(engine: Engine, population: int, infected: int, vaccinated: int, seed: np.random.SeedSequence | None = None,
+                    synchronous: bool = False, threads: int = 1, network: ContactNetwork | None = None) -> Simulation:
+    """
+    Create a simulation backed by the requested engine.
+    
+    Args:
+        engine: Engine to use (python, numpy, batched or compartmental)
+        population: Total number of individuals in the population
+        infected: Number of initially infected individuals
+        vaccinated: Number of vaccinated individuals
+        seed: Seed sequence for the simulation's random stream (default: unseeded)
+        synchronous: Use the python engine's synchronous update mode; the numpy
+            engines always update synchronously (default: False)
+        threads: Population chunks the numpy engine updates in parallel (default: 1)
+        network: Contact network for the numpy engine (default: None, well-mixed)
+        
+    Returns:
+        Simulation instance for the chosen engine
+        
+    Raises:
+        ValueError: If a contact graph is requested for an engine other than numpy
+    """
+    if seed is None:
+        seed = np.random.SeedSequence()
+    if engine in (Engine.NUMPY, Engine.BATCHED):
+        return NumpySimulation(population, infected, vaccinated, rng = np.random.default_rng(seed), threads = threads, network = network)
+    if network is not None and network.model != ContactModel.WELL_MIXED:
+        raise ValueError("contact graphs need the numpy engine")
+    if engine == Engine.COMPARTMENTAL:
+        return CompartmentalSimulation(population, infected, vaccinated, rng = np.random.default_rng(seed))
+    return Simulation(population, infected, vaccinated, rng = random.Random(int.from_bytes(seed.generate_state(4).tobytes(), 'little')),
+                      synchronous = synchronous)
+
+def run_trial(engine: Engine, seed: np.random.SeedSequence, population_count: int, infected: int, vaccinated: int, tprob: float, dprob: float, days: int, profile: bool = False,
+              synchronous: bool = False, threads: int = 1, network: ContactNetwork | None = None) -> dict:
+    """
+    Run one analyze trial with its own random stream.
+    
+    Module-level so that it can be shipped to worker processes. The trial's
+    RNG is derived only from its seed, so the result does not depend on which
+    process runs it or in what order.
+    
+    Args:
+        engine: Simulation engine to use
+        seed: Seed sequence for this trial's random stream
+        population_count: Total population size
+        infected: Initial number of infected individuals
+        vaccinated: Number of vaccinated individuals
+        tprob: Transmission probability
+        dprob: Death probability
+        days: Number of days to simulate
+        profile: Record a Profiler for the trial (default: False)
+        synchronous: Use the python engine's synchronous update mode (default: False)
+        threads: Population chunks the numpy engine updates in parallel (default: 1)
+        network: Contact network for the numpy engine (default: None, well-mixed)
+        
+    Returns:
+        Statistics dictionary (see Simulation.generate_statistics_dict) for the trial;
+        with profile, its 'profile' entry holds the trial's Profiler.to_dict()
+    """
+    profiler = Profiler() if profile else None
+    with profiler.phase('construct') if profiler else nullcontext():
+        sim = make_simulation(engine, population_count, infected, vaccinated, seed = seed, synchronous = synchronous, threads = threads,
+                              network = network)
+    sim.profiler = profiler
+    adf_dict = sim.generate_statistics_dict()
+    sim.run(tprob, dprob, days, as_array = True)
+    with profiler.phase('stats') if profiler else nullcontext():
+        adf_dict['AVG_INFECTED'], adf_dict['AVG_DEATHS'], adf_dict['AVG_DEATH_STDV'] = sim.summarize_days(sim.daily_stats)
+    if profiler:
+        adf_dict['profile'] = profiler.to_dict()
+    return adf_dict
+
+def run_trial_block(seeds: List[np.random.SeedSequence], population_count: int, infected: int, vaccinated: int, tprob: float, dprob: float, days: int, profile: bool = False) -> List[dict]:
+    """
+    Run a block of analyze trials together with the batched engine.
+    
+    Module-level so that blocks can be shipped to worker processes. Trial t
+    gives the same statistics as run_trial(Engine.NUMPY, seeds[t], ...).
+    
+    Args:
+        seeds: Seed sequence for each trial in the block
+        population_count: Total population size
+        infected: Initial number of infected individuals
+        vaccinated: Number of vaccinated individuals
+        tprob: Transmission probability
+        dprob: Death probability
+        days: Number of days to simulate
+        profile: Record a Profiler for the block (default: False)
+        
+    Returns:
+        Statistics dictionary for each trial, in trial order; with profile, the
+        first dictionary's 'profile' entry holds the whole block's Profiler.to_dict()
+    """
+    profiler = Profiler() if profile else None
+    with profiler.phase('construct') if profiler else nullcontext():
+        sim = BatchedSimulation(seeds, population_count, infected, vaccinated)
+    sim.profiler = profiler
+    counts = sim.run(tprob, dprob, days)
+    results = []
+    with profiler.phase('stats') if profiler else nullcontext():
+        # one running accumulator per trial, in the same arithmetic as run_trial's
+        stats = Simulation.calculate_stats(counts)
+        for trial in range(len(seeds)):
+            adf_dict = Simulation.generate_statistics_dict()
+            adf_dict['AVG_INFECTED'], adf_dict['AVG_DEATHS'], adf_dict['AVG_DEATH_STDV'] = (float(column[trial]) for column in stats)
+            results.append(adf_dict)
+    if profiler:
+        results[0]['profile'] = profiler.to_dict()
+    return results
+
+def run_trials(engine: Engine, seeds: List[np.random.SeedSequence], population_count: int, infected: int, vaccinated: int, tprob: float, dprob: float, days: int,
+               profile: bool = False, synchronous: bool = False, threads: int = 1, network: ContactNetwork | None = None) -> List[dict]:
+    """
+    Run several trials of one parameter point, as a single unit of work.
+    
+    Uses run_trial_block for the batched engine and run_trial otherwise, so
+    the statistics are the same as analyze gives for these seeds.
+    
+    Args:
+        engine: Simulation engine to use
+        seeds: Seed sequence for each trial
+        population_count: Total population size
+        infected: Initial number of infected individuals
+        vaccinated: Number of vaccinated individuals
+        tprob: Transmission probability
+        dprob: Death probability
+        days: Number of days to simulate
+        profile: Record a Profiler for the trials (default: False)
+        synchronous: Use the python engine's synchronous update mode (default: False)
+        threads: Population chunks the numpy engine updates in parallel (default: 1)
+        network: Contact network for the numpy engine (default: None, well-mixed)
+        
+    Returns:
+        Statistics dictionary for each trial, in trial order
+    """
+    if engine == Engine.BATCHED:
+        return run_trial_block(seeds, population_count, infected, vaccinated, tprob, dprob, days, profile)
+    return [run_trial(engine, seed, population_count, infected, vaccinated, tprob, dprob, days, profile, synchronous, threads, network)
+            for seed in seeds]
+
+def summarize_trials(rows: List[dict]) -> dict:
+    """
+    Fold trial rows into running statistics.
+    
+    Args:
+        rows: Statistics dictionaries of trials
+        
+    Returns:
+        RunningStats with a quantile sketch per ANALYZE_COLUMNS column
+    """
+    running = {column: RunningStats(quantiles = True) for column in ANALYZE_COLUMNS}
+    for row in rows:
+        for column in ANALYZE_COLUMNS:
+            running[column].add(row[column])
+    return running
+
+def run_trial_chunk(*args) -> tuple:
+    """
+    Run several analyze trials in a worker and summarize them there.
+    
+    Args:
+        *args: Arguments of run_trials
+        
+    Returns:
+        Tuple of (run_trials' statistics dictionaries, summarize_trials of them),
+        so the parent merges one accumulator per chunk instead of adding every row
+    """
+    rows = run_trials(*args)
+    return rows, summarize_trials(rows)
+
+def parse_grid(spec: str, cast: type = float) -> list:
+    """
+    Parse a sweep grid specification.
+    
+    Args:
+        spec: Comma-separated values ('0.1,0.2,0.5') or an inclusive range
+            'start:stop:step' ('0.1:0.5:0.1')
+        cast: Type of the grid values (default: float)
+        
+    Returns:
+        List of grid values, rounded to 10 decimals so ranges give clean floats
+        
+    Raises:
+        ValueError: If the specification is malformed or the step is not positive
+    """
+    if ':' in spec:
+        start, stop, step = (float(part) for part in spec.split(':'))
+        if step <= 0:
+            raise ValueError(f"step must be positive in grid '{spec}'")
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = [float(part) for part in spec.split(',')]
+    return [cast(round(float(value), 10)) for value in values]
+
+def sweep_point_seed(entropy: int, point: tuple) -> np.random.SeedSequence:
+    """
+    Seed sequence for one sweep grid point.
+    
+    Depends only on the sweep seed and the point's parameters, not on its
+    position in the grid, so widening a grid leaves existing points' results unchanged.
+    
+    Args:
+        entropy: Sweep seed entropy
+        point: Parameter values identifying the grid point
+        
+    Returns:
+        Seed sequence whose spawned children seed the point's trials
+    """
+    point_hash = hashlib.sha256(repr(point).encode()).digest()
+    return np.random.SeedSequence([entropy, int.from_bytes(point_hash[:8], 'little')])
+
+def check_threads(threads: int, engine: Engine) -> None:
+    """
+    Validate the --threads option of a CLI command.
+    
+    Args:
+        threads: Requested number of population chunks
+        engine: Requested engine
+        
+    Raises:
+        typer.BadParameter: If threads is not positive, or above 1 for an engine other than numpy
+    """
+    if threads < 1:
+        raise typer.BadParameter("threads must be a positive number", param_hint = "--threads")
+    if threads > 1 and engine != Engine.NUMPY:
+        raise typer.BadParameter("chunked multi-threaded updates need --engine numpy", param_hint = "--threads")
+
+def check_synchronous(synchronous: bool, engine: Engine) -> None:
+    """
+    Validate the --synchronous option of a CLI command.
+    
+    Args:
+        synchronous: Requested synchronous update mode
+        engine: Requested engine
+        
+    Raises:
+        typer.BadParameter: If synchronous is requested for an engine other than python
+    """
+    if synchronous and engine != Engine.PYTHON:
+        raise typer.BadParameter("the numpy-based engines always update synchronously; --synchronous needs --engine python",
+                                 param_hint = "--synchronous")
+
+def make_network(contact_model: ContactModel, edge_list: str | None, degree: int, rewire_prob: float, engine: Engine) -> ContactNetwork:
+    """
+    Validate the contact-network options of a CLI command.
+    
+    Args:
+        contact_model: Requested contact model
+        edge_list: Edge list file for the edge-list model
+        degree: Ring-lattice degree for the small-world model
+        rewire_prob: Rewiring probability for the small-world model
+        engine: Requested engine
+        
+    Returns:
+        ContactNetwork for the simulations
+        
+    Raises:
+        typer.BadParameter: If a graph is requested for an engine other than numpy, or its
+            options are out of range, or the edge-list model has no readable edge list
+    """
+    if contact_model == ContactModel.WELL_MIXED:
+        return ContactNetwork()
+    if engine != Engine.NUMPY:
+        raise typer.BadParameter("contact graphs need --engine numpy", param_hint = "--contact-model")
+    if contact_model == ContactModel.EDGE_LIST:
+        if edge_list is None or not os.path.isfile(edge_list):
+            raise typer.BadParameter("the edge-list model needs an existing --edge-list file", param_hint = "--edge-list")
+        return ContactNetwork(contact_model, edge_list = edge_list)
+    if degree < 2 or degree % 2:
+        raise typer.BadParameter("degree must be a positive even number", param_hint = "--graph-degree")
+    if not 0 <= rewire_prob <= 1:
+        raise typer.BadParameter("rewire probability must be between 0 and 1", param_hint = "--rewire-prob")
+    return ContactNetwork(contact_model, degree, rewire_prob)
+
+def check_state_dir(state_dir: str | None, tile_size: int, resume: bool, engine: Engine, threads: int, network: ContactNetwork) -> None:
+    """
+    Validate the memory-mapped state options of simulate.
+    
+    Args:
+        state_dir: Requested state directory
+        tile_size: Requested number of people per tile
+        resume: Whether the run should continue from state_dir
+        engine: Requested engine
+        threads: Requested number of population chunks
+        network: Requested contact network
+        
+    Raises:
+        typer.BadParameter: If the options do not fit together
+    """
+    if state_dir is None:
+        if resume:
+            raise typer.BadParameter("resuming needs the --state-dir of the earlier run", param_hint = "--resume")
+        return
+    if engine != Engine.NUMPY:
+        raise typer.BadParameter("memory-mapped runs need --engine numpy", param_hint = "--state-dir")
+    if threads > 1 or network.model != ContactModel.WELL_MIXED:
+        raise typer.BadParameter("memory-mapped runs update one tile at a time on a well-mixed population", param_hint = "--state-dir")
+    if tile_size < 1:
+        raise typer.BadParameter("tile size must be a positive number", param_hint = "--tile-size")
+    if resume and not os.path.exists(os.path.join(state_dir, MappedSimulation.STATE_FILE)):
+        raise typer.BadParameter(f"no saved state found in {state_dir}", param_hint = "--resume")
+
+def open_mapped_simulation(state_dir: str, parameters: dict) -> MappedSimulation:
+    """
+    Reopen a saved memory-mapped run for simulate --resume.
+    
+    The number of days may differ from the saved run's: more days extend a
+    finished run, fewer report the first days of the saved one.
+    
+    Args:
+        state_dir: Directory of the saved run
+        parameters: Parameters of the resuming command
+        
+    Returns:
+        MappedSimulation continuing the saved run, with the resuming command's days
+        
+    Raises:
+        typer.BadParameter: If the run was saved with different parameters or cut short mid-day
+    """
+    try:
+        sim = MappedSimulation.open(state_dir)
+    except ValueError as error:
+        raise typer.BadParameter(str(error), param_hint = "--resume") from error
+    saved = {key: value for key, value in (sim.parameters or {}).items() if key not in ('entropy', 'days')}
+    if saved != {key: value for key, value in parameters.items() if key != 'days'}:
+        raise typer.BadParameter("saved state was written with different simulation parameters", param_hint = "--resume")
+    sim.parameters = {**sim.parameters, 'days': parameters['days']}
+    return sim
+
+def check_target_ci(target_ci: float | None, confidence: float, ci_batch: int) -> None:
+    """
+    Validate the adaptive-stopping options of analyze.
+    
+    Args:
+        target_ci: Requested relative confidence-interval half-width
+        confidence: Requested confidence level
+        ci_batch: Requested number of trials between convergence checks
+        
+    Raises:
+        typer.BadParameter: If an option is out of range
+    """
+    if target_ci is not None and target_ci <= 0:
+        raise typer.BadParameter("target must be a positive number", param_hint = "--target-ci")
+    if not 0 < confidence < 1:
+        raise typer.BadParameter("confidence must be between 0 and 1", param_hint = "--confidence")
+    if ci_batch < 2:
+        raise typer.BadParameter("at least 2 trials are needed between convergence checks", param_hint = "--ci-batch")
+
+def print_trial_summary(running: dict) -> None:
+    """
+    Print analyze's summary of every output column.
+    
+    Args:
+        running: RunningStats (with quantile sketches) of each column
+    """
+    print(f"{'':<16}{'Trials':>8}{'Mean':>12}{'Std':>12}{'Min':>12}" + ''.join(f"{q:>10.0%}" for q in HISTOGRAM_QUANTILES) + f"{'Max':>12}")
+    for column, stats in running.items():
+        if not stats.count:
+            print(f"{column:<16}{0:>8}")
+            continue
+        print(f"{column:<16}{stats.count:>8}{stats.mean:>12.4g}{stats.std:>12.4g}{stats.min:>12.4g}"
+              + ''.join(f"{stats.quantile(q):>10.4g}" for q in HISTOGRAM_QUANTILES) + f"{stats.max:>12.4g}")
+
+def read_trial_rows(filename: str) -> np.ndarray:
+    """
+    Read the trial statistics analyze wrote, e.g. to store them in the result cache.
+    
+    Args:
+        filename: CSV file or Parquet dataset written by analyze
+        
+    Returns:
+        trials x len(ANALYZE_COLUMNS) float array
+    """
+    import pandas as pd
+    # round-trip parsing gives back exactly the floats that were written
+    df = pd.read_parquet(filename) if filename.endswith('.parquet') else pd.read_csv(filename, float_precision = 'round_trip')
+    return df[ANALYZE_COLUMNS].to_numpy(dtype = float)
+
+def report_profile(profiler: Profiler, summary: bool, output_file: str | None) -> None:
+    """
+    Print and/or export a --profile run's profile.
+    
+    Args:
+        profiler: Profile of the run
+        summary: Print the summary tables
+        output_file: JSON file to write the profile to (None to skip)
+    """
+    if summary:
+        print()
+        profiler.print_summary()
+    if output_file:
+        profiler.write_json(output_file)
+
+def write_checkpoint(filename: str, checkpoint: dict) -> None:
+    """
+    Write an analyze checkpoint to disk.
+    
+    The checkpoint is written to a temporary file first and then renamed over
+    the old one, so an interruption never leaves a half-written checkpoint.
+    
+    Args:
+        filename: Path of the checkpoint file
+        checkpoint: Checkpoint contents (parameters, seed entropy and completed trials)
+    """
+    with open(filename + '.tmp', 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(filename + '.tmp', filename)
+
+def load_checkpoint(filename: str) -> dict:
+    """
+    Read an analyze checkpoint from disk.
+    
+    Args:
+        filename: Path of the checkpoint file
+        
+    Returns:
+        Checkpoint contents as written by write_checkpoint
+    """
+    with open(filename) as file:
+        return json.load(file)
+
+class ResultSink:
+    """
+    Streams result rows to a CSV file or a Parquet dataset.
+    
+    Rows are buffered and appended to disk every flush_every rows, so memory
+    stays flat for long runs and rows already flushed survive an interruption.
+    CSV rows are appended to a single file. Parquet output is a directory of
+    part files, one per flush, because a Parquet file is only readable once
+    its footer has been written; pandas.read_parquet reads the directory back
+    as one table.
+    
+    Attributes:
+        filename: Output path; a '.parquet' suffix selects Parquet output
+        columns: Column labels, written as the CSV header or Parquet schema
+        flush_every: Number of buffered rows that triggers a write to disk
+    """
+    
+    def __init__(self, filename: str, columns: list, flush_every: int = DEFAULT_FLUSH_ROWS, append: bool = False):
+        """
+        Open a sink for writing.
+        
+        Args:
+            filename: Output path; a '.parquet' suffix selects Parquet output
+            columns: Column labels for the rows that will be written
+            flush_every: Number of buffered rows that triggers a write to disk (default: 100)
+            append: Keep rows already in filename and add new ones after them (default: False)
+            
+        Raises:
+            ValueError: If flush_every is not positive
+            ImportError: If Parquet output is requested and pyarrow is not installed
+        """
+        if flush_every < 1:
+            raise ValueError("flush_every must be a positive number")
+        self.filename = filename
+        self.columns = columns
+        self.flush_every = flush_every
+        self._rows: list = []
+        self._parquet = filename.endswith('.parquet')
+        if self._parquet:
+            from importlib.util import find_spec
+            if find_spec('pyarrow') is None:
+                raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+            if not append and os.path.isdir(filename):
+                shutil.rmtree(filename)
+            elif not append and os.path.exists(filename):
+                os.remove(filename)
+            os.makedirs(filename, exist_ok = True)
+            self._nparts = len(os.listdir(filename))
+        else:
+            has_rows = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+            self._file = open(filename, 'a' if has_rows else 'w', newline = '')
+            self._writer = csv.writer(self._file, lineterminator = '\n')
+            if not has_rows:
+                self._writer.writerow(columns)
+                self._file.flush()
+
+    def tell(self) -> int:
+        """
+        Get the position after the rows flushed so far, for truncate.
+        
+        Returns:
+            Size of the CSV file in bytes, or the number of Parquet part files
+        """
+        return self._nparts if self._parquet else os.path.getsize(self.filename)
+
+    @staticmethod
+    def truncate(filename: str, position: int | None) -> None:
+        """
+        Discard the rows written after a position returned by tell.
+        
+        Args:
+            filename: Output path of the earlier sink
+            position: Position from tell, or None to discard every row
+            
+        Raises:
+            ValueError: If the output no longer holds the rows up to position
+        """
+        if position is None:
+            return
+        if filename.endswith('.parquet'):
+            parts = sorted(os.listdir(filename)) if os.path.isdir(filename) else []
+            if len(parts) < position:
+                raise ValueError(f"{filename} has fewer parts than were checkpointed")
+            for part in parts[position:]:
+                os.remove(os.path.join(filename, part))
+        else:
+            if not os.path.exists(filename) or os.path.getsize(filename) < position:
+                raise ValueError(f"{filename} is shorter than when it was checkpointed")
+            os.truncate(filename, position)
+
+    def write(self, row) -> None:
+        """
+        Buffer one row, flushing if the batch is full.
+        
+        Args:
+            row: Sequence of values in column order, or a mapping keyed by column
+        """
+        if isinstance(row, dict):
+            row = [row[column] for column in self.columns]
+        self._rows.append([value.item() if isinstance(value, np.generic) else value for value in row])
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def write_many(self, rows) -> None:
+        """
+        Buffer several rows, flushing whenever the batch is full.
+        
+        Args:
+            rows: Iterable of rows (see write), e.g. a 2-D count array
+        """
+        for row in rows:
+            self.write(row)
+
+    def flush(self) -> None:
+        """Write buffered rows to disk."""
+        if not self._rows:
+            return
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.table({str(column): [row[i] for row in self._rows] for i, column in enumerate(self.columns)})
+            pq.write_table(table, os.path.join(self.filename, f'part-{self._nparts:05d}.parquet'))
+            self._nparts += 1
+        else:
+            # pandas writes missing values (e.g. the std of a single day) as empty fields
+            self._writer.writerows(['' if value != value else value for value in row] for row in self._rows)
+            self._file.flush()
+        self._rows = []
+
+    def close(self) -> None:
+        """Flush remaining rows and release the output file; closing again does nothing."""
+        self.flush()
+        if not self._parquet:
+            self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class ResultCache:
+    """
+    On-disk cache of simulate and analyze results.
+    
+    Entries are .npy arrays named by a hash of the run's parameters, seed and
+    ENGINE_VERSION, so a repeated seeded run returns the stored result instead
+    of simulating again. Reading an entry refreshes its modification time, and
+    once the cache grows past max_bytes the least recently used entries are
+    deleted.
+    
+    Attributes:
+        directory: Directory holding the cache entries
+        max_bytes: Total size of the entries above which old ones are evicted
+    """
+    
+    def __init__(self, directory: str | None = None, max_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Open (and create if needed) a cache directory.
+        
+        Args:
+            directory: Directory holding the cache entries (default: $VIRUS_CACHE_DIR or ~/.cache/virus)
+            max_bytes: Size bound of the cache in bytes (default: 512 MiB)
+        """
+        directory = directory or os.environ.get('VIRUS_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok = True)
+
+    @staticmethod
+    def key(command: str, parameters: dict, entropy: int) -> str:
+        """
+        Cache key for one run.
+        
+        Args:
+            command: CLI command that produced the result ('simulate' or 'analyze')
+            parameters: Simulation parameters of the run
+            entropy: Seed entropy of the run
+            
+        Returns:
+            Hex digest identifying the result
+        """
+        identity = json.dumps({'command': command, 'parameters': parameters, 'seed': str(entropy),
+                               'engine_version': ENGINE_VERSION}, sort_keys = True)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.npy')
+
+    def get(self, key: str) -> np.ndarray | None:
+        """
+        Look up a stored result, marking it as recently used.
+        
+        Args:
+            key: Cache key (see key)
+            
+        Returns:
+            The stored array, or None if there is no entry for key
+        """
+        path = self._path(key)
+        try:
+            result = np.load(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)
+        return result
+
+    def put(self, key: str, result: np.ndarray) -> None:
+        """
+        Store a result, then evict least recently used entries over the size bound.
+        
+        Args:
+            key: Cache key (see key)
+            result: Array to store
+        """
+        path = self._path(key)
+        # write under a temporary name so a concurrent reader never sees a partial entry
+        with open(path + '.tmp', 'wb') as file:
+            np.save(file, result)
+        os.replace(path + '.tmp', path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npy'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (DDSketch).
+    
+    Values are counted in logarithmically sized buckets: bucket i holds
+    magnitudes in (gamma**(i - 1), gamma**i] with gamma = (1 + a) / (1 - a),
+    so every quantile is returned within relative accuracy a of a value of
+    that rank. Memory grows with the logarithm of the value range, not with
+    the number of values (about 1,000 buckets span 1 to 1e9 at a = 0.01), and
+    two sketches merge by adding their bucket counts.
+    
+    Attributes:
+        relative_accuracy: Relative error bound a of returned quantiles
+        count: Number of values added
+    """
+    # magnitudes below this are counted as zero
+    MIN_MAGNITUDE = 1e-12
+    
+    def __init__(self, relative_accuracy: float = DEFAULT_SKETCH_ACCURACY):
+        """
+        Create an empty sketch.
+        
+        Args:
+            relative_accuracy: Relative error bound (0-1) of returned quantiles (default: 0.01)
+            
+        Raises:
+            ValueError: If relative_accuracy is not strictly between 0 and 1
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive: Counter = Counter()
+        self._negative: Counter = Counter()
+        self._zero = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1) -> None:
+        """
+        Add one value, or count copies of it; NaN is skipped.
+        
+        Args:
+            value: New observation
+            count: Number of copies to add (default: 1)
+        """
+        if value != value:
+            return
+        self.count += count
+        if abs(value) < self.MIN_MAGNITUDE:
+            self._zero += count
+        else:
+            buckets = self._positive if value > 0 else self._negative
+            buckets[math.ceil(math.log(abs(value)) / self._log_gamma)] += count
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Add another sketch's values to this one.
+        
+        Args:
+            other: Sketch with the same relative accuracy
+            
+        Raises:
+            ValueError: If the sketches' relative accuracies differ
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("only sketches with the same relative accuracy can be merged")
+        self._positive.update(other._positive)
+        self._negative.update(other._negative)
+        self._zero += other._zero
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile.
+        
+        Args:
+            q: Quantile (0-1)
+            
+        Returns:
+            Estimated value of rank q * (count - 1), or NaN for an empty sketch
+        """
+        if not self.count:
+            return float('nan')
+        rank, seen = q * (self.count - 1), 0
+        # most negative first, then zero, then increasing positive values
+        for key in sorted(self._negative, reverse = True):
+            seen += self._negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self._zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._positive):
+            seen += self._positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self._positive))
+
+    def _bucket_value(self, key: int) -> float:
+        """Get the value representing a bucket: its bounds' relative midpoint."""
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def to_dict(self) -> dict:
+        """
+        Describe the sketch as JSON-serializable data.
+        
+        Returns:
+            Dictionary accepted by from_dict
+        """
+        return {'relative_accuracy': self.relative_accuracy, 'zero': self._zero,
+                'positive': {str(key): count for key, count in self._positive.items()},
+                'negative': {str(key): count for key, count in self._negative.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        """
+        Rebuild a sketch saved with to_dict.
+        
+        Args:
+            data: Dictionary returned by to_dict
+            
+        Returns:
+            Sketch with the saved bucket counts
+        """
+        sketch = cls(data['relative_accuracy'])
+        sketch._zero = data['zero']
+        sketch._positive = Counter({int(key): count for key, count in data['positive'].items()})
+        sketch._negative = Counter({int(key): count for key, count in data['negative'].items()})
+        sketch.count = sketch._zero + sum(sketch._positive.values()) + sum(sketch._negative.values())
+        return sketch
+
+class RunningStats:
+    """
+    Mergeable running statistics of one metric.
+    
+    Keeps the count, mean, variance, minimum and maximum in O(1) memory, and
+    optionally a QuantileSketch. The mean and variance use Welford's algorithm:
+    one pass and no cancellation error from subtracting large sums. Two
+    accumulators (e.g. from different workers or checkpoints) merge with
+    Chan et al.'s pairwise update.
+    
+    Values can also be equal-shaped arrays, giving one accumulator per element
+    (e.g. per trial of a batched block) with the same arithmetic as scalars;
+    per-element copy counts then make count an array too.
+    NaN scalars (e.g. the death standard deviation of a one-day trial) are skipped.
+    
+    Attributes:
+        count: Number of values added
+        mean: Mean of the values added
+        min: Smallest value added (infinity before any)
+        max: Largest value added (-infinity before any)
+        sketch: QuantileSketch of the values added (None unless requested)
+    """
+    
+    def __init__(self, quantiles: bool = False):
+        """
+        Create an empty accumulator.
+        
+        Args:
+            quantiles: Also keep a QuantileSketch of scalar values (default: False)
+        """
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.sketch = QuantileSketch() if quantiles else None
+
+    def add(self, value: float | np.ndarray, count: int | np.ndarray = 1) -> None:
+        """
+        Add one value, or count copies of it.
+        
+        Copies are added in one step: Chan et al.'s update with an accumulator
+        of count equal values, which for a single copy is exactly Welford's.
+        
+        Args:
+            value: New observation, or one observation per element
+            count: Number of copies to add, or one number per element, where 0
+                leaves that element unchanged (default: 1)
+        """
+        if np.ndim(value) == 0 and value != value:
+            return
+        if np.ndim(count) == 0 and not count:
+            return
+        self.count = self.count + count
+        delta = value - self.mean
+        self.mean = self.mean + delta * count / self.count
+        self._m2 = self._m2 + delta * (value - self.mean) * count
+        if np.ndim(count):
+            self.min = np.where(count > 0, np.minimum(self.min, value), self.min)
+            self.max = np.where(count > 0, np.maximum(self.max, value), self.max)
+        else:
+            self.min = np.minimum(self.min, value)
+            self.max = np.maximum(self.max, value)
+        if self.sketch is not None:
+            self.sketch.add(value, count)
+
+    def merge(self, other: 'RunningStats') -> None:
+        """
+        Add another accumulator's values to this one.
+        
+        Args:
+            other: Accumulator of further values
+        """
+        if other.count:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean = self.mean + delta * other.count / count
+            self._m2 = self._m2 + other._m2 + delta * delta * self.count * other.count / count
+            self.count = count
+            self.min = np.minimum(self.min, other.min)
+            self.max = np.maximum(self.max, other.max)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self) -> float:
+        """
+        Get the sample variance.
+        
+        Returns:
+            Variance with ddof = 1, or NaN for fewer than two values
+        """
+        if np.ndim(self.count):
+            return np.where(self.count > 1, self._m2 / np.maximum(self.count - 1, 1), np.nan)
+        return self._m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std(self) -> float:
+        """
+        Get the sample standard deviation.
+        
+        Returns:
+            Standard deviation with ddof = 1, or NaN for fewer than two values
+        """
+        return np.sqrt(self.variance)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile from the sketch.
+        
+        Args:
+            q: Quantile (0-1)
+            
+        Returns:
+            Estimated quantile (see QuantileSketch.quantile), or NaN without a sketch
+        """
+        return self.sketch.quantile(q) if self.sketch is not None else float('nan')
+
+    def half_width(self, confidence: float = DEFAULT_CONFIDENCE) -> float:
+        """
+        Get the half-width of the normal-approximation confidence interval of the mean.
+        
+        Args:
+            confidence: Confidence level (0-1) (default: 0.95)
+            
+        Returns:
+            z * standard error, or infinity for fewer than two values
+        """
+        if self.count < 2:
+            return float('inf')
+        from statistics import NormalDist
+        return NormalDist().inv_cdf((1 + confidence) / 2) * (self.variance / self.count) ** 0.5
+
+    def to_dict(self) -> dict:
+        """
+        Describe a scalar accumulator as JSON-serializable data, e.g. for a checkpoint.
+        
+        Returns:
+            Dictionary accepted by from_dict
+        """
+        return {'count': self.count, 'mean': float(self.mean), 'm2': float(self._m2), 'min': float(self.min), 'max': float(self.max),
+                'sketch': self.sketch.to_dict() if self.sketch is not None else None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        """
+        Rebuild an accumulator saved with to_dict.
+        
+        Args:
+            data: Dictionary returned by to_dict
+            
+        Returns:
+            Accumulator continuing from the saved state
+        """
+        stats = cls()
+        stats.count, stats.mean, stats._m2, stats.min, stats.max = data['count'], data['mean'], data['m2'], data['min'], data['max']
+        stats.sketch = QuantileSketch.from_dict(data['sketch']) if data['sketch'] is not None else None
+        return stats
+
+def ci_converged(running: dict, target: float, confidence: float) -> bool:
+    """
+    Check whether every metric's confidence interval is narrow enough.
+    
+    Args:
+        running: RunningStats of each metric
+        target: Largest allowed half-width, as a fraction of the metric's mean
+        confidence: Confidence level (0-1)
+        
+    Returns:
+        True if some metric has values and every metric with values has half-width <= target * |mean|
+    """
+    # metrics that are always NaN (e.g. the death standard deviation of one-day trials) have no values
+    measured = [stats for stats in running.values() if stats.count]
+    return bool(measured) and all(stats.half_width(confidence) <= target * abs(stats.mean) for stats in measured)
+
+class Profiler:
+    """
+    Records where the time of a run goes, for the --profile flag.
+    
+    Phases (building the population, stepping each day, recording each day's
+    counts, computing statistics) accumulate wall time and call counts. Each
+    simulated day also records its step time and its transitions: new
+    infections, deaths and recoveries. Simulations only consult their
+    profiler once per day and skip all of this when it is None, so profiling
+    costs nothing when switched off.
+    
+    Profiles from worker processes are combined with merge; per-day entries
+    are summed over trials by day index.
+    
+    Attributes:
+        phases: Phase name -> {'seconds', 'calls'}
+        days: Day index -> {'seconds', 'calls', 'infections', 'deaths', 'recoveries'}
+    """
+    
+    def __init__(self):
+        """Start an empty profile."""
+        self.phases: dict = {}
+        self.days: dict = {}
+
+    def add(self, phase: str, seconds: float, calls: int = 1) -> None:
+        """
+        Add time spent in a phase.
+        
+        Args:
+            phase: Phase name
+            seconds: Wall time spent
+            calls: Number of calls the time covers (default: 1)
+        """
+        totals = self.phases.setdefault(phase, {'seconds': 0.0, 'calls': 0})
+        totals['seconds'] += seconds
+        totals['calls'] += calls
+
+    @contextmanager
+    def phase(self, phase: str):
+        """
+        Time the body of a with block as one call of a phase.
+        
+        Args:
+            phase: Phase name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def record_day(self, day: int, seconds: float, infections: int, deaths: int, recoveries: int) -> None:
+        """
+        Record one simulated day's step time and transitions.
+        
+        Args:
+            day: Day index
+            seconds: Wall time of the day's step
+            infections: People infected during the day
+            deaths: People who died during the day
+            recoveries: People who recovered during the day
+        """
+        self.add('step', seconds)
+        totals = self.days.setdefault(day, {'seconds': 0.0, 'calls': 0, 'infections': 0, 'deaths': 0, 'recoveries': 0})
+        totals['seconds'] += seconds
+        totals['calls'] += 1
+        totals['infections'] += infections
+        totals['deaths'] += deaths
+        totals['recoveries'] += recoveries
+
+    def to_dict(self) -> dict:
+        """
+        Export the profile as JSON-serializable data.
+        
+        Returns:
+            Dictionary with 'phases' (name -> totals) and 'days' (list of per-day totals, by day)
+        """
+        return {'phases': self.phases, 'days': [{'day': day, **totals} for day, totals in sorted(self.days.items())]}
+
+    def merge(self, profile: dict) -> None:
+        """
+        Add a profile exported with to_dict, e.g. one from a worker process.
+        
+        Args:
+            profile: Profile data as returned by to_dict
+        """
+        for phase, totals in profile['phases'].items():
+            self.add(phase, totals['seconds'], totals['calls'])
+        for day_totals in profile['days']:
+            totals = self.days.setdefault(day_totals['day'], {'seconds': 0.0, 'calls': 0, 'infections': 0, 'deaths': 0, 'recoveries': 0})
+            for key in totals:
+                totals[key] += day_totals[key]
+
+    def write_json(self, filename: str) -> None:
+        """
+        Write the profile to a JSON file.
+        
+        Args:
+            filename: Path of the JSON file
+        """
+        with open(filename, 'w') as file:
+            json.dump(self.to_dict(), file, indent = 2)
+
+    def print_summary(self) -> None:
+        """Print the phase totals and the per-day timings and transitions as tables."""
+        total = sum(totals['seconds'] for totals in self.phases.values())
+        print(f"{'Phase':<12}{'Calls':>10}{'Total (s)':>12}{'Mean (ms)':>12}{'Share':>8}")
+        for phase, totals in self.phases.items():
+            share = totals['seconds'] / total if total else 0.0
+            print(f"{phase:<12}{totals['calls']:>10,}{totals['seconds']:>12.4f}"
+                  f"{1000 * totals['seconds'] / totals['calls']:>12.4f}{share:>8.1%}")
+        if self.days:
+            print(f"\n{'Day':<6}{'Step (ms)':>12}{'Infections':>12}{'Deaths':>10}{'Recoveries':>12}")
+            for day, totals in sorted(self.days.items()):
+                print(f"{day:<6}{1000 * totals['seconds']:>12.3f}{totals['infections']:>12,}"
+                      f"{totals['deaths']:>10,}{totals['recoveries']:>12,}")
+
+class Visualize:
+    """
+    Handles visualization of simulation results.
+    
+    Provides methods to read CSV files and generate various plots including
+    time series plots and histograms comparing multiple trials.
+    
+    In headless mode figures are rendered with the non-interactive Agg
+    backend and only saved, never shown. A single figure is reused for every
+    plot, so rendering many files in one process does not leak figures; call
+    close() when done. Otherwise each plot gets its own figure, closed once
+    its window is: closing a shown window unregisters the figure from pyplot,
+    so it cannot be drawn into again.
+    
+    Attributes:
+        dmin: Minimum deaths for filtering (currently unused)
+        dmax: Maximum deaths for filtering (currently unused)
+        headless: Save figures without opening a window
+    """
+    
+    def __init__(self, dmin: int, dmax: int, headless: bool = False):
+        """
+        Initialize visualization object.
+        
+        Args:
+            dmin: Minimum deaths threshold (currently unused)
+            dmax: Maximum deaths threshold (currently unused)
+            headless: Render with the Agg backend and never call plt.show() (default: False)
+        """
+        # self.dmin =  dmin
+        # self.dmax = dmax
+        self.headless = headless
+        self._figure = None
+        if headless:
+            import matplotlib
+            matplotlib.use('Agg')
+
+    def read_file(self, filename: str) -> pd.DataFrame:
+        """
+        Read simulation results from a CSV file or Parquet dataset.
+        
+        Health status columns written as 'HS.INFECTED' etc. are mapped back
+        to HS members so they can be indexed the same way as Simulation.run output.
+        
+        Args:
+            filename: Path to the CSV file (or '.parquet' dataset) containing simulation data
+            
+        Returns:
+            DataFrame containing the simulation results
+        """
+        import pandas as pd
+        df = pd.read_parquet(filename) if filename.endswith('.parquet') else pd.read_csv(filename)
+        return df.rename(columns = {str(status): status for status in HS})
+
+    def render(self, df: pd.DataFrame, save_path: str | None = None) -> None:
+        """
+        Draw the plot that fits the data: a time series for simulate output
+        (has a Day column) or a trial histogram for analyze output.
+        
+        Args:
+            df: DataFrame read from simulate or analyze output
+            save_path: Image file to write; the suffix (.png, .svg) selects the format (default: None)
+        """
+        if 'Day' in df.columns:
+            self.plot(df, save_path)
+        else:
+            self.generate_histogram(df, save_path)
+
+    def close(self) -> None:
+        """Close the reused figure."""
+        if self._figure is not None:
+            import matplotlib.pyplot as plt
+            plt.close(self._figure)
+            self._figure = None
+
+    def _new_figure(self, figsize: tuple):
+        """
+        Return a blank figure, reusing the previous one in headless mode.
+        
+        Args:
+            figsize: Figure size in inches (width, height)
+            
+        Returns:
+            Cleared matplotlib Figure
+        """
+        import matplotlib.pyplot as plt
+        if self._figure is None or not self.headless:
+            self._figure = plt.figure(figsize = figsize)
+        else:
+            self._figure.clf()
+            self._figure.set_size_inches(*figsize)
+        return self._figure
+
+    def _finish(self, save_path: str | None) -> None:
+        """
+        Save the current figure and, unless headless, show it and close it.
+        
+        Args:
+            save_path: Image file to write, or None to skip saving
+        """
+        if save_path is not None:
+            self._figure.savefig(save_path)
+        if not self.headless:
+            import matplotlib.pyplot as plt
+            plt.show()
+            self.close()
+    
+    def summarize(self, df: pd.DataFrame) -> dict:
+        """
+        Compute distribution summaries of the per-trial statistics.
+        
+        Args:
+            df: DataFrame containing trial statistics (analyze output)
+            
+        Returns:
+            Dictionary keyed by metric (AVG_DEATHS, AVG_INFECTED) with the
+            trial count, mean, standard deviation, min, max and the
+            HISTOGRAM_QUANTILES of that metric
+        """
+        summary = {}
+        for column in HISTOGRAM_COLUMNS:
+            values = df[column].to_numpy(dtype = float)
+            quantiles = np.quantile(values, HISTOGRAM_QUANTILES)
+            summary[column] = {'trials': len(values), 'mean': values.mean(), 'std': values.std(ddof = 1) if len(values) > 1 else np.nan,
+                               'min': values.min(), 'max': values.max(),
+                               **{f'q{round(q * 100):02d}': value for q, value in zip(HISTOGRAM_QUANTILES, quantiles)}}
+        return summary
+
+    def generate_histogram(self, df: pd.DataFrame, save_path: str | None = None) -> None:
+        """
+        Generate histograms of per-trial results across an analysis.
+        
+        Draws one panel each for AVG_DEATHS and AVG_INFECTED: a binned histogram
+        (at most MAX_HISTOGRAM_BINS bins), the empirical CDF evaluated at the bin
+        edges, and vertical lines at the 5%, 50% and 95% quantiles. Binning is
+        vectorized and the number of drawn artists does not depend on the number
+        of trials, so rendering time stays constant for thousands of trials.
+        Prints the distribution summary (see summarize).
+        
+        Args:
+            df: DataFrame containing trial statistics with columns:
+                AVG_INFECTED, AVG_DEATHS, AVG_DEATH_STDV
+            save_path: Image file to write (default: None, not saved)
+        """
+        summary = self.summarize(df)
+        for column, stats in summary.items():
+            print(f"{column}: " + ", ".join(f"{name}={value:.4g}" for name, value in stats.items()))
+
+        fig = self._new_figure((12, 5))
+        axes = fig.subplots(1, len(HISTOGRAM_COLUMNS))
+        for ax, column in zip(axes, HISTOGRAM_COLUMNS):
+            values = df[column].to_numpy(dtype = float)
+            edges = np.histogram_bin_edges(values, bins = 'auto')
+            if len(edges) > MAX_HISTOGRAM_BINS + 1:
+                edges = np.histogram_bin_edges(values, bins = MAX_HISTOGRAM_BINS)
+            counts, edges = np.histogram(values, bins = edges)
+            ax.stairs(counts, edges, fill = True, alpha = 0.6, label = 'Trials')
+            for q in HISTOGRAM_QUANTILES[::2]:
+                ax.axvline(summary[column][f'q{round(q * 100):02d}'], color = 'black', linestyle = '--', linewidth = 1)
+            ax.set_xlabel(column)
+            ax.set_ylabel('Trials')
+            ax.set_title(f'{column} ({len(values):,} trials, median {summary[column]["q50"]:.3g})')
+
+            ecdf_ax = ax.twinx()
+            ecdf_ax.plot(edges, np.concatenate([[0], np.cumsum(counts)]) / max(len(values), 1), color = 'red', label = 'ECDF')
+            ecdf_ax.set_ylim(0, 1.05)
+            ecdf_ax.set_ylabel('Cumulative fraction')
+
+        fig.suptitle('Distribution of Trial Results (dashed: 5%, 50%, 95% quantiles)')
+        fig.tight_layout()
+        self._finish(save_path)
+    
+    def plot(self, df: pd.DataFrame, save_path: str = 'virus_simulation.png') -> None:
+        """
+        Generate a time series plot of health status counts over days.
+        
+        Creates a line plot showing how the number of susceptible, infected,
+        recovered, and dead individuals changes over the course of the simulation.
+        Saves the plot (as 'virus_simulation.png' by default) and, unless
+        headless, displays it.
+        
+        Args:
+            df: DataFrame containing daily health status counts with columns:
+                Day, SUSCEPTIBLE, INFECTED, RECOVERED, DEAD
+            save_path: Image file to write (default: 'virus_simulation.png')
+        """
+        ax = self._new_figure((10, 6)).add_subplot()
+        ax.plot(df['Day'], df[HS.SUSCEPTIBLE], label='Susceptible', color='blue')
+        ax.plot(df['Day'], df[HS.INFECTED], label='Infected', color='red')
+        ax.plot(df['Day'], df[HS.RECOVERED], label='Recovered', color='green')
+        ax.plot(df['Day'], df[HS.DEAD], label='Dead', color='black')
+
+        ax.set_title('Virus Spread Simulation Over Time')
+        ax.set_xlabel('Days')
+        ax.set_ylabel('Number of People')
+        ax.legend()
+        ax.grid(True)
+
+        self._finish(save_path)
+    
+@app.command()
+def visualize(
+    # dmin: Annotated[int, typer.Argument()],
+    #         dmax: Annotated[int, typer.Argument()],
+            input_files: Annotated[List[str], typer.Argument()],
+            output_dir: Annotated[str | None, typer.Option(help = "Save images here instead of opening windows")] = None,
+            image_format: Annotated[ImageFormat, typer.Option("--format", help = "Image format for --output-dir")] = ImageFormat.PNG):
+    """
+    CLI command to visualize simulation or analysis results.
+    
+    Reads each CSV file and draws a time series for simulate output or a
+    histogram comparing trials for analyze output. With --output-dir the
+    figures are rendered headless (Agg backend) and saved as
+    <output_dir>/<input name>.<format>, reusing one figure for all files,
+    so a whole parameter sweep can be rendered in one process.
+    
+    Args:
+        input_files: Paths to CSV files from the simulate or analyze command
+        output_dir: Directory for rendered images; enables headless mode (default: None)
+        image_format: Image format, png or svg (default: png)
+        
+    Raises:
+        typer.BadParameter: If an input file has no rows (e.g. only the header of an interrupted run)
+    """
+    vis = Visualize(0, 0, headless = output_dir is not None)  # dmin and dmax currently unused
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok = True)
+    for input_file in input_files:
+        df = vis.read_file(input_file)
+        if df.empty:
+            vis.close()
+            raise typer.BadParameter(f"{input_file} has no rows to plot", param_hint = "input_files")
+        save_path = None
+        if output_dir is not None:
+            stem = os.path.splitext(os.path.basename(input_file.rstrip(os.sep)))[0]
+            save_path = os.path.join(output_dir, f"{stem}.{image_format.value}")
+        vis.render(df, save_path)
+    vis.close()
+
+@app.command()
+def analyze(nsimulations: Annotated[int, typer.Argument],
+            vprob: Annotated[float, typer.Argument()],
+            tprob: Annotated[float, typer.Argument()] = 0.05, 
+            dprob: Annotated[float, typer.Argument()] = 0.05,
+            days: Annotated[int, typer.Argument()] = DEFAULT_DAYS,
+            infected: Annotated[int, typer.Argument()] = DEFAULT_INFECTED_INITIAL,
+            population_count: Annotated[int, typer.Argument()] = DEFAULT_POPULATION,
+            output_file: Annotated[str, typer.Argument()] = ANALYZE_FILE,
+            engine: Annotated[Engine, typer.Option(help = "Simulation engine")] = Engine.PYTHON,
+            workers: Annotated[int, typer.Option(help = "Number of worker processes")] = 1,
+            seed: Annotated[int | None, typer.Option(help = "Seed for reproducible trials")] = None,
+            flush_every: Annotated[int, typer.Option(help = "Trials buffered before each write to output_file")] = DEFAULT_FLUSH_ROWS,
+            checkpoint_every: Annotated[int, typer.Option(help = "Trials between checkpoints (0 disables checkpointing)")] = DEFAULT_CHECKPOINT_EVERY,
+            resume: Annotated[bool, typer.Option(help = "Continue an interrupted run from its checkpoint")] = False,
+            batch_size: Annotated[int | None, typer.Option(help = "Trials per block for --engine batched")] = None,
+            cache: Annotated[bool, typer.Option(help = "Reuse and store trial statistics in the result cache")] = True,
+            profile: Annotated[bool, typer.Option(help = "Print per-phase and per-day timings and transitions")] = False,
+            profile_output: Annotated[str | None, typer.Option(help = "Write the profile to this JSON file")] = None,
+            synchronous: Annotated[bool, typer.Option(help = "Decide each day's transitions from the start-of-day state (python engine)")] = False,
+            threads: Annotated[int, typer.Option(help = "Population chunks updated in parallel per trial (numpy engine)")] = 1,
+            contact_model: Annotated[ContactModel, typer.Option(help = "Who meets whom (graphs need the numpy engine)")] = ContactModel.WELL_MIXED,
+            edge_list: Annotated[str | None, typer.Option(help = "Edge list file for --contact-model edge-list")] = None,
+            graph_degree: Annotated[int, typer.Option(help = "Neighbours per person before rewiring (small-world)")] = DEFAULT_GRAPH_DEGREE,
+            rewire_prob: Annotated[float, typer.Option(help = "Probability of rewiring each edge (small-world)")] = DEFAULT_REWIRE_PROB,
+            target_ci: Annotated[float | None, typer.Option(help = "Stop once every metric's CI half-width is within this fraction of its mean")] = None,
+            confidence: Annotated[float, typer.Option(help = "Confidence level of --target-ci intervals")] = DEFAULT_CONFIDENCE,
+            ci_batch: Annotated[int, typer.Option(help = "Trials run between --target-ci convergence checks; at most this many workers run at once")] = DEFAULT_CI_BATCH): 
+    """
+    CLI command to run multiple simulations and analyze results.
+    
+    Executes the specified number of simulation trials with the same parameters
+    and calculates average statistics (infected, deaths, standard deviation)
+    across all trials. Each trial's row is streamed to a CSV file (or a
+    Parquet dataset for a '.parquet' output_file) as soon as it completes.
+    
+    Trials run in chunks of TRIAL_CHUNK (or batch_size for the batched engine);
+    each worker returns its chunk's rows together with running statistics of
+    them, and the chunks' statistics are merged in trial order. With
+    target_ci each trial is its own chunk, so a batch of ci_batch trials can
+    keep up to ci_batch workers busy. The number of
+    completed trials, the output file position and the merged statistics are
+    checkpointed next to output_file at the first chunk boundary after every
+    checkpoint_every trials. With resume, the output file is cut back to the
+    checkpoint and only later trials are rerun, so the final file matches an
+    uninterrupted run. The checkpoint is removed once every trial is done.
+    
+    With target_ci, nsimulations is a budget: trials run in batches of ci_batch,
+    and before each batch the running mean and variance of every output metric
+    are checked. Once every metric's confidence-interval half-width is at most
+    target_ci times its mean, no more trials are run. Trial seeds do not depend
+    on when the run stops, so a fixed seed gives the same trials and the same
+    stopping point for any number of workers.
+    
+    Args:
+        nsimulations: Number of simulation trials to run (the maximum with target_ci)
+        vprob: Vaccination probability (fraction of population vaccinated)
+        tprob: Transmission probability (default: 0.05)
+        dprob: Death probability for infected individuals (default: 0.05)
+        days: Number of days to simulate (default: 50)
+        infected: Initial number of infected individuals (default: 10)
+        population_count: Total population size (default: 1000)
+        output_file: Name of output CSV file (default: 'analyze.csv')
+        engine: Simulation engine, python, numpy, batched or compartmental (default: python)
+        workers: Number of worker processes to spread trials across (default: 1)
+        seed: Seed for the trial random streams; fixed seeds give identical output
+            for any number of workers (default: None, unseeded)
+        flush_every: Number of trial rows buffered before each write (default: 100)
+        checkpoint_every: Number of trials between checkpoints, 0 to disable (default: 100)
+        resume: Continue from the checkpoint of an interrupted run with the same
+            parameters; the checkpoint's seed is used and --seed is ignored (default: False)
+        batch_size: Trials advanced together per block by the batched engine; blocks
+            are spread across workers (default: as many as fit in 256 MiB)
+        cache: Return the stored statistics of an identical earlier run (same parameters,
+            seed and engine version) instead of rerunning it, and store new results; only
+            seeded and resumed runs of at most CACHE_MAX_TRIALS trials are stored (default: True)
+        profile: Print wall time and call counts per phase, and step time and transitions per
+            day summed over the trials simulated in this run (default: False)
+        profile_output: JSON file for the profile; implies profiling (default: None)
+        synchronous: Update the python engine's population synchronously, so results do not
+            depend on population order; the numpy engines always do (default: False)
+        threads: Number of population chunks the numpy engine updates on a thread pool
+            within each trial; results depend on this number (default: 1)
+        contact_model: Well-mixed population, a small-world graph generated per trial, or
+            a graph read from edge_list; graphs need the numpy engine (default: well-mixed)
+        edge_list: Edge list file, one 'source target' pair of 0-based person
+            indices per line, for the edge-list model (default: None)
+        graph_degree: Even number of ring-lattice neighbours per person in a small-world graph (default: 10)
+        rewire_prob: Probability of rewiring each small-world edge to a random person (default: 0.1)
+        target_ci: Relative confidence-interval half-width at which to stop early (default: None,
+            run all nsimulations trials)
+        confidence: Confidence level of the intervals, from a normal approximation (default: 0.95)
+        ci_batch: Number of trials run between convergence checks, and the most workers
+            one batch can keep busy (default: 50)
+    """ 
+    check_threads(threads, engine)
+    check_synchronous(synchronous, engine)
+    network = make_network(contact_model, edge_list, graph_degree, rewire_prob, engine)
+    check_target_ci(target_ci, confidence, ci_batch)
+    vaccinated: int = int(vprob * population_count)
+    profiler = Profiler() if profile or profile_output else None
+    checkpoint_file = output_file + CHECKPOINT_SUFFIX
+    parameters = {'vprob': vprob, 'tprob': tprob, 'dprob': dprob, 'days': days, 'infected': infected,
+                  'population_count': population_count, 'engine': engine.value, 'threads': threads,
+                  **network.identity()}
+    # the other engines are always synchronous, so the flag only tells python-engine runs apart
+    if engine == Engine.PYTHON:
+        parameters['synchronous'] = synchronous
+    if target_ci is not None:
+        parameters.update(target_ci = target_ci, confidence = confidence, ci_batch = ci_batch)
+    if resume:
+        if not os.path.exists(checkpoint_file):
+            raise typer.BadParameter(f"no checkpoint found at {checkpoint_file}", param_hint = "--resume")
+        checkpoint = load_checkpoint(checkpoint_file)
+        if checkpoint['parameters'] != parameters:
+            raise typer.BadParameter("checkpoint was written with different simulation parameters", param_hint = "--resume")
+        if 'completed' not in checkpoint:
+            raise typer.BadParameter("checkpoint was written by an older version; rerun without --resume", param_hint = "--resume")
+        if checkpoint['completed'] > nsimulations:
+            raise typer.BadParameter(f"checkpoint already holds {checkpoint['completed']} trials", param_hint = "--resume")
+        try:
+            ResultSink.truncate(output_file, checkpoint['position'])
+        except ValueError as error:
+            raise typer.BadParameter(str(error), param_hint = "--resume") from error
+    else:
+        checkpoint = {'parameters': parameters, 'entropy': np.random.SeedSequence(seed).entropy, 'completed': 0, 'position': None,
+                      'stats': {column: RunningStats(quantiles = True).to_dict() for column in ANALYZE_COLUMNS}}
+    # one independent substream per trial, so results do not depend on the worker count;
+    # trial t's seed is the parent's t-th spawned child, built only when the trial is submitted
+    seed_sequence = np.random.SeedSequence(checkpoint['entropy'])
+    trial_seeds = lambda first, last: [np.random.SeedSequence(seed_sequence.entropy, spawn_key = (trial,)) for trial in range(first, last)]
+    ncompleted = checkpoint['completed']
+    # unseeded runs get fresh entropy, so their entries could never be hit again
+    result_cache = ResultCache() if cache and (seed is not None or resume) else None
+    cache_key = ResultCache.key('analyze', {**parameters, 'nsimulations': nsimulations}, seed_sequence.entropy)
+    cached = result_cache.get(cache_key) if result_cache else None
+    # running statistics instead of the trial rows, so memory does not grow with the number of trials
+    running = {column: RunningStats.from_dict(checkpoint['stats'][column]) for column in ANALYZE_COLUMNS}
+    # the cache entry is built as rows are written; past CACHE_MAX_TRIALS it is not kept at all
+    cache_rows = None
+    if result_cache and cached is None and nsimulations <= CACHE_MAX_TRIALS:
+        cache_rows = read_trial_rows(output_file).tolist() if ncompleted else []
+    batch_size = batch_size or default_batch_size(population_count, days)
+    # chunks do not depend on the worker count, so neither does the order in which statistics merge;
+    # a target_ci round is only ci_batch trials, so there each trial is a chunk and every worker gets some
+    chunk = batch_size if engine == Engine.BATCHED else 1 if target_ci is not None else TRIAL_CHUNK
+
+    def simulate_trials(first: int, last: int):
+        """Run trials first to last - 1 in chunks, yielding (rows, running statistics) per chunk in trial order."""
+        starts = range(first, last, chunk)
+        nchunks = len(starts)
+        chunk_args = ([engine] * nchunks, [trial_seeds(start, min(start + chunk, last)) for start in starts], [population_count] * nchunks,
+                      [infected] * nchunks, [vaccinated] * nchunks, [tprob] * nchunks, [dprob] * nchunks, [days] * nchunks,
+                      [profiler is not None] * nchunks, [synchronous] * nchunks, [threads] * nchunks, [network] * nchunks)
+        if not pool:
+            return map(run_trial_chunk, *chunk_args)
+        # one-trial chunks still travel to the workers in groups of up to TRIAL_CHUNK trials
+        return pool.map(run_trial_chunk, *chunk_args, chunksize = max(1, min(TRIAL_CHUNK // chunk, -(-nchunks // workers))))
+
+    def simulate_batches():
+        """Run the remaining trials in batches, of ci_batch until converged with target_ci."""
+        # bounded batches also bound the number of pending pool tasks
+        step = ci_batch if target_ci is not None else TRIAL_BATCH
+        for first in range(ncompleted, nsimulations, step):
+            # every trial so far has been recorded by the time the next batch is requested
+            if target_ci is not None and ci_converged(running, target_ci, confidence):
+                return
+            yield from simulate_trials(first, min(first + step, nsimulations))
+
+    # resumed rows stay in output_file, which was cut back to the checkpoint above
+    with ProcessPoolExecutor(workers) if workers > 1 else nullcontext() as pool, \
+         ResultSink(output_file, ANALYZE_COLUMNS, flush_every, append = ncompleted > 0) as sink:
+        if cached is not None:
+            print("Trial statistics loaded from the result cache")
+            rows = [[dict(zip(ANALYZE_COLUMNS, row)) for row in cached[start:start + chunk]]
+                    for start in range(ncompleted, len(cached), chunk)]
+            results = ((chunk_rows, summarize_trials(chunk_rows)) for chunk_rows in rows)
+        else:
+            results = simulate_batches()
+        for chunk_rows, chunk_stats in results:
+            for adf_dict in chunk_rows:
+                ncompleted += 1
+                print(f"trial number {ncompleted} complete...")
+                trial_profile = adf_dict.pop('profile', None)
+                if trial_profile:
+                    profiler.merge(trial_profile)
+                sink.write(adf_dict)
+                if cache_rows is not None:
+                    cache_rows.append([adf_dict[column] for column in ANALYZE_COLUMNS])
+            for column in ANALYZE_COLUMNS:
+                running[column].merge(chunk_stats[column])
+            # checkpoints fall on chunk boundaries, where the running statistics cover every written row
+            if checkpoint_every and ncompleted // checkpoint_every > (ncompleted - len(chunk_rows)) // checkpoint_every:
+                # rows must reach output_file before the checkpoint claims them
+                sink.flush()
+                checkpoint.update(completed = ncompleted, position = sink.tell(),
+                                  stats = {column: stats.to_dict() for column, stats in running.items()})
+                write_checkpoint(checkpoint_file, checkpoint)
+        # closing writes the rows still buffered
+        with profiler.phase('write') if profiler else nullcontext():
+            sink.close()
+    if cache_rows is not None:
+        result_cache.put(cache_key, np.array(cache_rows, dtype = float).reshape(-1, len(ANALYZE_COLUMNS)))
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    print_trial_summary(running)
+    if target_ci is not None:
+        status = "converged" if ci_converged(running, target_ci, confidence) else "budget reached before convergence"
+        print(f"Trials used: {ncompleted} of {nsimulations} ({status})")
+        for column, stats in running.items():
+            print(f"{column}: {stats.mean:.6g} ± {stats.half_width(confidence):.3g} ({confidence:.0%} CI)")
+    print(f"Seed: {seed_sequence.entropy}")
+    if profiler:
+        report_profile(profiler, profile, profile_output)
+
+@app.command()
+def simulate(vprob: Annotated[float, typer.Argument()],
+             tprob: Annotated[float, typer.Argument()] = 0.5, 
+             dprob: Annotated[float, typer.Argument()] = 0.5,
+             infected: Annotated[int, typer.Argument()] = DEFAULT_INFECTED_INITIAL,
+             days: Annotated[int, typer.Argument()] = DEFAULT_DAYS,
+             population_count: Annotated[int, typer.Argument()] = DEFAULT_POPULATION,
+             output_file: Annotated[str, typer.Argument()] = SIMULATE_FILE,
+             engine: Annotated[Engine, typer.Option(help = "Simulation engine")] = Engine.PYTHON,
+             seed: Annotated[int | None, typer.Option(help = "Seed for a reproducible run")] = None,
+             flush_every: Annotated[int, typer.Option(help = "Days buffered before each write to output_file")] = DEFAULT_FLUSH_ROWS,
+             cache: Annotated[bool, typer.Option(help = "Reuse and store daily counts in the result cache")] = True,
+             profile: Annotated[bool, typer.Option(help = "Print per-phase and per-day timings and transitions")] = False,
+             profile_output: Annotated[str | None, typer.Option(help = "Write the profile to this JSON file")] = None,
+             synchronous: Annotated[bool, typer.Option(help = "Decide each day's transitions from the start-of-day state (python engine)")] = False,
+             threads: Annotated[int, typer.Option(help = "Population chunks updated in parallel (numpy engine)")] = 1,
+             contact_model: Annotated[ContactModel, typer.Option(help = "Who meets whom (graphs need the numpy engine)")] = ContactModel.WELL_MIXED,
+             edge_list: Annotated[str | None, typer.Option(help = "Edge list file for --contact-model edge-list")] = None,
+             graph_degree: Annotated[int, typer.Option(help = "Neighbours per person before rewiring (small-world)")] = DEFAULT_GRAPH_DEGREE,
+             rewire_prob: Annotated[float, typer.Option(help = "Probability of rewiring each edge (small-world)")] = DEFAULT_REWIRE_PROB,
+             state_dir: Annotated[str | None, typer.Option(help = "Keep the population in memory-mapped files in this directory (numpy engine)")] = None,
+             tile_size: Annotated[int, typer.Option(help = "People updated per tile with --state-dir")] = DEFAULT_TILE_SIZE,
+             resume: Annotated[bool, typer.Option(help = "Continue the run saved in --state-dir")] = False): 
+    """
+    CLI command to run a single virus spread simulation.
+    
+    Executes one simulation trial with the specified parameters, tracks health
+    status changes over time, and streams each day's counts to a CSV file (or
+    a Parquet dataset for a '.parquet' output_file). Also prints a summary
+    report to the console.
+    
+    Args:
+        vprob: Vaccination probability (fraction of population vaccinated)
+        tprob: Transmission probability (default: 0.5)
         dprob: Death probability for infected individuals (default: 0.5)
         infected: Initial number of infected individuals (default: 10)
         days: Number of days to simulate (default: 50)
         population_count: Total population size (default: 1000)
         output_file: Name of output CSV file (default: 'simulate.csv')
+        engine: Simulation engine, python, numpy or compartmental (default: python)
+        seed: Seed for the simulation's random stream; the seed actually used
+            is printed so unseeded runs can be reproduced (default: None)
+        flush_every: Number of daily rows buffered before each write (default: 100)
+        cache: Return the stored counts of an identical earlier run (same parameters,
+            seed and engine version) instead of rerunning it, and store new results; only
+            seeded runs use the cache (default: True)
+        profile: Print wall time and call counts per phase, and step time and transitions
+            per day (default: False)
+        profile_output: JSON file for the profile; implies profiling (default: None)
+        synchronous: Update the python engine's population synchronously, so results do not
+            depend on population order; the numpy engine always does (default: False)
+        threads: Number of population chunks the numpy engine updates on a thread pool;
+            results depend on this number (default: 1)
+        contact_model: Well-mixed population, a small-world graph generated per trial, or
+            a graph read from edge_list; graphs need the numpy engine (default: well-mixed)
+        edge_list: Edge list file, one 'source target' pair of 0-based person
+            indices per line, for the edge-list model (default: None)
+        graph_degree: Even number of ring-lattice neighbours per person in a small-world graph (default: 10)
+        rewire_prob: Probability of rewiring each small-world edge to a random person (default: 0.1)
+        state_dir: Directory for the population's memory-mapped state files, for populations
+            larger than memory; the state is saved after every day, Ctrl-C stops the run once
+            the current day is saved, and the result cache is not used (default: None)
+        tile_size: Number of people updated at a time with state_dir (default: 1,000,000)
+        resume: Continue the run saved in state_dir with the same parameters, including days
+            already simulated in the output; days may exceed the saved run's to extend it, and
+            the saved seed is used and --seed is ignored (default: False)
     """ 
+    check_threads(threads, engine)
+    check_synchronous(synchronous, engine)
+    network = make_network(contact_model, edge_list, graph_degree, rewire_prob, engine)
+    check_state_dir(state_dir, tile_size, resume, engine, threads, network)
     vaccinated: int = int(vprob * population_count)
-    sim = Simulation(population_count, infected, vaccinated)
-    df = sim.run(tprob, dprob, days)
-    sim.write_values_to_file(df, output_file)
-    sim.print_report(df, tprob, vaccinated, infected, days, population_count)
+    profiler = Profiler() if profile or profile_output else None
+    seed_sequence = np.random.SeedSequence(seed)
+    parameters = {'vprob': vprob, 'tprob': tprob, 'dprob': dprob, 'days': days, 'infected': infected,
+                  'population_count': population_count, 'engine': engine.value, 'threads': threads,
+                  **network.identity()}
+    # the other engines are always synchronous, so the flag only tells python-engine runs apart
+    if engine == Engine.PYTHON:
+        parameters['synchronous'] = synchronous
+    sim = None
+    if state_dir is not None:
+        # mapped runs are resumable instead of cached
+        cache = False
+        parameters = {**parameters, 'tile_size': tile_size}
+        if resume:
+            with profiler.phase('construct') if profiler else nullcontext():
+                sim = open_mapped_simulation(state_dir, parameters)
+            seed_sequence = np.random.SeedSequence(sim.parameters['entropy'])
+    result_cache = ResultCache() if cache and seed is not None else None
+    cache_key = ResultCache.key('simulate', parameters, seed_sequence.entropy)
+    counts = result_cache.get(cache_key) if result_cache else None
+    with ResultSink(output_file, STATUS_COLUMNS, flush_every) as sink:
+        if counts is None:
+            with profiler.phase('construct') if profiler else nullcontext():
+                if state_dir is None:
+                    sim = make_simulation(engine, population_count, infected, vaccinated, seed = seed_sequence, synchronous = synchronous,
+                                          threads = threads, network = network)
+                elif sim is None:
+                    sim = MappedSimulation(population_count, infected, vaccinated, state_dir, rng = np.random.default_rng(seed_sequence),
+                                           tile_size = tile_size, parameters = {**parameters, 'entropy': seed_sequence.entropy})
+            sim.profiler = profiler
+            try:
+                counts = sim.run(tprob, dprob, days, as_array = True, sink = sink)
+            except KeyboardInterrupt as interrupt:
+                if state_dir is None:
+                    raise
+                print(f"{interrupt}; rerun with --resume to continue")
+                raise typer.Exit(130)
+            if result_cache:
+                result_cache.put(cache_key, counts)
+        else:
+            print("Daily counts loaded from the result cache")
+            sink.write_many(counts)
+        # closing writes the rows still buffered
+        with profiler.phase('write') if profiler else nullcontext():
+            sink.close()
+    import pandas as pd
+    df = pd.DataFrame(counts, columns = STATUS_COLUMNS)
+    Simulation.print_report(df, tprob, vaccinated, infected, days, population_count)
+    print(f"Seed: {seed_sequence.entropy}")
+    if profiler:
+        report_profile(profiler, profile, profile_output)
+
+@app.command()
+def sweep(nsimulations: Annotated[int, typer.Argument(help = "Trials per grid point")],
+          output_file: Annotated[str, typer.Argument()] = SWEEP_FILE,
+          vprob: Annotated[str, typer.Option(help = "Vaccination probabilities: 'a,b,c' or 'start:stop:step'")] = '0.0',
+          tprob: Annotated[str, typer.Option(help = "Transmission probabilities: 'a,b,c' or 'start:stop:step'")] = '0.05',
+          dprob: Annotated[str, typer.Option(help = "Death probabilities: 'a,b,c' or 'start:stop:step'")] = '0.05',
+          days: Annotated[str, typer.Option(help = "Simulation lengths: 'a,b,c' or 'start:stop:step'")] = str(DEFAULT_DAYS),
+          population_count: Annotated[str, typer.Option(help = "Population sizes: 'a,b,c' or 'start:stop:step'")] = str(DEFAULT_POPULATION),
+          infected: Annotated[int, typer.Option(help = "Initial number of infected individuals")] = DEFAULT_INFECTED_INITIAL,
+          engine: Annotated[Engine, typer.Option(help = "Simulation engine")] = Engine.PYTHON,
+          workers: Annotated[int, typer.Option(help = "Number of worker processes")] = 1,
+          seed: Annotated[int | None, typer.Option(help = "Seed for reproducible (and cacheable) sweeps")] = None,
+          flush_every: Annotated[int, typer.Option(help = "Rows buffered before each write to output_file")] = DEFAULT_FLUSH_ROWS):
+    """
+    CLI command to run analyze-style trials over a parameter grid.
+    
+    Every combination of the vprob, tprob, dprob, days and population_count
+    values is a grid point. All grid points x trials are scheduled across one
+    worker pool and written to a single long-format table with one row per
+    trial (SWEEP_COLUMNS).
+    
+    output_file doubles as the cache: trials already present in it for a point
+    with the same seed, engine and infected count are skipped, so re-running a
+    widened grid, a larger nsimulations or an interrupted sweep only computes
+    the missing trials. Each point's trials run in tasks of at most
+    TRIAL_CHUNK trials (or one batched block), and every finished task's rows
+    are written, so an interrupted sweep keeps the completed tasks of the
+    point it was on. Each point's trial seeds depend only on the seed and the
+    point itself (see sweep_point_seed).
+    
+    Args:
+        nsimulations: Number of trials per grid point
+        output_file: CSV file (or '.parquet' dataset) for the results (default: 'sweep.csv')
+        vprob: Vaccination probability grid (default: '0.0')
+        tprob: Transmission probability grid (default: '0.05')
+        dprob: Death probability grid (default: '0.05')
+        days: Simulation length grid (default: '50')
+        population_count: Population size grid (default: '1000')
+        infected: Initial number of infected individuals (default: 10)
+        engine: Simulation engine, python, numpy, batched or compartmental (default: python)
+        workers: Number of worker processes (default: 1)
+        seed: Seed for the sweep; needed to reuse cached points across runs (default: None, unseeded)
+        flush_every: Number of rows buffered before each write (default: 100)
+    """
+    try:
+        grids = [parse_grid(vprob), parse_grid(tprob), parse_grid(dprob), parse_grid(days, int), parse_grid(population_count, int)]
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+    entropy = np.random.SeedSequence(seed).entropy
+    stored = {}
+    if os.path.exists(output_file):
+        import pandas as pd
+        # seeds can exceed 64 bits, so they are stored as text; round_trip reads every float back
+        # exactly as written, so stored grid values compare equal to the current grid's
+        previous = (pd.read_parquet(output_file) if output_file.endswith('.parquet')
+                    else pd.read_csv(output_file, dtype = {'seed': str}, float_precision = 'round_trip'))
+        stored = {key: set(trials) for key, trials in previous.groupby(SWEEP_COLUMNS[:8])['Trial']}
+    points = []
+    for point_vprob, point_tprob, point_dprob, point_days, point_population in product(*grids):
+        key = (point_vprob, point_tprob, point_dprob, point_days, point_population, infected, engine.value, str(entropy))
+        missing = [trial for trial in range(nsimulations) if trial not in stored.get(key, ())]
+        if missing:
+            points.append((key, missing))
+    npoints = len(list(product(*grids)))
+    print(f"{len(points)} of {npoints} grid points to compute")
+
+    tasks = []
+    for key, missing in points:
+        point_vprob, point_tprob, point_dprob, point_days, point_population = key[:5]
+        # split each point's trials so a small grid still fills every worker, in tasks of at most
+        # TRIAL_CHUNK trials (or a batched block) so an interruption loses little of a point
+        chunk = min(-(-len(missing) // max(workers, 1)),
+                    default_batch_size(point_population, point_days) if engine == Engine.BATCHED else TRIAL_CHUNK)
+        trial_seeds = sweep_point_seed(entropy, key[:7]).spawn(nsimulations)
+        for first in range(0, len(missing), chunk):
+            trials = missing[first:first + chunk]
+            tasks.append((key, trials, (engine, [trial_seeds[trial] for trial in trials], point_population, infected,
+                                        int(point_vprob * point_population), point_tprob, point_dprob, point_days)))
+    task_args = list(zip(*(args for _, _, args in tasks))) if tasks else [[]] * 8
+    with ProcessPoolExecutor(workers) if workers > 1 else nullcontext() as pool, \
+            ResultSink(output_file, SWEEP_COLUMNS, flush_every, append = True) as sink:
+        results = pool.map(run_trials, *task_args) if pool else map(run_trials, *task_args)
+        for (key, trials, _), block in zip(tasks, results):
+            for trial, adf_dict in zip(trials, block):
+                sink.write([*key, trial, *(adf_dict[column] for column in ANALYZE_COLUMNS)])
+    print(f"Seed: {entropy}")
 
 if __name__ == "__main__":
     app()
\ No newline at end of file